@@ -0,0 +1,17 @@
+from . import (  # noqa: F401
+    cache,
+    decode,
+    entity,
+    events,
+    history,
+    imports,
+    lanes,
+    limits,
+    manager,
+    memory,
+    route,
+    startup,
+)
+from .core import BENCHMARKS, benchmark, compare, run
+
+__all__ = ("BENCHMARKS", "benchmark", "compare", "run")
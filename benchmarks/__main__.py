@@ -0,0 +1,64 @@
+from argparse import ArgumentParser
+from pathlib import Path
+import sys
+
+from . import compare, events, imports, run
+
+try:
+    from ujson import dumps, loads
+except ImportError:
+    from json import dumps, loads
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("names", nargs="*", help="only run benchmarks with these prefixes")
+    parser.add_argument("-o", "--output", type=Path, help="write results as JSON")
+    parser.add_argument("-c", "--compare", type=Path, help="baseline JSON to compare to")
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="flag benchmarks slower than the baseline by this fraction",
+    )
+    parser.add_argument(
+        "-s", "--scale", type=float, default=1.0, help="multiply iteration counts"
+    )
+    parser.add_argument(
+        "-e", "--events", type=Path, help="event recording to use for event benchmarks"
+    )
+    args = parser.parse_args(argv)
+    events.RECORDING = args.events
+
+    results = run(args.names, scale=args.scale)
+    if args.output:
+        args.output.write_text(dumps(results, indent=2))
+
+    if over := imports.over_budget(results):
+        for name in over:
+            extra = results["results"][name]["extra"]
+            print(
+                f"{name}: {extra['import_us'] / 1e3:.1f} ms "
+                f"(budget {extra['budget_us'] / 1e3:.1f} ms)"
+                + (f", loaded {', '.join(extra['forbidden_loaded'])}" if extra["forbidden_loaded"] else "")
+            )
+        print(f"{len(over)} import benchmark(s) over budget")
+        return 1
+
+    if args.compare:
+        rows = compare(results, loads(args.compare.read_text()), args.threshold)
+        regressed = [r for r in rows if r["regressed"]]
+        for row in rows:
+            print(
+                f"{row['name']:<48} {row['ratio']:>8.2f}x"
+                + ("  REGRESSION" if row["regressed"] else "")
+            )
+        if regressed:
+            print(f"{len(regressed)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+from phlyght.utils import LRU
+
+from .core import benchmark
+
+
+@benchmark("lru.add_churn", number=2000)
+def lru_add():
+    lru = LRU(64)
+    state = {"n": 0}
+
+    def op():
+        state["n"] += 1
+        lru.add(state["n"])
+
+    return op
+
+
+@benchmark("lru.extend_churn", number=500)
+def lru_extend():
+    lru = LRU(64)
+    state = {"n": 0}
+
+    def op():
+        state["n"] += 8
+        lru.extend(*range(state["n"], state["n"] + 8))
+
+    return op
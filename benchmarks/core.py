@@ -0,0 +1,102 @@
+from asyncio import new_event_loop
+from inspect import iscoroutinefunction
+from platform import platform, python_version
+from statistics import median
+from time import perf_counter_ns, time
+from typing import Callable, Optional
+
+__all__ = ("BENCHMARKS", "benchmark", "run", "compare")
+
+BENCHMARKS: dict[str, tuple[Callable, int, int]] = {}
+
+
+def benchmark(name: str, number: int = 1000, repeat: int = 5):
+    # The decorated (optionally async) setup function returns the operation to
+    # time; the operation itself may also be sync or async.
+    def wrapped(fn):
+        BENCHMARKS[name] = (fn, number, repeat)
+        return fn
+
+    return wrapped
+
+
+async def _measure(setup, number: int, repeat: int) -> dict:
+    op = await setup() if iscoroutinefunction(setup) else setup()
+    is_async = iscoroutinefunction(op)
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter_ns()
+        if is_async:
+            for _ in range(number):
+                await op()
+        else:
+            for _ in range(number):
+                op()
+        timings.append((perf_counter_ns() - start) / number)
+
+    extra = getattr(op, "extra", None)
+    extra = extra() if callable(extra) else extra
+    if (teardown := getattr(op, "teardown", None)) is not None:
+        await teardown()
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_ns": min(timings),
+        "median_ns": median(timings),
+        "ops_per_sec": 1e9 / median(timings) if median(timings) else 0.0,
+        **({"extra": extra} if extra else {}),
+    }
+
+
+def run(
+    names: Optional[list[str]] = None,
+    scale: float = 1.0,
+    log: Optional[Callable[[str], None]] = print,
+) -> dict:
+    results = {}
+    for name, (setup, number, repeat) in sorted(BENCHMARKS.items()):
+        if names and not any(name.startswith(n) for n in names):
+            continue
+        # Each benchmark gets a fresh loop so leftover tasks can't skew the next.
+        loop = new_event_loop()
+        try:
+            results[name] = loop.run_until_complete(
+                _measure(setup, max(1, int(number * scale)), repeat)
+            )
+        finally:
+            loop.close()
+        if log:
+            res = results[name]
+            log(
+                f"{name:<48} {res['median_ns'] / 1e3:>12.2f} us/op "
+                f"{res['ops_per_sec']:>14.1f} op/s"
+            )
+
+    return {
+        "meta": {
+            "timestamp": time(),
+            "python": python_version(),
+            "platform": platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.1) -> list[dict]:
+    # A benchmark regresses when its median time grows by more than
+    # `threshold` (0.1 == 10%) relative to the baseline run.
+    rows = []
+    for name, res in current["results"].items():
+        if (base := baseline["results"].get(name)) is None or not base["median_ns"]:
+            continue
+        ratio = res["median_ns"] / base["median_ns"]
+        rows.append(
+            {
+                "name": name,
+                "baseline_ns": base["median_ns"],
+                "current_ns": res["median_ns"],
+                "ratio": ratio,
+                "regressed": ratio > 1 + threshold,
+            }
+        )
+    return rows
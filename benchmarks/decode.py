@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+from phlyght import HueEntsV2
+from phlyght.metrics import Metrics
+from phlyght.utils import ret_cls
+
+from .core import benchmark
+from .fixtures import make_home
+
+try:
+    from ujson import dumps
+except ImportError:
+    from json import dumps
+
+HOME = make_home(devices=20, scenes=5)
+
+
+def _payload(cls) -> bytes:
+    # Synthetic home data where the type exists, otherwise a bare resource.
+    resources = list(HOME.resources.get(cls.type, {}).values())[:10]
+    if not resources:
+        resources = [{"id": str(uuid4()), "type": cls.type}]
+    return dumps({"errors": [], "data": resources}).encode()
+
+
+def _register(name, cls):
+    @benchmark(f"decode.{name}", number=500)
+    def decode_bench():
+        resp = SimpleNamespace(content=_payload(cls))
+        owner = SimpleNamespace(metrics=Metrics())
+
+        async def fetch(self):
+            return resp
+
+        decode = ret_cls(cls)(fetch)
+
+        async def op():
+            await decode(owner)
+
+        return op
+
+
+for _name, _cls in vars(HueEntsV2).items():
+    if isinstance(_cls, type) and hasattr(_cls, "cfg_prefix"):
+        _register(_name, _cls)
@@ -0,0 +1,42 @@
+from uuid import uuid4
+
+from phlyght import HueEntsV2
+
+from .core import benchmark
+from .fixtures import make_home
+
+HOME = make_home(devices=20)
+
+
+def _first(rtype):
+    return next(iter(HOME.resources[rtype].values()))
+
+
+@benchmark("entity.light.minimal", number=5000)
+def light_minimal():
+    lid = str(uuid4())
+    return lambda: HueEntsV2.Light(id=lid)
+
+
+@benchmark("entity.light.full", number=2000)
+def light_full():
+    raw = _first("light")
+    return lambda: HueEntsV2.Light(**raw)
+
+
+@benchmark("entity.device.full", number=2000)
+def device_full():
+    raw = _first("device")
+    return lambda: HueEntsV2.Device(**raw)
+
+
+@benchmark("entity.scene.full", number=500)
+def scene_full():
+    raw = _first("scene")
+    return lambda: HueEntsV2.Scene(**raw)
+
+
+@benchmark("entity.light.json", number=2000)
+def light_json():
+    light = HueEntsV2.Light(**_first("light"))
+    return lambda: light.json(exclude_unset=True, exclude_none=True)
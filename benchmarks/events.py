@@ -0,0 +1,59 @@
+from asyncio import sleep
+from pathlib import Path
+from tempfile import mkdtemp
+from typing import Optional
+
+from phlyght.record import EventRecorder, EventReplayer
+
+from .core import benchmark
+from .fixtures import BenchRouter, event_payloads, make_home, make_router
+
+# Set by `python -m benchmarks --events FILE` to parse a real recording
+# instead of synthetic payloads.
+RECORDING: Optional[Path] = None
+
+
+def _payloads(home, batch: int) -> list[bytes]:
+    if RECORDING is not None:
+        return [payload for _, payload in EventReplayer(RECORDING).frames()]
+    return event_payloads(home, count=1000, batch=batch)
+
+
+def _parse_bench(batch: int):
+    def setup():
+        home = make_home()
+        router = make_router(home=home)
+        payloads = _payloads(home, batch)
+        state = {"n": 0}
+
+        async def op():
+            router._parse_payload(payloads[state["n"] % len(payloads)])
+            state["n"] += 1
+            await sleep(0)
+
+        op.extra = lambda: {"events_per_op": batch, "handled": BenchRouter.handled}
+        return op
+
+    return setup
+
+
+benchmark("events.parse_payload.single", number=2000)(_parse_bench(1))
+benchmark("events.parse_payload.batch10", number=500)(_parse_bench(10))
+
+
+@benchmark("events.replay.max_speed", number=1, repeat=5)
+async def replay_max_speed():
+    home = make_home()
+    router = make_router(home=home)
+    path = RECORDING
+    if path is None:
+        path = Path(mkdtemp()) / "events.rec"
+        async with EventRecorder(path) as recorder:
+            for payload in event_payloads(home, count=1000):
+                recorder.write(payload)
+    replayer = EventReplayer(path)
+
+    async def op():
+        await replayer.replay(router, speed=None)
+
+    return op
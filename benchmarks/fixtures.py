@@ -0,0 +1,58 @@
+from typing import Optional
+
+from phlyght import Router
+from phlyght.simulator import BridgeSimulator, SyntheticHome
+
+try:
+    from ujson import dumps
+except ImportError:
+    from json import dumps
+
+__all__ = ("make_router", "make_home", "event_payloads", "CONFIG")
+
+CONFIG = {"api_key": "benchmark", "bridge_host": "127.0.0.1", "aliases": {}}
+
+
+class BenchRouter(Router):
+    handled = 0
+
+    async def on_light_update(self, light):
+        BenchRouter.handled += 1
+
+    async def on_motion_update(self, motion):
+        BenchRouter.handled += 1
+
+    async def on_temperature_update(self, temperature):
+        BenchRouter.handled += 1
+
+
+def make_home(devices: int = 50, **kwargs) -> SyntheticHome:
+    return SyntheticHome(devices=devices, rooms=max(1, devices // 10), **kwargs)
+
+
+def make_router(transport=None, home: Optional[SyntheticHome] = None, **kwargs):
+    if transport is None:
+        transport = BridgeSimulator(home or make_home())
+    return BenchRouter(config=dict(CONFIG), transport=transport, **kwargs)
+
+
+def event_payloads(home: SyntheticHome, count: int = 1000, batch: int = 1):
+    # Payloads framed exactly as the bridge event stream delivers them.
+    payloads = []
+    for seq in range(count):
+        data = [d for _ in range(batch) if (d := home.random_update())]
+        payloads.append(
+            f"id: 1700000000:{seq}\ndata: ".encode()
+            + dumps(
+                [
+                    {
+                        "creationtime": "2023-01-01T00:00:00Z",
+                        "data": data,
+                        "id": "00000000-0000-0000-0000-000000000000",
+                        "type": "update",
+                    }
+                ]
+            ).encode()
+            + b"\n\n"
+        )
+    return payloads
@@ -0,0 +1,56 @@
+from random import Random
+
+from phlyght.history import SensorHistory
+
+from .core import benchmark
+
+
+def _filled(sensors: int, capacity: int) -> SensorHistory:
+    rnd = Random(41)
+    history = SensorHistory(capacity, clock=lambda: 0.0)
+    for n in range(capacity):
+        for s in range(sensors):
+            history.record("temperature", f"s{s}", rnd.uniform(15, 28), float(n))
+    return history
+
+
+@benchmark("history.record", number=5000)
+def history_record():
+    history = _filled(16, 64)
+    state = {"n": 64.0}
+
+    def op():
+        state["n"] += 1
+        history.feed(
+            "update",
+            {"type": "temperature", "id": "s3", "temperature": {"temperature": 21.5}},
+            state["n"],
+        )
+
+    return op
+
+
+@benchmark("history.mean.100x1024", number=200)
+def history_mean():
+    history = _filled(100, 1024)
+
+    def op():
+        history.mean("temperature", 600, now=1024.0)
+
+    return op
+
+
+@benchmark("history.mean.lists.100x1024", number=200)
+def history_mean_lists():
+    # The same query over per-sensor Python lists of (stamp, value).
+    rnd = Random(41)
+    readings = {
+        f"s{s}": [(float(n), rnd.uniform(15, 28)) for n in range(1024)] for s in range(100)
+    }
+
+    def op():
+        for rows in readings.values():
+            window = [v for t, v in rows if t >= 424.0]
+            sum(window) / len(window)
+
+    return op
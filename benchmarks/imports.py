@@ -0,0 +1,76 @@
+from subprocess import run as run_process
+import sys
+
+from .core import benchmark
+
+__all__ = ("BUDGETS", "import_time", "over_budget")
+
+# statement -> (budget in microseconds of cumulative import time, modules that
+# must not be loaded by it). The budgets are generous on purpose; the module
+# lists are what catch an eager import sneaking back in. Router needs httpx,
+# which loads rich itself, so rich is only checked where httpx is.
+BUDGETS = {
+    "import phlyght": (50_000, ("httpx", "numpy", "yaml", "rich", "phlyght.models")),
+    "import phlyght.models": (300_000, ("httpx", "numpy", "yaml", "rich")),
+    "from phlyght import Router": (600_000, ("numpy", "yaml", "aiofiles")),
+}
+
+
+def import_time(statement: str) -> tuple[int, set[str]]:
+    # Runs in a fresh interpreter so nothing is already cached in sys.modules.
+    proc = run_process(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total, modules = 0, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        modules.add(name.strip())
+        # Nested imports are indented; only top-level lines add up to the total.
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total, modules
+
+
+def _import_bench(statement: str):
+    budget, forbidden = BUDGETS[statement]
+
+    def setup():
+        samples = []
+        loaded = set()
+
+        def op():
+            total, modules = import_time(statement)
+            samples.append(total)
+            loaded.update(m for m in forbidden if m in modules)
+
+        op.extra = lambda: {
+            "import_us": min(samples),
+            "budget_us": budget,
+            "forbidden_loaded": sorted(loaded),
+            "over_budget": min(samples) > budget or bool(loaded),
+        }
+        return op
+
+    return setup
+
+
+def over_budget(results: dict) -> list[str]:
+    return [
+        name
+        for name, res in results["results"].items()
+        if res.get("extra", {}).get("over_budget")
+    ]
+
+
+benchmark("import.phlyght", number=1, repeat=5)(_import_bench("import phlyght"))
+benchmark("import.models", number=1, repeat=5)(_import_bench("import phlyght.models"))
+benchmark("import.router", number=1, repeat=5)(
+    _import_bench("from phlyght import Router")
+)
@@ -0,0 +1,76 @@
+from asyncio import gather, sleep
+from time import monotonic
+
+from phlyght.lanes import LaneScheduler, lane
+from phlyght.limits import RateLimiter
+from phlyght.simulator import BridgeSimulator
+
+from .core import benchmark
+from .fixtures import make_home, make_router
+
+# A background sync keeps SYNC_WORKERS readers busy against a bridge limited
+# to RATE requests/s while a button handler sends one light command every
+# PRESS_EVERY seconds; what matters is how long the commands take.
+RATE = 20.0
+SYNC_WORKERS = 12
+PRESSES = 20
+PRESS_EVERY = 0.1
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _lanes_bench(mode):
+    def setup():
+        home = make_home(devices=20)
+        lights = list(home.resources["light"])
+        sim = BridgeSimulator(home, latency=0.005)
+        lanes = LaneScheduler(mode) if mode else None
+        router = make_router(sim, limiter=RateLimiter(RATE, 1), policy=None, lanes=lanes)
+        result = {}
+
+        @lane("background")
+        async def sync():
+            reads = 0
+            while monotonic() < end:
+                await router.get_raw_resource_type("light")
+                reads += 1
+            return reads
+
+        @lane("interactive")
+        async def presses():
+            latencies = []
+            for n in range(PRESSES):
+                start = monotonic()
+                await router.set_light(lights[n % len(lights)], on={"on": n % 2 == 0})
+                latencies.append(monotonic() - start)
+                await sleep(PRESS_EVERY)
+            return latencies
+
+        async def op():
+            nonlocal end
+            started, end = monotonic(), monotonic() + 1e9
+            task = gather(*(sync() for _ in range(SYNC_WORKERS)))
+            latencies = await presses()
+            end = 0.0
+            reads = sum(await task)
+            elapsed = monotonic() - started
+            result.update(
+                press_p50=_percentile(latencies, 0.5),
+                press_p95=_percentile(latencies, 0.95),
+                press_max=max(latencies),
+                background_per_sec=reads / elapsed,
+            )
+
+        end = 0.0
+        op.extra = lambda: result
+        return op
+
+    return setup
+
+
+benchmark("lanes.none", number=1, repeat=1)(_lanes_bench(None))
+benchmark("lanes.strict", number=1, repeat=1)(_lanes_bench("strict"))
+benchmark("lanes.weighted", number=1, repeat=1)(_lanes_bench("weighted"))
@@ -0,0 +1,82 @@
+from asyncio import gather
+from time import monotonic
+
+from phlyght.limits import AdaptiveLimiter, RateLimiter
+from phlyght.simulator import BridgeSimulator
+
+from .core import benchmark
+from .fixtures import make_home, make_router
+
+# (seconds, requests/s the simulated bridge accepts): healthy, congested,
+# partly recovered.
+PROFILE = ((4.0, 20.0), (4.0, 6.0), (4.0, 14.0))
+WORKERS = 16
+
+
+def capacity(t: float) -> float:
+    for length, rate in PROFILE:
+        if t < length:
+            return rate
+        t -= length
+    return PROFILE[-1][1]
+
+
+def allowed(elapsed: float) -> float:
+    # Requests the profile accepts over elapsed seconds, plus the simulated
+    # bridge's initial burst.
+    total = PROFILE[0][1]
+    for length, rate in PROFILE:
+        total += min(length, max(elapsed, 0.0)) * rate
+        elapsed -= length
+    return total + max(elapsed, 0.0) * PROFILE[-1][1]
+
+
+def _limits_bench(make_limiter):
+    # Workers send light commands as fast as the limiter lets them for the
+    # length of the profile. Goodput is accepted commands against what the
+    # profile allowed over the run; the rest came back 429.
+    def setup():
+        home = make_home(devices=20)
+        lights = list(home.resources["light"])
+        sim = BridgeSimulator(home, capacity=capacity)
+        limiter = make_limiter()
+        router = make_router(sim, limiter=limiter, policy=None)
+        duration = sum(length for length, _ in PROFILE)
+        result = {}
+
+        async def worker(n: int):
+            ok = 0
+            while monotonic() < end:
+                light = lights[n % len(lights)]
+                if await router.set_light(light, on={"on": True}):
+                    ok += 1
+            return ok
+
+        async def op():
+            nonlocal end
+            sim.started = monotonic()
+            sim.bucket = None
+            sim.requests = sim.rejected = 0
+            end = sim.started + duration
+            accepted = sum(await gather(*(worker(n) for n in range(WORKERS))))
+            elapsed = monotonic() - sim.started
+            result.update(
+                accepted=accepted,
+                rejected=sim.rejected,
+                goodput=accepted / allowed(elapsed),
+                reject_ratio=sim.rejected / max(1, sim.requests),
+            )
+            if isinstance(limiter, AdaptiveLimiter):
+                result["final_rate"] = limiter.rate("light")
+
+        end = 0.0
+        op.extra = lambda: result
+        return op
+
+    return setup
+
+
+benchmark("limits.static.10", number=1, repeat=1)(
+    _limits_bench(lambda: RateLimiter(10.0))
+)
+benchmark("limits.adaptive", number=1, repeat=1)(_limits_bench(AdaptiveLimiter))
@@ -0,0 +1,64 @@
+from asyncio import sleep
+from time import perf_counter
+
+from phlyght.manager import BridgeManager
+from phlyght.simulator import BridgeSimulator
+
+from .core import benchmark
+from .fixtures import BenchRouter, make_home
+
+EVENTS_PER_BRIDGE = 200
+
+
+def _manager_bench(bridges: int):
+    # Every bridge publishes the same number of events per op; the op ends
+    # when all of them have come out of the merged stream.
+    async def setup():
+        manager = BridgeManager(router_cls=BenchRouter, queue_size=1 << 20)
+        sims = []
+        for n in range(bridges):
+            home = make_home(devices=20, seed=n)
+            sims.append((sim := BridgeSimulator(home), home))
+            host = f"10.0.{n // 250}.{n % 250 + 1}"
+            # random_update often repeats a value the store already holds;
+            # the op counts on every published event coming out.
+            manager.add(
+                f"bridge-{n}", host, "bench", transport=sim, suppress_noops=False
+            )
+        await manager.start()
+        while not all(r.connected for r in manager.routers.values()):
+            await sleep(0.01)
+        stream = manager.events()
+        best = {"events_per_sec": 0.0}
+
+        async def op():
+            start = perf_counter()
+            for sim, home in sims:
+                for _ in range(EVENTS_PER_BRIDGE):
+                    sim.publish("update", [home.random_update()])
+            for _ in range(bridges * EVENTS_PER_BRIDGE):
+                await anext(stream)
+            rate = bridges * EVENTS_PER_BRIDGE / (perf_counter() - start)
+            best["events_per_sec"] = max(best["events_per_sec"], rate)
+
+        async def teardown():
+            await stream.aclose()
+            for sim, _ in sims:
+                sim.close_streams()
+            await manager.stop()
+            await sleep(0)
+
+        op.teardown = teardown
+        op.extra = lambda: {
+            "bridges": bridges,
+            **best,
+            "per_bridge_events_per_sec": best["events_per_sec"] / bridges,
+            "total": manager.snapshot()["total"],
+        }
+        return op
+
+    return setup
+
+
+for _n in (1, 4, 16):
+    benchmark(f"manager.events.{_n}", number=1, repeat=5)(_manager_bench(_n))
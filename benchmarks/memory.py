@@ -0,0 +1,50 @@
+from gc import collect
+from tracemalloc import get_traced_memory, is_tracing, start, stop
+
+from phlyght.compact import compact
+from phlyght.http import TYPE_CACHE
+
+from .core import benchmark
+from .fixtures import make_home
+
+__all__ = ("store_size",)
+
+
+def store_size(devices: int = 1000, compacted: bool = False) -> dict:
+    # Bytes held by a store of every resource in a synthetic home, measured
+    # with tracemalloc; the raw JSON dicts are built before tracing starts.
+    raw = [r for r in make_home(devices=devices, scenes=20, zones=4).all()]
+    collect()
+    tracing = is_tracing()
+    if not tracing:
+        start()
+    before = get_traced_memory()[0]
+    store = []
+    for data in raw:
+        if (cls := TYPE_CACHE.get(data["type"])) is None:
+            continue
+        ent = cls(**data)
+        store.append(compact(ent) if compacted else ent)
+        del ent
+    collect()
+    used = get_traced_memory()[0] - before
+    if not tracing:
+        stop()
+    return {"entities": len(store), "bytes": used, "bytes_per_entity": used / len(store)}
+
+
+def _memory_bench(compacted: bool):
+    def setup():
+        sizes = {}
+
+        def op():
+            sizes.update(store_size(1000, compacted))
+
+        op.extra = lambda: sizes
+        return op
+
+    return setup
+
+
+benchmark("memory.store.models.1000", number=1, repeat=1)(_memory_bench(False))
+benchmark("memory.store.compact.1000", number=1, repeat=1)(_memory_bench(True))
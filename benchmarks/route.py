@@ -0,0 +1,50 @@
+from uuid import uuid4
+
+from httpx import MockTransport, Response
+
+from .core import benchmark
+from .fixtures import make_router
+
+LIGHT_ID = str(uuid4())
+RESPONSE = b'{"errors": [], "data": [{"rid": "%s", "rtype": "light"}]}' % (
+    LIGHT_ID.encode()
+)
+
+
+def _static_router():
+    # The transport answers immediately, so the timing is dominated by the
+    # request construction in route and httpx's own client overhead.
+    return make_router(MockTransport(lambda request: Response(200, content=RESPONSE)))
+
+
+@benchmark("route.get", number=2000)
+def route_get():
+    router = _static_router()
+
+    async def op():
+        await router.get_matter(LIGHT_ID)
+
+    return op
+
+
+@benchmark("route.put", number=2000)
+def route_put():
+    router = _static_router()
+
+    async def op():
+        await router.set_light(LIGHT_ID, on={"on": True}, dimming={"brightness": 50})
+
+    return op
+
+
+@benchmark("route.put_entity", number=2000)
+def route_put_entity():
+    from phlyght import HueEntsV2
+
+    router = _static_router()
+    light = HueEntsV2.Light(id=LIGHT_ID, on={"on": True}, dimming={"brightness": 50})
+
+    async def op():
+        await router.set_light(light.id, light)
+
+    return op
@@ -0,0 +1,22 @@
+from phlyght.simulator import BridgeSimulator
+
+from .core import benchmark
+from .fixtures import make_home, make_router
+
+
+def _startup_bench(devices: int):
+    def setup():
+        home = make_home(devices=devices)
+
+        async def op():
+            router = make_router(BridgeSimulator(home))
+            await router._discover()
+            await router._client.aclose()
+
+        return op
+
+    return setup
+
+
+benchmark("startup.discover.10", number=3, repeat=3)(_startup_bench(10))
+benchmark("startup.discover.100", number=1, repeat=3)(_startup_bench(100))
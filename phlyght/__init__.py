@@ -1,6 +1,12 @@
-from .http import Router
-from .models import Archetype, HueEntsV2, Attributes, RoomType, Entity, HueEntsV1, _XY
-from .abc import RouterMeta, SubRouter
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .http import Router
+    from .models import Archetype, HueEntsV2, Attributes, RoomType, Entity, HueEntsV1, _XY
+    from .abc import RouterMeta, SubRouter
+    from .spatial import SpatialIndex
+    from .manager import BridgeManager
 
 __all__ = (
     "Router",
@@ -13,4 +19,35 @@ __all__ = (
     "_XY",
     "RouterMeta",
     "SubRouter",
+    "SpatialIndex",
+    "BridgeManager",
 )
+
+# Submodules are imported on first attribute access, so `import phlyght` (or
+# importing only the models) doesn't pay for httpx, numpy and friends.
+_LAZY = {
+    "Router": ".http",
+    "Entity": ".models",
+    "Archetype": ".models",
+    "RoomType": ".models",
+    "Attributes": ".models",
+    "HueEntsV2": ".models",
+    "HueEntsV1": ".models",
+    "_XY": ".models",
+    "RouterMeta": ".abc",
+    "SubRouter": ".abc",
+    "SpatialIndex": ".spatial",
+    "BridgeManager": ".manager",
+}
+
+
+def __getattr__(name):
+    if (module := _LAZY.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
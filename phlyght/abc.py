@@ -1,9 +1,11 @@
-from typing import Any, Optional, Self
-from httpx import AsyncClient
-from yaml import YAMLObject
+from typing import Any, TYPE_CHECKING
 
+from .metrics import Metrics
 from .utils import ENDPOINT_METHOD
 
+if TYPE_CHECKING:
+    from httpx import AsyncClient
+
 
 class RouterMeta(type):
     @classmethod
@@ -58,8 +60,13 @@ class RouterMeta(type):
 class SubRouter(metaclass=RouterMeta):
     BASE_URI: str
     _api_path: str
-    _client: AsyncClient
+    _client: "AsyncClient"
     _bridge_host: str
+    metrics: Metrics
+    confirmations = None
+    limiter = None
+    policy = None
+    lanes = None
 
     def __new__(cls, **kwargs):
         if not hasattr(cls, "handlers"):
@@ -77,6 +84,7 @@ class SubRouter(metaclass=RouterMeta):
             "User-Agent": "Python/HueClient",
             "hue-application-key": self._api_key,
         }
+        self.metrics = Metrics()
 
     def __init_subclass__(cls, *_, **kwargs) -> None:
         super().__init_subclass__()
@@ -87,57 +95,10 @@ class SubRouter(metaclass=RouterMeta):
         return object.__getattribute__(self, key)
 
 
-class YAMLConfig(YAMLObject, dict):
-    yaml_tag = "!YAMLConfig"
-
-    def __setstate__(self, state):
-        for k, v in state.items():
-            if isinstance(v, dict):
-                v = YAMLConfig(**v)
-
-            setattr(self, k, v)
-            dict.__setitem__(self, k, v)
-            self.__dict__[k] = v
-
-        return self
-
-    def __setitem__(self, key, value):
-        if isinstance(value, dict):
-            value = YAMLConfig(**value)
-
-        dict.__setitem__(self, key, value)
-        setattr(self, key, value)
-        self.__dict__[key] = value
-
-    def __getattribute__(self, name):
-        return object.__getattribute__(self, name)
-
-    def __getitem__(self, key):
-        return dict.__getitem__(self, key)
-
-    def keys(self):
-        return dict.keys(self)
-
-    def __iter__(self):
-        return dict.__iter__(self)
-
-    def __get__(self, key, f=None) -> Self | Any | None:
-        if f:
-            return self
-        return getattr(self, key, None)
-
-    def __init__(self, **data):
-        super().__init__()
-        for k, v in data.items():
-            self.__dict__[k] = v
-            self.__setattr__(k, v)
-            dict.__setitem__(self, k, v)
-
-    def items(self):
-        return dict.items(self)
-
-    def __repr__(self):
-        return dict.__repr__(self)
+def __getattr__(name):
+    # YAMLConfig lives in .config so importing the routers doesn't load yaml.
+    if name == "YAMLConfig":
+        from .config import YAMLConfig
 
-    def __str__(self):
-        return dict.__str__(self)
+        return YAMLConfig
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
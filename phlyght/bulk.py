@@ -0,0 +1,173 @@
+from asyncio import CancelledError, Future, Task, current_task, gather, get_running_loop
+from typing import Any, Iterable, Optional
+
+from .limits import RateLimiter
+from .metrics import monotonic_ns
+
+__all__ = ("Batch", "BulkResult", "BulkError")
+
+
+class BulkResult:
+    __slots__ = ("index", "entity", "changes", "result", "error", "elapsed")
+
+    def __init__(self, index: int, entity: Any, changes: dict):
+        self.index = index
+        self.entity = entity
+        self.changes = changes
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.elapsed = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        state = "ok" if self.error is None else f"error={self.error!r}"
+        return f"<BulkResult #{self.index} {self.entity} {state}>"
+
+
+class BulkError(Exception):
+    def __init__(self, failures: list[BulkResult], total: int):
+        self.failures = failures
+        self.total = total
+        super().__init__(f"{len(failures)} of {total} bulk writes failed")
+
+
+class Batch:
+    # A running apply_many. Iterating it yields results in submission order
+    # as they become available; awaiting it returns all of them. Failures are
+    # kept on their result and never stop the rest of the batch.
+    def __init__(
+        self,
+        router,
+        items: Iterable[tuple[Any, dict]],
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+    ):
+        self.router = router
+        self.items = list(items)
+        self.concurrency = max(1, concurrency)
+        # The batch's own budget, taken before the router's limiter, so a big
+        # batch can be kept from using the bridge's whole allowance.
+        self.limiter = RateLimiter(rate, burst or 1) if rate else None
+        self.results = [
+            BulkResult(n, entity, dict(changes or {}))
+            for n, (entity, changes) in enumerate(self.items)
+        ]
+        self._futures: list[Future] = []
+        self._workers: list[Task] = []
+        self._next = 0
+        self.started = self.finished = 0
+
+    def __len__(self):
+        return len(self.results)
+
+    def start(self) -> "Batch":
+        if not self._workers:
+            loop = get_running_loop()
+            self.started = monotonic_ns()
+            self._futures = [loop.create_future() for _ in self.results]
+            self._workers = [
+                loop.create_task(self._work())
+                for _ in range(min(self.concurrency, len(self.results)))
+            ]
+        return self
+
+    def _resolve(self, ref):
+        index = self.router.index
+        if (found := index.get(ref)) is not None:
+            return found
+        named = index.named(str(ref))
+        if len(named) > 1:
+            # A service usually shares its name with the device it belongs
+            # to; the service is the one being written to.
+            named = [e for e in named if e.type != "device"]
+        if not named:
+            raise ValueError(f"Unknown resource {ref}")
+        if len(named) > 1:
+            raise ValueError(
+                f"{ref!r} names {len(named)} resources"
+                f" ({', '.join(sorted(e.type for e in named))}); pass an id"
+            )
+        return named[0]
+
+    def _method(self, entity):
+        if not hasattr(entity, "type"):
+            entity = self._resolve(entity)
+        if (method := getattr(self.router, f"set_{entity.type}", None)) is None:
+            raise ValueError(f"Resources of type {entity.type} can't be updated")
+        return method, entity.id
+
+    async def _work(self):
+        while self._next < len(self.results):
+            result = self.results[self._next]
+            self._next += 1
+            start = monotonic_ns()
+            try:
+                method, rid = self._method(result.entity)
+                if self.limiter is not None:
+                    await self.limiter.acquire()
+                result.result = await method(rid, **result.changes)
+                if not result.result:
+                    raise RuntimeError(f"{method.__name__} {rid} was not applied")
+            except Exception as e:
+                result.error = e
+            except CancelledError as e:
+                result.error = e
+                if current_task().cancelling():
+                    # The worker itself was cancelled, and with it the batch.
+                    self.cancel()
+                    raise
+            finally:
+                result.elapsed = (monotonic_ns() - start) / 1e9
+                if not (future := self._futures[result.index]).done():
+                    future.set_result(result)
+        self.finished = monotonic_ns()
+
+    async def __aiter__(self):
+        self.start()
+        for future in self._futures:
+            yield await future
+
+    def __await__(self):
+        return self._all().__await__()
+
+    async def _all(self) -> list[BulkResult]:
+        self.start()
+        return list(await gather(*self._futures))
+
+    def cancel(self):
+        # Writes already sent may still land; every result not yet in is
+        # resolved with a CancelledError so iterating or awaiting returns.
+        for worker in self._workers:
+            worker.cancel()
+        for result, future in zip(self.results, self._futures):
+            if not future.done():
+                result.error = CancelledError()
+                future.set_result(result)
+        self.finished = self.finished or monotonic_ns()
+
+    @property
+    def done(self) -> int:
+        return sum(future.done() for future in self._futures)
+
+    @property
+    def errors(self) -> list[BulkResult]:
+        return [r for r, f in zip(self.results, self._futures) if f.done() and not r.ok]
+
+    def raise_for_errors(self):
+        if errors := self.errors:
+            raise BulkError(errors, len(self.results))
+
+    def stats(self) -> dict:
+        elapsed = ((self.finished or monotonic_ns()) - self.started) / 1e9
+        return {
+            "total": len(self.results),
+            "done": self.done,
+            "failed": len(self.errors),
+            "concurrency": self.concurrency,
+            "elapsed": elapsed if self.started else 0.0,
+            "per_sec": self.done / elapsed if self.started and elapsed else 0.0,
+        }
@@ -0,0 +1,169 @@
+from sys import intern as intern_str
+from typing import Any, ClassVar
+from weakref import WeakValueDictionary
+
+from pydantic import BaseModel
+
+from .models import Entity, UUID, _field_keys, merge_delta
+
+__all__ = ("Record", "EntityRecord", "compact", "expand", "intern", "record_type")
+
+# Canonical instances of value records. Weak, so states that are no longer
+# referenced (an old brightness, say) don't pile up. UUIDs share the decode
+# time table in models.
+_POOL: WeakValueDictionary = WeakValueDictionary()
+_RECORDS: dict[type, type] = {}
+# Field-set frozensets repeat per model; sharing them matters as much as the
+# slots do at this size.
+_SETS: dict[frozenset, frozenset] = {}
+
+
+def intern(value):
+    try:
+        return _POOL.setdefault(value, value)
+    except TypeError:
+        # Unhashable (a record holding a dict); keep the private copy.
+        return value
+
+
+class Record:
+    # Immutable, slotted stand-in for a small pydantic attribute model.
+    # Subclasses are generated per model by record_type().
+    __slots__ = ("_set", "__weakref__")
+    __model__: ClassVar[type]
+    _fields: ClassVar[tuple[str, ...]] = ()
+
+    @classmethod
+    def _make(cls, values: dict, fields_set: frozenset):
+        rec = object.__new__(cls)
+        setter = object.__setattr__
+        setter(rec, "_set", fields_set)
+        for name, value in values.items():
+            setter(rec, name, value)
+        return rec
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _key(self) -> tuple:
+        return (self._set, *(getattr(self, f) for f in self._fields))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self is other or self._key() == other._key()
+
+    def __hash__(self):
+        return hash((type(self), self._key()))
+
+    def __repr__(self):
+        args = ", ".join(f"{f}={getattr(self, f)!r}" for f in self._fields)
+        return f"{type(self).__name__}({args})"
+
+    def to_model(self):
+        return self.__model__.construct(
+            _fields_set=set(self._set),
+            **{f: expand(getattr(self, f)) for f in self._fields},
+        )
+
+    def dict(self, **kwargs) -> dict:
+        return self.to_model().dict(**kwargs)
+
+    def json(self, **kwargs) -> str:
+        return self.to_model().json(**kwargs)
+
+    def __json__(self):
+        return self.json()
+
+
+class EntityRecord(Record):
+    # Top-level entities stay mutable (updates swap in new value records) and
+    # keep their identity, so indexes and views holding them stay valid. They
+    # also keep the router the entity belonged to, so a record expanded at the
+    # API edge can still get/update/delete.
+    __slots__ = ("_router",)
+    type: ClassVar[str] = "unknown"
+
+    def to_model(self):
+        model = super().to_model()
+        model._router = self._router
+        return model
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+
+    __eq__ = object.__eq__
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def apply_delta(self, data: dict) -> bool:
+        model = self.__model__
+        keys = _field_keys(model)
+        changed = False
+        for key, value in data.items():
+            if key in ("id", "type"):
+                continue
+            if (field := keys.get(key)) is None:
+                # Not compared, so not known to be unchanged.
+                changed = True
+                continue
+            current = getattr(self, field.name, None)
+            if isinstance(value, dict) and isinstance(current, Record):
+                if not merge_delta(merged := current.to_model(), value):
+                    continue
+                new = compact(merged)
+            else:
+                value, errors = field.validate(value, {}, loc=key, cls=model)
+                if errors:
+                    changed = True
+                    continue
+                if (new := compact(value)) == current:
+                    continue
+            setattr(self, field.name, new)
+            if field.name not in self._set:
+                fs = self._set | {field.name}
+                self._set = _SETS.setdefault(fs, fs)
+            changed = True
+        return changed
+
+
+def record_type(model: type) -> type:
+    if (rec := _RECORDS.get(model)) is None:
+        base = EntityRecord if issubclass(model, Entity) else Record
+        fields = tuple(model.__fields__)
+        ns = {"__slots__": fields, "__model__": model, "_fields": fields}
+        if base is EntityRecord:
+            ns.update({k: getattr(model, k) for k in model.__class_vars__})
+        rec = _RECORDS[model] = type(f"{model.__name__}Record", (base,), ns)
+    return rec
+
+
+def compact(value: Any):
+    # pydantic model -> record, recursively; lists become tuples and repeated
+    # values (ids, strings, identical attribute states) share one instance.
+    if isinstance(value, BaseModel):
+        rec = record_type(type(value))._make(
+            {k: compact(v) for k, v in value.__dict__.items()},
+            _SETS.setdefault(fs := frozenset(value.__fields_set__), fs),
+        )
+        if isinstance(rec, EntityRecord):
+            rec._router = getattr(value, "_router", None)
+            return rec
+        return intern(rec)
+    if isinstance(value, str):
+        return intern_str(value)
+    if isinstance(value, UUID):
+        return UUID.intern(value)
+    if isinstance(value, list):
+        return tuple(compact(v) for v in value)
+    return value
+
+
+def expand(value: Any):
+    # The inverse of compact, for handing records back to the API.
+    if isinstance(value, Record):
+        return value.to_model()
+    if isinstance(value, tuple):
+        return [expand(v) for v in value]
+    return value
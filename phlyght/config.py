@@ -0,0 +1,61 @@
+from typing import Any, Self
+
+from yaml import YAMLObject
+
+__all__ = ("YAMLConfig",)
+
+
+class YAMLConfig(YAMLObject, dict):
+    yaml_tag = "!YAMLConfig"
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            if isinstance(v, dict):
+                v = YAMLConfig(**v)
+
+            setattr(self, k, v)
+            dict.__setitem__(self, k, v)
+            self.__dict__[k] = v
+
+        return self
+
+    def __setitem__(self, key, value):
+        if isinstance(value, dict):
+            value = YAMLConfig(**value)
+
+        dict.__setitem__(self, key, value)
+        setattr(self, key, value)
+        self.__dict__[key] = value
+
+    def __getattribute__(self, name):
+        return object.__getattribute__(self, name)
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, key)
+
+    def keys(self):
+        return dict.keys(self)
+
+    def __iter__(self):
+        return dict.__iter__(self)
+
+    def __get__(self, key, f=None) -> Self | Any | None:
+        if f:
+            return self
+        return getattr(self, key, None)
+
+    def __init__(self, **data):
+        super().__init__()
+        for k, v in data.items():
+            self.__dict__[k] = v
+            self.__setattr__(k, v)
+            dict.__setitem__(self, k, v)
+
+    def items(self):
+        return dict.items(self)
+
+    def __repr__(self):
+        return dict.__repr__(self)
+
+    def __str__(self):
+        return dict.__str__(self)
@@ -0,0 +1,129 @@
+from asyncio import CancelledError, Future, get_running_loop, wait_for
+from collections import deque
+from typing import Iterable, Optional
+
+from .metrics import Metrics, monotonic_ns
+
+__all__ = ("ConfirmationTracker", "Pending", "percentiles")
+
+# Keys present on every event that say nothing about which write it confirms.
+IGNORED_FIELDS = frozenset(("id", "id_v1", "type", "owner"))
+
+
+def percentiles(samples: Iterable[int], qs=(0.5, 0.9, 0.99)) -> dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{int(q * 100)}": 0.0 for q in qs}
+    return {
+        f"p{int(q * 100)}": ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        / 1e9
+        for q in qs
+    }
+
+
+class Pending:
+    __slots__ = ("rtype", "rid", "fields", "sent", "future")
+
+    def __init__(self, rtype: str, rid: str, fields: frozenset, future: Future):
+        self.rtype = rtype
+        self.rid = rid
+        self.fields = fields
+        self.sent = monotonic_ns()
+        self.future = future
+
+
+class ConfirmationTracker:
+    def __init__(
+        self, metrics: Optional[Metrics] = None, horizon: float = 30.0, window=1024
+    ):
+        self.metrics = metrics
+        self.horizon = int(horizon * 1e9)
+        self.window = window
+        self.latencies: dict[str, deque[int]] = {}
+        self.timeouts: dict[str, int] = {}
+        self._pending: dict[str, deque[Pending]] = {}
+
+    def expect(self, rtype: str, rid, fields: Iterable[str]) -> Pending:
+        now = monotonic_ns()
+        if self._pending:
+            self._expire(now)
+
+        pending = Pending(
+            rtype,
+            str(rid),
+            frozenset(fields) - IGNORED_FIELDS,
+            get_running_loop().create_future(),
+        )
+        self._pending.setdefault(pending.rid, deque()).append(pending)
+        return pending
+
+    def discard(self, pending: Pending):
+        # The write failed, so nothing that arrives confirms it.
+        if (queue := self._pending.get(pending.rid)) is not None:
+            try:
+                queue.remove(pending)
+            except ValueError:
+                ...
+            if not queue:
+                del self._pending[pending.rid]
+        pending.future.cancel()
+
+    def observe(self, rtype: str, rid: str, fields: Iterable[str]):
+        # Called for every update event; the common case is nothing pending.
+        if not self._pending or (queue := self._pending.get(rid)) is None:
+            return
+
+        fields = frozenset(fields)
+        now = monotonic_ns()
+        for pending in list(queue):
+            if pending.fields and pending.fields.isdisjoint(fields):
+                continue
+            queue.remove(pending)
+            latency = now - pending.sent
+            self.latencies.setdefault(rtype, deque(maxlen=self.window)).append(
+                latency
+            )
+            if self.metrics is not None and self.metrics.enabled:
+                self.metrics.observe("confirm", rtype, latency)
+            if not pending.future.done():
+                pending.future.set_result(latency / 1e9)
+
+        if not queue:
+            del self._pending[rid]
+
+    async def wait(self, pending: Pending, timeout: Optional[float] = 5.0) -> float:
+        # A write that wasn't confirmed in time stops being expected, so a
+        # later matching event can't be taken for its (very late) confirmation.
+        try:
+            return await wait_for(pending.future, timeout)
+        except TimeoutError:
+            self.timeouts[pending.rtype] = self.timeouts.get(pending.rtype, 0) + 1
+            self.discard(pending)
+            raise
+        except CancelledError:
+            self.discard(pending)
+            raise
+
+    def _expire(self, now: int):
+        cutoff = now - self.horizon
+        for rid in list(self._pending):
+            queue = self._pending[rid]
+            while queue and queue[0].sent < cutoff:
+                pending = queue.popleft()
+                if not pending.future.done():
+                    pending.future.cancel()
+                    self.timeouts[pending.rtype] = (
+                        self.timeouts.get(pending.rtype, 0) + 1
+                    )
+            if not queue:
+                del self._pending[rid]
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            rtype: {
+                "count": len(samples),
+                "timeouts": self.timeouts.get(rtype, 0),
+                **percentiles(samples),
+            }
+            for rtype, samples in self.latencies.items()
+        }
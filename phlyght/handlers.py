@@ -0,0 +1,209 @@
+from asyncio import get_running_loop
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import wraps
+from importlib import import_module
+import multiprocessing
+from time import perf_counter_ns
+from typing import Any, Callable, Optional
+
+from .metrics import Metrics
+
+__all__ = ("offload", "keep_noops", "Command", "Executors")
+
+# Offloaded handler functions by "module:qualname". Process workers receive
+# the key rather than the function, which pickle can't find once the class
+# attribute holds the async wrapper.
+_OFFLOADED: dict[str, Callable] = {}
+
+
+class Command:
+    # Returned (alone or in a list) from an offloaded handler to have the
+    # router call router.<method>(*args, **kwargs) back on the event loop.
+    __slots__ = ("method", "args", "kwargs")
+
+    def __init__(self, method: str, *args, **kwargs):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return f"Command({self.method!r}, *{self.args!r}, **{self.kwargs!r})"
+
+
+def keep_noops(fn):
+    # Update events that change nothing in the store are dropped before
+    # dispatch; a handler marked with this still gets them, e.g. to treat
+    # each report as a heartbeat.
+    fn.__keep_noops__ = True
+    return fn
+
+
+def offload(
+    executor: str | Executor | Callable = "thread",
+    *,
+    then: Optional[str] = None,
+    payload: str = "model",
+):
+    # Runs a (synchronous) handler in an executor instead of on the loop:
+    #
+    #     @offload("process")
+    #     def on_motion_update(motion):
+    #         return Command("set_light", LAMP, on={"on": score(motion) > 0.5})
+    #
+    # The function takes no self. executor is "thread", "process", another
+    # name registered with Router(executors=...) or an Executor instance.
+    # payload="dict" hands the function the entity's set fields as a plain
+    # dict instead of a rebuilt model. Any non-Command result is passed to
+    # the router coroutine named by then.
+    def wrapped(fn):
+        key = f"{fn.__module__}:{fn.__qualname__}"
+        _OFFLOADED[key] = fn
+
+        @wraps(fn)
+        async def handler(self, obj):
+            return await self.executors.run(self, handler, obj)
+
+        handler.__offload__ = (key, fn, executor, then, payload)
+        return handler
+
+    if callable(executor) and not isinstance(executor, Executor):
+        fn, executor = executor, "thread"
+        return wrapped(fn)
+    return wrapped
+
+
+def _lookup(key: str) -> Callable:
+    if (fn := _OFFLOADED.get(key)) is None:
+        module = key.partition(":")[0]
+        # Under spawn the parent's __main__ is imported as __mp_main__.
+        if module == "__main__":
+            key = "__mp_main__" + key[len(module) :]
+        import_module(key.partition(":")[0])
+        fn = _OFFLOADED[key]
+    return fn
+
+
+def _invoke_process(key: str, cls: type, data: dict, as_dict: bool):
+    start = perf_counter_ns()
+    result = _lookup(key)(data if as_dict else cls(**data))
+    return result, perf_counter_ns() - start
+
+
+def _invoke_thread(fn: Callable, obj):
+    start = perf_counter_ns()
+    result = fn(obj)
+    return result, perf_counter_ns() - start
+
+
+class _Usage:
+    __slots__ = ("submitted", "completed", "failed", "in_flight", "busy", "first")
+
+    def __init__(self):
+        self.submitted = self.completed = self.failed = self.in_flight = 0
+        self.busy = 0
+        self.first: Optional[int] = None
+
+    def as_dict(self, now: int, workers: Optional[int] = None) -> dict:
+        elapsed = now - self.first if self.first else 0
+        report = {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "busy_seconds": self.busy / 1e9,
+        }
+        if workers:
+            report["workers"] = workers
+            report["utilization"] = self.busy / (elapsed * workers) if elapsed else 0.0
+        return report
+
+
+class Executors:
+    # The router's executors by name plus per-handler and per-executor usage.
+    # "thread" and "process" are created on first use.
+    def __init__(self, metrics: Metrics, executors: Optional[dict] = None):
+        self.metrics = metrics
+        self._executors: dict[str, Executor] = dict(executors or {})
+        self._handlers: dict[str, _Usage] = {}
+        self._pools: dict[str, _Usage] = {}
+
+    def get(self, executor: str | Executor) -> tuple[str, Executor]:
+        if isinstance(executor, Executor):
+            name = f"{type(executor).__name__}@{id(executor):x}"
+            self._executors.setdefault(name, executor)
+            return name, executor
+        if (pool := self._executors.get(executor)) is None:
+            if executor == "thread":
+                pool = ThreadPoolExecutor(thread_name_prefix="phlyght-handler")
+            elif executor == "process":
+                pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+            else:
+                raise ValueError(f"Unknown executor {executor}")
+            self._executors[executor] = pool
+        return executor, pool
+
+    async def run(self, router, handler, obj) -> Any:
+        key, fn, executor, then, payload = handler.__offload__
+        name, pool = self.get(executor)
+        if isinstance(pool, ProcessPoolExecutor):
+            # The entity travels as its set fields; plain data pickles cheaply
+            # and the worker rebuilds the model (or not, for payload="dict").
+            args = (key, type(obj), obj.dict(exclude_unset=True), payload == "dict")
+            call = _invoke_process
+        else:
+            args = (fn, obj.dict(exclude_unset=True) if payload == "dict" else obj)
+            call = _invoke_thread
+
+        usages = (
+            self._handlers.setdefault(handler.__name__, _Usage()),
+            self._pools.setdefault(name, _Usage()),
+        )
+        submitted = perf_counter_ns()
+        for usage in usages:
+            usage.submitted += 1
+            usage.in_flight += 1
+            usage.first = usage.first or submitted
+        try:
+            result, run_ns = await get_running_loop().run_in_executor(pool, call, *args)
+        except Exception:
+            for usage in usages:
+                usage.failed += 1
+            raise
+        finally:
+            for usage in usages:
+                usage.in_flight -= 1
+
+        for usage in usages:
+            usage.completed += 1
+            usage.busy += run_ns
+        if self.metrics.enabled:
+            wait = perf_counter_ns() - submitted - run_ns
+            self.metrics.observe("offload_wait", handler.__name__, max(wait, 0))
+            self.metrics.observe("offload_run", handler.__name__, run_ns)
+
+        commands = [result] if isinstance(result, Command) else result
+        if isinstance(commands, list) and commands and all(
+            isinstance(c, Command) for c in commands
+        ):
+            for cmd in commands:
+                await getattr(router, cmd.method)(*cmd.args, **cmd.kwargs)
+        elif then is not None:
+            await getattr(router, then)(result)
+        return result
+
+    def stats(self) -> dict:
+        now = perf_counter_ns()
+        return {
+            "handlers": {k: u.as_dict(now) for k, u in self._handlers.items()},
+            "executors": {
+                name: usage.as_dict(
+                    now, getattr(self._executors.get(name), "_max_workers", None)
+                )
+                for name, usage in self._pools.items()
+            },
+        }
+
+    def shutdown(self, wait: bool = True):
+        for pool in self._executors.values():
+            pool.shutdown(wait=wait)
+        self._executors.clear()
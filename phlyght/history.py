@@ -0,0 +1,177 @@
+from time import time
+from typing import Any, Callable, Iterable, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ("SensorHistory", "SENSOR_FIELDS")
+
+# Resource type -> (attribute, field) holding the value worth keeping.
+SENSOR_FIELDS = {
+    "temperature": ("temperature", "temperature"),
+    "light_level": ("light", "light_level"),
+    "motion": ("motion", "motion"),
+    "device_power": ("power_state", "battery_level"),
+}
+
+
+class _Rings:
+    # Every sensor of one type is a row of two (rows, capacity) arrays; a row
+    # is a ring buffer with its own write position. Unwritten slots hold NaN
+    # timestamps, so window masks exclude them without a separate count.
+    __slots__ = ("ids", "rows", "times", "values", "heads", "active")
+
+    def __init__(self, capacity: int, rows: int = 8):
+        self.ids: list[str] = []
+        self.rows: dict[str, int] = {}
+        self.times = np.full((rows, capacity), np.nan)
+        self.values = np.full((rows, capacity), np.nan)
+        self.heads = np.zeros(rows, dtype=np.int64)
+        # When each sensor last reported a non-zero value (e.g. motion),
+        # kept apart from the ring so it survives being overwritten.
+        self.active = np.full(rows, np.nan)
+
+    def row(self, rid: str) -> int:
+        if (row := self.rows.get(rid)) is None:
+            row = self.rows[rid] = len(self.ids)
+            self.ids.append(rid)
+            if row == len(self.heads):
+                # Sensors are few and rarely added; doubling keeps that cheap.
+                grow = len(self.heads)
+                self.times = np.vstack((self.times, np.full_like(self.times, np.nan)))
+                self.values = np.vstack((self.values, np.full_like(self.values, np.nan)))
+                self.heads = np.concatenate((self.heads, np.zeros(grow, np.int64)))
+                self.active = np.concatenate((self.active, np.full(grow, np.nan)))
+        return row
+
+    def view(self):
+        n = len(self.ids)
+        return self.times[:n], self.values[:n]
+
+
+class SensorHistory:
+    # Fixed-memory (timestamp, value) history per sensor, fed from the event
+    # stream. Queries take every sensor of a type at once and return arrays
+    # aligned with ids(rtype).
+    def __init__(
+        self,
+        capacity: int = 1024,
+        types: Iterable[str] = tuple(SENSOR_FIELDS),
+        clock: Callable[[], float] = time,
+    ):
+        if np is None:
+            raise ImportError("SensorHistory requires numpy to be installed")
+
+        self.capacity = capacity
+        self.clock = clock
+        self._rings = {rtype: _Rings(capacity) for rtype in types}
+
+    def __contains__(self, rid: str):
+        return any(rid in rings.rows for rings in self._rings.values())
+
+    def __len__(self):
+        return sum(len(rings.ids) for rings in self._rings.values())
+
+    def ids(self, rtype: str) -> list[str]:
+        return list(self._rings[rtype].ids)
+
+    def record(self, rtype: str, rid: str, value: float, stamp: Optional[float] = None):
+        if (rings := self._rings.get(rtype)) is None:
+            return
+        stamp = self.clock() if stamp is None else stamp
+        row = rings.row(rid)
+        pos = rings.heads[row] % self.capacity
+        rings.times[row, pos] = stamp
+        rings.values[row, pos] = value
+        rings.heads[row] += 1
+        if value:
+            rings.active[row] = stamp
+
+    def feed(self, event_type: str, data: dict, stamp: Optional[float] = None):
+        if event_type == "delete" or (field := SENSOR_FIELDS.get(data["type"])) is None:
+            return
+        attr, name = field
+        if (value := (data.get(attr) or {}).get(name)) is not None:
+            self.record(data["type"], str(data["id"]), float(value), stamp)
+
+    def seed(self, index, stamp: Optional[float] = None):
+        # Starts each tracked sensor at its current value from the store.
+        stamp = self.clock() if stamp is None else stamp
+        for rtype in self._rings:
+            if (field := SENSOR_FIELDS.get(rtype)) is None:
+                continue
+            attr, name = field
+            for ent in index.of_type(rtype):
+                value = getattr(getattr(ent, attr, None), name, None)
+                if value is not None:
+                    self.record(rtype, str(ent.id), float(value), stamp)
+
+    def _window(self, rtype: str, window: Optional[float], now: Optional[float]):
+        times, values = self._rings[rtype].view()
+        if window is None:
+            mask = ~np.isnan(times)
+        else:
+            with np.errstate(invalid="ignore"):
+                mask = times >= (self.clock() if now is None else now) - window
+        return times, values, mask
+
+    def latest(self, rtype: str) -> "np.ndarray":
+        rings = self._rings[rtype]
+        n = len(rings.ids)
+        return rings.values[np.arange(n), (rings.heads[:n] - 1) % self.capacity]
+
+    def count(self, rtype: str, window: Optional[float] = None, now=None) -> "np.ndarray":
+        return self._window(rtype, window, now)[2].sum(axis=1)
+
+    def mean(self, rtype: str, window: Optional[float] = None, now=None) -> "np.ndarray":
+        _, values, mask = self._window(rtype, window, now)
+        total = np.where(mask, values, 0.0).sum(axis=1)
+        n = mask.sum(axis=1)
+        return np.divide(total, n, out=np.full(len(n), np.nan), where=n > 0)
+
+    def min(self, rtype: str, window: Optional[float] = None, now=None) -> "np.ndarray":
+        _, values, mask = self._window(rtype, window, now)
+        low = np.where(mask, values, np.inf).min(axis=1, initial=np.inf)
+        return np.where(np.isinf(low), np.nan, low)
+
+    def max(self, rtype: str, window: Optional[float] = None, now=None) -> "np.ndarray":
+        _, values, mask = self._window(rtype, window, now)
+        high = np.where(mask, values, -np.inf).max(axis=1, initial=-np.inf)
+        return np.where(np.isinf(high), np.nan, high)
+
+    def rate(self, rtype: str, window: Optional[float] = None, now=None) -> "np.ndarray":
+        # Change per second between the oldest and newest reading in the
+        # window; NaN for sensors with fewer than two readings in it.
+        times, values, mask = self._window(rtype, window, now)
+        rows = np.arange(len(times))
+        first = np.where(mask, times, np.inf).argmin(axis=1)
+        last = np.where(mask, times, -np.inf).argmax(axis=1)
+        elapsed = times[rows, last] - times[rows, first]
+        change = values[rows, last] - values[rows, first]
+        ok = (mask.sum(axis=1) > 1) & (elapsed > 0)
+        return np.divide(change, elapsed, out=np.full(len(rows), np.nan), where=ok)
+
+    def since_active(self, rtype: str = "motion", now=None) -> "np.ndarray":
+        # Seconds since each sensor last reported a non-zero value (motion,
+        # by default); NaN if it never has.
+        rings = self._rings[rtype]
+        return (self.clock() if now is None else now) - rings.active[: len(rings.ids)]
+
+    def series(self, rtype: str, rid: str) -> tuple["np.ndarray", "np.ndarray"]:
+        # One sensor's readings, oldest first.
+        rings = self._rings[rtype]
+        row = rings.rows[rid]
+        head = int(rings.heads[row])
+        order = np.arange(max(0, head - self.capacity), head) % self.capacity
+        return rings.times[row, order], rings.values[row, order]
+
+    def as_dict(self, rtype: str, values: Iterable[float]) -> dict[Any, float]:
+        return dict(zip(self._rings[rtype].ids, (float(v) for v in values)))
+
+    def nbytes(self) -> int:
+        return sum(
+            r.times.nbytes + r.values.nbytes + r.heads.nbytes + r.active.nbytes
+            for r in self._rings.values()
+        )
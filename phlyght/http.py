@@ -4,19 +4,32 @@ import collections
 from io import StringIO
 from pathlib import Path
 from re import compile as re_compile
-from typing import Any, Iterable, Literal, Optional, TypeVar, Generic
+from typing import Any, Iterable, Literal, Optional
 
-from aiofiles import open as aio_open
-from httpx import AsyncClient, ConnectError, ConnectTimeout, _content
-from httpx._exceptions import ReadTimeout as HTTPxReadTimeout
+from httpx import AsyncClient, TransportError, _content
 from httpcore._exceptions import ReadTimeout
 from pydantic import BaseConfig, BaseModel, Field
-from rich import print
-
-from pydantic.generics import GenericModel
-from yaml import Loader, load, dump as yaml_dump
 
 from .abc import SubRouter
+from .bulk import Batch
+from .compact import EntityRecord, compact
+from .confirm import ConfirmationTracker
+from .handlers import Executors
+from .lanes import LaneScheduler, current_lane, lane
+from .index import STRUCTURAL_FIELDS, EntityIndex, entity_name
+from .polling import Poller
+from .policy import (
+    BridgeUnavailable,
+    CircuitBreaker,
+    RequestPolicy,
+    RetryPolicy,
+    classify,
+)
+from .query import Query
+from .scenes import ScenePlan, plan_scene
+from .record import EventRecorder, EventReplayer
+from . import snapshot
+from .metrics import monotonic_ns
 
 from .utils import (
     IP_RE,
@@ -26,6 +39,7 @@ from .utils import (
     get_data_fields,
     get_url_args,
     ret_cls,
+    rprint,
 )
 
 from . import models
@@ -38,35 +52,32 @@ setattr(_content, "json_dumps", dumps)
 
 UUID_CMP = re_compile(r"^[0-9a-f]{8}-(?:[0-9a-f]{4}-){3}[0-9a-f]{12}$")
 
-try:
-    from yarl import URL as UR
-except ImportError:
-    ...
-
-try:
-    from rich import print  # noqa
-except ImportError:
-    ...
-
-_T = TypeVar("_T")
-
 __all__ = ("Router", "route", "HueAPIv2")
 
 TYPE_CACHE = {}
 
+# Resources whose updates report something happening rather than a state, so
+# a repeat of the same value is still news (another press, another turn).
+EVENT_TYPES = frozenset(("button", "relative_rotary"))
+
+# Returned by _track for an update that changes nothing in the store.
+UNCHANGED = object()
+
 for k, v in HueEntsV2.__dict__.items():
     if k.startswith("__") or not issubclass(v, BaseModel):
         continue
     TYPE_CACHE[getattr(v, "type")] = v
 
 
-class Event(GenericModel, Generic[_T]):
-    class Config:
-        __root__ = _T
-
-    id: str
-    object: _T
-    type: str
+def _rejected(resp) -> bool:
+    # Whether the bridge turned a write down: an error status, or a success
+    # whose body lists errors.
+    if not resp.is_success:
+        return True
+    try:
+        return bool(loads(resp.content).get("errors"))
+    except (ValueError, AttributeError):
+        return False
 
 
 def route(method, endpoint) -> Any:
@@ -78,8 +89,15 @@ def route(method, endpoint) -> Any:
             content: Optional[bytes] = None,
             data: Optional[dict[str, str]] = None,
             params: Optional[dict[str, str]] = None,
+            confirm: Optional[list] = None,
             **kwargs,
         ):
+            metrics = self.metrics
+            # Read once, so the request is timed whole or not at all even if
+            # metrics are switched on or off while it is in flight.
+            enabled = metrics.enabled
+            if enabled:
+                start = monotonic_ns()
             params = params or {}
             data = data or {}
             json = {}
@@ -119,6 +137,10 @@ def route(method, endpoint) -> Any:
             else:
                 new_endpoint = URL(_url_base) / endpoint
 
+            if enabled:
+                key = f"{method} {endpoint}"
+                metrics.observe("request", key, (sent := monotonic_ns()) - start)
+
             if headers and headers.get("Accept", "") == "text/event-stream":
                 return self._client.stream(
                     method,
@@ -129,15 +151,90 @@ def route(method, endpoint) -> Any:
                     headers=headers,
                 )
             else:
-                resp = await self._client.request(
-                    method,
-                    new_endpoint,
-                    content=content,
-                    data=data,
-                    params=params,
-                    headers=headers,
-                    json=json,
-                )
+                if data and method in ("PUT", "POST"):
+                    # The bridge only reads JSON bodies; keyword fields would
+                    # otherwise go out form-encoded.
+                    json, data = json | data, {}
+                # Registered before sending, as the update event can beat the
+                # response; dropped again if the write fails.
+                pending = None
+                if method == "PUT" and url_args and self.confirmations is not None:
+                    pending = self.confirmations.expect(
+                        endpoint.split("/")[2],
+                        next(iter(url_args.values())),
+                        json.keys() | data.keys(),
+                    )
+                    if confirm is not None:
+                        confirm.append(pending)
+
+                try:
+                    policy, lanes, attempt = self.policy, self.lanes, 0
+                    while True:
+                        if policy is not None:
+                            policy.before()
+                        if lanes is not None:
+                            lane_name, queued = current_lane.get(), monotonic_ns()
+                        try:
+                            if (limiter := self.limiter) is not None:
+                                if lanes is not None:
+                                    waited = await lanes.admit(
+                                        lane_name, limiter, method, endpoint
+                                    )
+                                else:
+                                    waited = await limiter.acquire(method, endpoint)
+                                if enabled:
+                                    metrics.observe("throttle", key, int(waited * 1e9))
+                                sent = monotonic_ns()
+                            resp = await self._client.request(
+                                method,
+                                new_endpoint,
+                                content=content,
+                                data=data,
+                                params=params,
+                                headers=headers,
+                                json=json,
+                            )
+                        except TransportError as e:
+                            if limiter is not None:
+                                limiter.feedback(method, endpoint, None, 0.0)
+                            if policy is None:
+                                raise
+                            error = BridgeUnavailable(f"{method} {new_endpoint}: {e!r}")
+                            error.__cause__ = e
+                        except BaseException:
+                            if policy is not None:
+                                policy.abandon()
+                            raise
+                        else:
+                            if limiter is not None:
+                                latency = (monotonic_ns() - sent) / 1e9
+                                limiter.feedback(method, endpoint, resp.status_code, latency)
+                            if enabled:
+                                metrics.observe("http", key, monotonic_ns() - sent)
+                                metrics.count("responses", f"{key} {resp.status_code}")
+                            if policy is None:
+                                break
+                            error = classify(resp)
+                        finally:
+                            if lanes is not None:
+                                lanes.done(lane_name, queued)
+
+                        delay = policy.outcome(method, endpoint, attempt, error, json)
+                        if error is None:
+                            break
+                        if delay is None:
+                            raise error
+                        await sleep(delay)
+                        attempt += 1
+                        if enabled:
+                            sent = monotonic_ns()
+                except BaseException:
+                    if pending is not None:
+                        self.confirmations.discard(pending)
+                    raise
+                if pending is not None and _rejected(resp):
+                    # Nothing will confirm a write the bridge turned down.
+                    self.confirmations.discard(pending)
                 return resp
 
         return sub_wrap
@@ -438,7 +535,7 @@ class HueAPIv2(SubRouter):
         on: Optional[dict[Literal["on"], bool]] = None,
         dimming: Optional[dict[str, Any]] = None,
         dimming_delta: Optional[dict] = None,
-        color_temperature: Optional[int] = None,
+        color_temperature: Optional[dict] = None,
         color_temperature_delta: Optional[dict] = None,
         color: Optional[dict] = None,
         dynamics: Optional[dict] = None,
@@ -655,7 +752,7 @@ class HueAPIv2(SubRouter):
         ...
 
     @ret_cls(HueEntsV2.ZigbeeDeviceDiscovery)
-    @route("GET", " /resource/zigbee_device_discovery/{zigbee_device_discovery_id}")
+    @route("GET", "/resource/zigbee_device_discovery/{zigbee_device_discovery_id}")
     async def get_zigbee_device_discovery(self, zigbee_device_discovery_id: UUID, /):
         ...
 
@@ -696,6 +793,14 @@ class HueAPIv2(SubRouter):
     async def get_resources(self, /):
         ...
 
+    @route("GET", "/resource")
+    async def get_raw_resources(self, /):
+        ...
+
+    @route("GET", "/resource/{rtype}")
+    async def get_raw_resource_type(self, rtype: str, /):
+        ...
+
     @abstractmethod
     async def on_motion_update(self, motion: HueEntsV2.Motion):
         ...
@@ -823,6 +928,7 @@ class Router(HueAPIv2, HueEDK):
             default_factory=dict
         )
         buttons: Optional[dict[str, HueEntsV2.Button]] = Field(default_factory=dict)
+        devices: Optional[dict[str, HueEntsV2.Device]] = Field(default_factory=dict)
         device_powers: Optional[dict[str, HueEntsV2.DevicePower]] = Field(
             default_factory=dict
         )
@@ -838,6 +944,9 @@ class Router(HueAPIv2, HueEDK):
         geolocations: Optional[dict[str, HueEntsV2.Geolocation]] = Field(
             default_factory=dict
         )
+        grouped_lights: Optional[dict[str, HueEntsV2.GroupedLight]] = Field(
+            default_factory=dict
+        )
         lights: Optional[dict[str, HueEntsV2.Light]] = Field(default_factory=dict)
         light_levels: Optional[dict[str, HueEntsV2.LightLevel]] = Field(
             default_factory=dict
@@ -884,10 +993,13 @@ class Router(HueAPIv2, HueEDK):
         return cls
 
     def __init__(self, max_cache_size=10, **kwargs):
-        from .abc import YAMLConfig
+        _config = Path(kwargs.pop("config_path", "config_test.yaml"))
+        if (config := kwargs.pop("config", None)) is not None:
+            self.config = config
+        elif not _config.exists():
+            from yaml import dump as yaml_dump
+            from .config import YAMLConfig
 
-        _config = Path("config_test.yaml")
-        if not _config.exists():
             _config.touch()
             self.config = YAMLConfig(
                 api_key=kwargs.get("api_key", None),
@@ -897,32 +1009,117 @@ class Router(HueAPIv2, HueEDK):
             with _config.open("w+") as f:
                 yaml_dump(self.config, f, default_flow_style=False)
             if not self.config.api_key:
-                print("Please fill out config.yaml with the api_key and bridge_host")
+                rprint("Please fill out config.yaml with the api_key and bridge_host")
                 exit(1)
         else:
+            from yaml import Loader, load
+            from .config import YAMLConfig  # noqa: F401 registers the yaml tag
+
             with _config.open("r+") as f:
                 self.config = load(f, Loader=Loader)
-        super().__init__(kwargs.pop("api_key", None) or self.config.api_key or exit(1))
-        Entity.cache_client(self)
+        super().__init__(
+            kwargs.pop("api_key", None) or self.config.get("api_key") or exit(1)
+        )
         self.cache = LRU(max_cache_size)
-        self._client = AsyncClient(headers=self._headers, verify=False)
+        # A BridgeManager hands every router the same client (and so the same
+        # connection pool); requests carry their own headers either way.
+        self._client = kwargs.pop("client", None) or AsyncClient(
+            headers=self._headers, verify=False, transport=kwargs.pop("transport", None)
+        )
+        self.limiter = kwargs.pop("limiter", None)
+        self._on_event = kwargs.pop("on_event", None)
+        # Updates repeating what the store already holds are dropped before
+        # any model or handler task is made for them, except for handlers
+        # marked with @keep_noops. on_event (and so a BridgeManager's merged
+        # stream) doesn't see them either.
+        self._suppress_noops = kwargs.pop("suppress_noops", True)
+        self.connected = False
+        self.disconnects = 0
+        if kwargs.pop("metrics", False):
+            self.metrics.enable()
+        self.confirmations = ConfirmationTracker(self.metrics)
+        # policy=None sends each request once and hands back whatever comes
+        # of it, as before; by default 429s, 5xx and connection errors are
+        # retried (idempotent methods only) and then raised as BridgeErrors.
+        policy = kwargs.pop("policy", True)
+        if policy is True:
+            policy = RequestPolicy(
+                kwargs.pop("retry", None) or RetryPolicy(),
+                kwargs.pop("breaker", None) or CircuitBreaker(),
+                self.metrics,
+            )
+        self.policy: Optional[RequestPolicy] = policy or None
+        self.executors = Executors(self.metrics, kwargs.pop("executors", None))
+        # Made on first use; see start_profile.
+        self.profiler = None
+        self._profile_dir = kwargs.pop("profile_dir", ".")
+        # lanes="strict" or "weighted" (or a LaneScheduler) queues requests by
+        # priority lane: handler tasks started by the event stream go out in
+        # the interactive lane, discovery, reconciliation, polling and dumps
+        # in the background one, everything else in default.
+        lanes = kwargs.pop("lanes", None)
+        if isinstance(lanes, str):
+            lanes = LaneScheduler(
+                lanes,
+                kwargs.pop("lane_weights", None),
+                kwargs.pop("lane_concurrency", 1),
+            )
+        self.lanes: Optional[LaneScheduler] = lanes
+        if lanes is not None and lanes.metrics is None:
+            lanes.metrics = self.metrics
+        self._recorder: Optional[EventRecorder] = None
+        self._record_path = kwargs.pop("record_events", None)
+        self._snapshot_path = kwargs.pop("snapshot", None)
+        # journal=path persists the store as a snapshot plus an append-only
+        # log of applied events, instead of rewriting it whole on each save.
+        self.journal = None
+        if journal := kwargs.pop("journal", None):
+            from .journal import StateJournal
+
+            self.journal = StateJournal(
+                self,
+                journal,
+                kwargs.pop("journal_flush", 1.0),
+                kwargs.pop("journal_compact", 10000),
+            )
         self._subscription = None
+        # Polling stands in for the event stream when it keeps failing (after
+        # fallback_after attempts), or always with stream=False.
+        self.poller = Poller(
+            self, kwargs.pop("poll_interval", 2.0), kwargs.pop("poll_types", None)
+        )
+        self._stream = kwargs.pop("stream", True)
+        self._fallback_after = kwargs.pop("fallback_after", 3)
         self._bridge_host = f"""https://{(
-            kwargs.pop("bridge_host", None) or self.config.bridge_host or exit(1)
+            kwargs.pop("bridge_host", None) or self.config.get("bridge_host") or exit(1)
         )}"""
         self._tasks = []
         self._entities = self.Aliases()
+        self.index = EntityIndex()
+        self._compact = kwargs.pop("compact", False)
+        # history=True (or a capacity, or a SensorHistory) keeps per-sensor
+        # readings from the event stream; numpy is only imported if asked.
+        self.history = None
+        if history := kwargs.pop("history", None):
+            from .history import SensorHistory
+
+            if isinstance(history, SensorHistory):
+                self.history = history
+            else:
+                self.history = SensorHistory(1024 if history is True else history)
 
         self.behavior_instances = {}
         self.behavior_scripts = {}
         self.bridges = {}
         self.bridge_homes = {}
         self.buttons = {}
+        self.devices = {}
         self.device_powers = {}
         self.entertainments = {}
         self.entertainment_configurations = {}
         self.geofence_clients = {}
         self.geolocations = {}
+        self.grouped_lights = {}
         self.lights = {}
         self.light_levels = {}
         self.motions = {}
@@ -936,6 +1133,9 @@ class Router(HueAPIv2, HueEDK):
         self.zones = {}
 
     def subscribe(self, *args, **kwargs):
+        if not self._stream:
+            self.poller.start()
+            return
         if not self._subscription or self._subscription.done():
             self._subscription = self.new_task(self._subscribe(*args, **kwargs))
 
@@ -950,7 +1150,7 @@ class Router(HueAPIv2, HueEDK):
                 t.cancel()
             for t in self.cache:
                 t.value.cancel()
-            print("Exiting..")
+            rprint("Exiting..")
             loop.stop()
             loop.close()
 
@@ -958,69 +1158,374 @@ class Router(HueAPIv2, HueEDK):
         self._tasks.append(t := get_running_loop().create_task(coro))
         return t
 
+    async def start(self):
+        if self.journal is not None:
+            recovered = self.journal.recover()
+            self.new_task(self.journal.run())
+            if recovered:
+                self.subscribe()
+                self.new_task(self._reconcile())
+                return
+            await self._discover()
+            self.subscribe()
+            await self.journal.compact()
+            return
+
+        if self._snapshot_path and self.load_snapshot():
+            # Usable immediately from the snapshot; the bridge is only asked
+            # for what changed while we were away.
+            self.subscribe()
+            self.new_task(self._reconcile())
+            return
+
+        await self._discover()
+        self.subscribe()
+        if self._snapshot_path:
+            await self.save_snapshot()
+
+    _entity_name = staticmethod(entity_name)
+
+    @staticmethod
+    def _entity_class(plural: str):
+        return Router.Aliases.__fields__[plural].type_
+
+    def _snapshot_entities(self) -> dict[str, dict[str, dict]]:
+        return {
+            plural: {
+                str(name): loads(ent.json(exclude_unset=True))
+                for name, ent in group.items()
+            }
+            for plural, group in self._entities.items()
+            if group
+        }
+
+    async def save_snapshot(self, path: Optional[Path | str] = None):
+        await snapshot.write(
+            path or self._snapshot_path,
+            snapshot.build(self._bridge_host, self._snapshot_entities()),
+        )
+
+    def load_snapshot(
+        self, path: Optional[Path | str] = None, data: Optional[dict] = None
+    ) -> bool:
+        if data is None:
+            data = snapshot.read(path or self._snapshot_path)
+        if not data or data.get("bridge") != self._bridge_host:
+            return False
+
+        for plural, group in data["entities"].items():
+            if plural not in self._entities.keys():
+                continue
+            cls = self._entity_class(plural)
+            for name, raw in group.items():
+                self._entities[plural][name] = ent = cls(**raw)
+                ent._router = self
+
+        for plural, aliases in self.config["aliases"].items():
+            for name, ent in self._entities[plural].items():
+                if name in aliases.values():
+                    getattr(self, plural)[name] = ent
+                    setattr(self, name, ent)
+        self._reindex()
+        return True
+
+    @staticmethod
+    def _is_stale(ent, raw: dict) -> bool:
+        # Whether the bridge's raw resource differs from the stored entity.
+        try:
+            current = getattr(ent, "__model__", type(ent))(**raw)
+        except ValueError:
+            return False
+        return current.dict(exclude_unset=True) != ent.dict(exclude_unset=True)
+
+    @lane("background")
+    async def _reconcile(self):
+        resp = await self.get_raw_resources()
+        fetched = {r["id"]: r for r in loads(resp.content).get("data") or []}
+        known = {
+            str(ent.id): (plural, name, ent)
+            for plural, group in self._entities.items()
+            for name, ent in group.items()
+        }
+        # Changes are fed through _dispatch as synthetic events, which keeps
+        # the store and its indexes up to date the same way the stream does.
+        tasks = []
+        for rid, (plural, name, ent) in known.items():
+            if (raw := fetched.get(rid)) is None:
+                tasks.append(self._dispatch("delete", {"id": rid, "type": ent.type}))
+                continue
+            if self._is_stale(ent, raw):
+                tasks.append(self._dispatch("update", raw))
+
+        for rid, raw in fetched.items():
+            if rid not in known:
+                tasks.append(self._dispatch("add", raw))
+
+        self.cache.extend(*filter(None, tasks))
+        if self.journal is None:
+            await self.save_snapshot()
+
     async def _startup(self):
         try:
             loop = get_running_loop()
-            for k, v in self.config["aliases"].items():
-                fn = getattr(self, f"get_{k}")
-                objs = await fn()
-                for obj in objs:
-                    alias = v.get(str(obj.id))
-                    if alias:
-                        ob = obj.__class__(id=obj.id)
-                        self._entities[k][alias] = ob
-                        getattr(self, k)[alias] = ob
-                        setattr(self, alias, ob)
-                    else:
-                        self._entities[k][obj.metadata.name] = await obj.get()
-
-            cts = collections.Counter()
-            dn = {"devices"}
-            for device in await self.get_devices():
-                for service in device.services:
-                    pl = Entity.get_plural(service.rtype)
-                    dn.add(pl)
-                    if str(service.rid) in self.config["aliases"].get(pl, {}).keys():
-                        continue
-                    cts[service.rtype] += 1
-                    dvc = await getattr(self, f"get_{service.rtype}")(service.rid)
-                    if dvc:
-                        self._entities[pl][
-                            f"{TYPE_CACHE[service.rtype].cfg_prefix}_{cts[service.rtype]}"
-                        ] = dvc[0]
-                for k, v in self._entities.items():
-                    if k not in dn:
-                        dn.add(k)
-                        for itm in await getattr(self, f"get_{k}")():
-                            if str(itm.id) in self.config["aliases"].get(k, {}).keys():
-                                continue
-                            if hasattr(itm, "metadata"):
-                                nm = (
-                                    (
-                                        itm.metadata["name"]
-                                        if isinstance(itm.metadata, dict)
-                                        else itm.metadata.name
-                                    )
-                                    .replace(" ", "_")
-                                    .replace("-", "_")
-                                    .lower()
-                                )
-                                self._entities[k][nm] = itm
-                            else:
-                                self._entities[k][itm.id] = itm
-
-            self.new_task(self._subscribe())
+            await self.start()
 
             while loop.is_running():
                 await sleep(60)
         except KeyboardInterrupt:
             await gather(*self._tasks)
 
+    @lane("background")
+    async def _discover(self):
+        for k, v in self.config["aliases"].items():
+            fn = getattr(self, f"get_{k}")
+            objs = await fn()
+            for obj in objs:
+                alias = v.get(str(obj.id))
+                if alias:
+                    ob = obj.__class__(id=obj.id)
+                    ob._router = self
+                    self._entities[k][alias] = ob
+                    getattr(self, k)[alias] = ob
+                    setattr(self, alias, ob)
+                else:
+                    self._entities[k][obj.metadata.name] = obj
+
+        cts = collections.Counter()
+        dn = {"devices"}
+        for device in await self.get_devices():
+            if str(device.id) not in self.config["aliases"].get("devices", {}).keys():
+                self._entities["devices"][
+                    self._entity_name(device) or str(device.id)
+                ] = device
+            for service in device.services:
+                pl = Entity.get_plural(service.rtype)
+                dn.add(pl)
+                if str(service.rid) in self.config["aliases"].get(pl, {}).keys():
+                    continue
+                cts[service.rtype] += 1
+                dvc = await getattr(self, f"get_{service.rtype}")(service.rid)
+                if dvc:
+                    self._entities[pl][
+                        f"{TYPE_CACHE[service.rtype].cfg_prefix}_{cts[service.rtype]}"
+                    ] = dvc[0]
+        for k, v in self._entities.items():
+            if k not in dn:
+                dn.add(k)
+                for itm in await getattr(self, f"get_{k}")():
+                    if str(itm.id) in self.config["aliases"].get(k, {}).keys():
+                        continue
+                    if nm := self._entity_name(itm):
+                        self._entities[k][nm] = itm
+                    else:
+                        self._entities[k][itm.id] = itm
+        self._reindex()
+
+    def _reindex(self):
+        self.index.clear()
+        for plural, group in self._entities.items():
+            # Aliased entities are the ones user code calls methods on, so
+            # they stay full models even in compact mode.
+            aliased = set(self.config["aliases"].get(plural, {}).values())
+            for name, ent in group.items():
+                if self._compact and name not in aliased:
+                    if not isinstance(ent, EntityRecord):
+                        group[name] = ent = compact(ent)
+                self.index.add(ent)
+        if self.history is not None:
+            self.history.seed(self.index)
+
+    def query(self, rtype: Optional[str] = None, room=None, **predicates) -> Query:
+        # Answered from the local store, e.g.
+        # router.query("light", room="office", on__on=True, dimming__brightness__gt=50)
+        query = Query(self.index, rtype)
+        if room is not None:
+            query = query.within(room)
+        return query.where(**predicates) if predicates else query
+
+    def apply_many(
+        self,
+        items: Iterable[tuple[Any, dict]],
+        /,
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+    ) -> Batch:
+        # Sends set_<type>(entity.id, **changes) for each (entity, changes)
+        # pair, at most `concurrency` at a time and, with rate, within that
+        # many writes per second. Entities may also be ids or names known to
+        # the index.
+        #
+        #     async for result in router.apply_many(pairs, concurrency=4):
+        #         if not result.ok: ...
+        return Batch(self, items, concurrency, rate, burst).start()
+
+    def plan_scene(self, scene, group: bool = True, min_group: int = 2) -> ScenePlan:
+        if not isinstance(scene, Entity) and not hasattr(scene, "actions"):
+            found = self.index.get(scene) or next(
+                iter(self.index.named(str(scene), "scene")), None
+            )
+            if found is None:
+                raise ValueError(f"Unknown scene {scene}")
+            scene = found
+        return plan_scene(self.index, scene, group, min_group)
+
+    async def apply_scene(
+        self,
+        scene,
+        /,
+        transition: Optional[int] = None,
+        group: bool = True,
+        min_group: int = 2,
+    ) -> dict:
+        # Recalls a scene by writing only what differs from the cached light
+        # state instead of every action; returns the plan's report, including
+        # the writes saved against a blind recall.
+        plan = self.plan_scene(scene, group, min_group)
+        extra = {"dynamics": {"duration": transition}} if transition is not None else {}
+        await gather(
+            *(
+                (
+                    self.set_grouped_light(write.rid, **write.payload, **extra)
+                    if write.rtype == "grouped_light"
+                    else self.set_light(write.rid, **write.payload, **extra)
+                )
+                for write in plan.writes
+            )
+        )
+        report = plan.report()
+        self.metrics.count("scene_writes", plan.scene, report["writes"])
+        self.metrics.count("scene_writes_saved", plan.scene, report["saved"])
+        return report
+
+    def _track(self, event_type: str, data: dict):
+        # Applies an event to the local store and its indexes, returning the
+        # stored entity (None if it isn't tracked).
+        index = self.index
+        if event_type == "update":
+            if (ent := index.get(data["id"])) is not None:
+                if not ent.apply_delta(data):
+                    return UNCHANGED
+                if not STRUCTURAL_FIELDS.isdisjoint(data):
+                    index.add(ent)
+            return ent
+        if event_type == "add":
+            cls = TYPE_CACHE.get(data["type"])
+            plural = Entity.get_plural(data["type"])
+            if cls is None or plural not in self._entities.keys():
+                return None
+            try:
+                ent = cls(**data)
+            except ValueError:
+                return None
+            ent._router = self
+            if self._compact:
+                ent = compact(ent)
+            self._entities[plural][self._entity_name(ent) or data["id"]] = ent
+            index.add(ent)
+            return ent
+        if event_type == "delete" and (ent := index.remove(data["id"])) is not None:
+            for _, group in self._entities.items():
+                for name in [n for n, e in group.items() if e is ent]:
+                    del group[name]
+            return ent
+        return None
+
     async def dump_state(self):
+        if self.journal is not None:
+            # Only what changed since the last flush is written.
+            return await self.journal.flush()
+
+        from aiofiles import open as aio_open
+
         async with aio_open("state.json", "w+") as f:
             await f.write(dumps(self._entities, indent=4, sort_keys=True))
 
+    async def serve_metrics(self, host: str = "127.0.0.1", port: int = 9464):
+        # Also serves /profile?seconds=N&mode=sample|cprofile and
+        # /profile/stop, so a running process can be profiled with curl.
+        self.metrics.enable()
+        return await self.metrics.serve(
+            host,
+            port,
+            routes={"/profile": self._profile_route, "/profile/stop": self._stop_route},
+        )
+
+    async def _profile_route(self, query: str):
+        from urllib.parse import parse_qs
+
+        args = {k: v[-1] for k, v in parse_qs(query).items()}
+        try:
+            self.start_profile(float(args.get("seconds", 30)), args.get("mode", "sample"))
+        except (RuntimeError, ValueError) as e:
+            return "409 Conflict", "text/plain", f"{e}\n"
+        return "200 OK", "application/json", dumps(self.profiler.stats())
+
+    async def _stop_route(self, _query: str):
+        path = self.stop_profile()
+        return "200 OK", "application/json", dumps({"path": path and str(path)})
+
+    def start_profile(
+        self,
+        seconds: Optional[float] = None,
+        mode: str = "sample",
+        path: Optional[Path | str] = None,
+    ) -> Path:
+        # Samples (or, with mode="cprofile", traces) the event loop until
+        # stop_profile() or for `seconds`; returns where the profile will be
+        # written. Costs nothing until called.
+        if self.profiler is None:
+            from .profiling import Profiler
+
+            self.profiler = Profiler(directory=self._profile_dir)
+        return self.profiler.start(seconds, mode, path)
+
+    def stop_profile(self) -> Optional[Path]:
+        return self.profiler.stop() if self.profiler is not None else None
+
+    async def profile(
+        self,
+        seconds: float = 10.0,
+        mode: str = "sample",
+        path: Optional[Path | str] = None,
+    ) -> Path:
+        self.start_profile(None, mode, path)
+        try:
+            await sleep(seconds)
+        finally:
+            path = self.stop_profile()
+        return path
+
+    def profile_on_signal(
+        self, signum: Optional[int] = None, seconds: float = 30.0, mode: str = "sample"
+    ):
+        # `kill -USR1 <pid>` starts a profile for seconds; a second signal
+        # stops it early.
+        if signum is None:
+            from signal import SIGUSR1 as signum
+
+        def toggle():
+            if self.profiler is not None and self.profiler.running:
+                path = self.stop_profile()
+            else:
+                path = self.start_profile(seconds, mode)
+            rprint(f"Profile: {path}")
+
+        get_running_loop().add_signal_handler(signum, toggle)
+
+    async def _timed_handler(self, handler, obj, received: int):
+        metrics = self.metrics
+        name = handler.__name__
+        metrics.observe("event_lag", name, (start := monotonic_ns()) - received)
+        try:
+            return await handler(obj)
+        finally:
+            metrics.observe("handler", name, monotonic_ns() - start)
+
     def _parse_payload(self, payload: bytes):
+        metrics = self.metrics
+        enabled = metrics.enabled
+        received = monotonic_ns() if enabled else 0
         _match = MSG_RE_BYTES.search(payload)
         if not _match:
             return None
@@ -1030,23 +1535,74 @@ class Router(HueAPIv2, HueEDK):
         _evs = []
         for _event in _events:
             for _ent in _event["data"]:
-                _event_id = _id.decode()
-                _event_type = _event["type"]
-                if hasattr(self, f"on_{_ent['type']}_{_event['type']}"):
-                    _object = TYPE_CACHE[_ent["type"]](**_ent)
-                    event = Event(id=_event_id, object=_object, type=_event_type)
-                    # if hasattr(self, f"on_{event.object.type}_{event.type}"):
-                    _evs.append(
-                        _t := get_running_loop().create_task(
-                            getattr(self, f"on_{event.object.type}_{event.type}")(
-                                _object
-                            )
-                        )
-                    )
+                if _t := self._dispatch(_event["type"], _ent, _id.decode(), received):
+                    _evs.append(_t)
 
         self.cache.extend(*_evs)
+        if enabled:
+            metrics.observe("sse_parse", "payload", monotonic_ns() - received)
+
+    def _dispatch(self, event_type: str, data: dict, event_id: str = "", received=0):
+        if event_type == "update":
+            self.confirmations.observe(data["type"], data["id"], data.keys())
+        metrics = self.metrics
+        enabled = metrics.enabled
+        if enabled:
+            start = monotonic_ns()
+        stored = self._track(event_type, data)
+        if enabled:
+            metrics.observe("store", data["type"], monotonic_ns() - start)
+        # History samples every reading, repeats included: a steady value is
+        # still a reading, so it is fed before no-ops are suppressed.
+        if self.history is not None:
+            self.history.feed(event_type, data)
+        if stored is UNCHANGED:
+            stored = self.index.get(data["id"])
+            if self._suppress_noops and data["type"] not in EVENT_TYPES:
+                return self._dispatch_noop(data, stored, received)
+        elif stored is not None and self.journal is not None:
+            self.journal.append(event_type, data)
+        if self._on_event is not None:
+            self._on_event(event_type, data, stored)
+        handler = getattr(self, f"on_{data['type']}_{event_type}", None)
+        if handler is None or (cls := TYPE_CACHE.get(data["type"])) is None:
+            return None
 
+        if enabled:
+            start = monotonic_ns()
+        # Handlers for add events get the stored entity; updates still get the
+        # delta as sent, and deletes an object carrying just the id.
+        if event_type == "add" and isinstance(stored, Entity):
+            _object = stored
+        else:
+            _object = cls(**data)
+            _object._router = self
+        if enabled:
+            metrics.observe("validate", cls.__name__, monotonic_ns() - start)
+        return get_running_loop().create_task(
+            self._timed_handler(handler, _object, received or start)
+            if enabled
+            else handler(_object)
+        )
+
+    def _dispatch_noop(self, data: dict, stored, received=0):
+        handler = getattr(self, f"on_{data['type']}_update", None)
+        if handler is None or not getattr(handler, "__keep_noops__", False):
+            self.metrics.count("noops_suppressed", data["type"])
+            return None
+        obj = TYPE_CACHE[data["type"]](**data)
+        obj._router = self
+        return get_running_loop().create_task(
+            self._timed_handler(handler, obj, received or monotonic_ns())
+            if self.metrics.enabled
+            else handler(obj)
+        )
+
+    @lane("background")
     async def dump(self, filename: Optional[Path | str] = None):
+        from aiofiles import open as aio_open
+        from yaml import dump as yaml_dump
+
         aliases = {}
         for key, sub_val in self._entities.items():
             defa = 0
@@ -1088,18 +1644,52 @@ class Router(HueAPIv2, HueEDK):
         await f.write(buf.getvalue())
         await f.close()
 
+    async def record(self, path: Path | str, **kwargs) -> EventRecorder:
+        await self.stop_recording()
+        self._recorder = await EventRecorder(path, **kwargs).open()
+        return self._recorder
+
+    async def stop_recording(self):
+        if self._recorder is not None:
+            recorder, self._recorder = self._recorder, None
+            await recorder.close()
+
+    async def replay(self, path: Path | str, speed: Optional[float] = 1.0) -> dict:
+        return await EventReplayer(path).replay(self, speed)
+
     async def _subscribe(self, *args, **kwargs):
+        # Handler tasks started from here inherit the lane.
+        current_lane.set("interactive")
+        if self._record_path and self._recorder is None:
+            await self.record(self._record_path)
         if hasattr(self, "on_ready"):
             self.new_task(self.on_ready())
+        failures = 0
         while get_running_loop().is_running():
             try:
                 stream = await self.listen_events(
                     headers={**self._headers, **{"Accept": "text/event-stream"}}
                 )
                 async with stream as _iter:
-                    async for msg in _iter.aiter_bytes():
-                        self._parse_payload(msg)
-
-            except (ReadTimeout, HTTPxReadTimeout, ConnectTimeout, ConnectError):
+                    if _iter.status_code == 200:
+                        self.connected = True
+                        async for msg in _iter.aiter_bytes():
+                            if failures:
+                                # Events are flowing again.
+                                failures = 0
+                                self.poller.stop()
+                            if self._recorder is not None:
+                                self._recorder.write(msg)
+                            self._parse_payload(msg)
+
+            except (ReadTimeout, TransportError):
+                # Covers httpx's connect and read timeouts and proxies that
+                # cut the stream.
                 ...
+            if self.connected:
+                self.connected = False
+                self.disconnects += 1
+            failures += 1
+            if failures >= self._fallback_after and not self.poller.running:
+                self.poller.start()
             await sleep(1)
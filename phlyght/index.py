@@ -0,0 +1,226 @@
+from collections import defaultdict
+from typing import Iterable, Optional
+
+__all__ = ("EntityIndex", "entity_name", "STRUCTURAL_FIELDS")
+
+# Update events touching any of these change how entities relate to each other
+# (or what they're called); anything else leaves the indexes alone.
+STRUCTURAL_FIELDS = frozenset(
+    ("owner", "services", "service", "children", "metadata", "group")
+)
+GROUP_TYPES = frozenset(("room", "zone", "bridge_home"))
+_NONE = (None, None, None, frozenset(), frozenset())
+
+
+def entity_name(ent) -> Optional[str]:
+    nm = getattr(ent, "metadata", None)
+    if isinstance(nm, dict):
+        nm = nm.get("name")
+    elif nm is not None:
+        nm = getattr(nm, "name", None)
+    return nm.replace(" ", "_").replace("-", "_").lower() if nm else None
+
+
+def _rids(idents) -> frozenset[str]:
+    return frozenset(str(i.rid) for i in idents or () if i is not None)
+
+
+class EntityIndex:
+    # Secondary indexes over the router's entity store, keyed by the string
+    # form of resource ids. Relations are recorded as each entity declares
+    # them (a device lists its services, a service names its owner, a group
+    # lists its children) so that removing or re-indexing one entity only
+    # undoes what that entity contributed.
+    def __init__(self, entities: Iterable = ()):
+        self.by_id: dict[str, object] = {}
+        self.by_type: dict[str, set[str]] = defaultdict(set)
+        self.by_name: dict[str, set[str]] = defaultdict(set)
+        self._declared: dict[str, tuple] = {}
+        self._services: dict[str, set[str]] = defaultdict(set)
+        self._owner: dict[str, str] = {}
+        self._children: dict[str, frozenset[str]] = {}
+        self._parents: dict[str, set[str]] = defaultdict(set)
+        self._members: dict[str, dict[str, frozenset[str]]] = {}
+        for ent in entities:
+            self.add(ent)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, rid) -> bool:
+        return str(rid) in self.by_id
+
+    def get(self, rid):
+        return self.by_id.get(str(rid))
+
+    def clear(self):
+        self.__init__()
+
+    def add(self, ent):
+        # Also used to re-index an entity after a structural update.
+        rid = str(ent.id)
+        if rid in self._declared:
+            self._unlink(rid)
+        self.by_id[rid] = ent
+        if (owner := getattr(ent, "owner", None)) is not None:
+            owner = str(owner.rid) if owner.rtype != "unknown" else None
+        services = _rids(getattr(ent, "services", None))
+        children = _rids(getattr(ent, "children", None))
+        declared = (ent.type, entity_name(ent), owner, services, children)
+        self._declared[rid] = declared
+        self._link(rid, declared)
+
+    def remove(self, rid):
+        rid = str(rid)
+        if (ent := self.by_id.pop(rid, None)) is not None:
+            self._unlink(rid)
+        return ent
+
+    def _link(self, rid: str, declared: tuple):
+        rtype, name, owner, services, children = declared
+        self.by_type[rtype].add(rid)
+        if name:
+            self.by_name[name].add(rid)
+        if owner:
+            self._owner[rid] = owner
+            self._services[owner].add(rid)
+        for service in services:
+            self._owner.setdefault(service, rid)
+            self._services[rid].add(service)
+        if children:
+            self._children[rid] = children
+            for child in children:
+                self._parents[child].add(rid)
+        self._invalidate(rid)
+
+    def _unlink(self, rid: str):
+        rtype, name, owner, services, children = self._declared.pop(rid)
+        self._invalidate(rid)
+        self.by_type[rtype].discard(rid)
+        if name:
+            self.by_name[name].discard(rid)
+        # An owner link survives while the other side still declares it.
+        if owner and rid not in self._declared.get(owner, _NONE)[3]:
+            if self._owner.get(rid) == owner:
+                del self._owner[rid]
+            self._services[owner].discard(rid)
+        for service in services:
+            if self._declared.get(service, _NONE)[2] == rid:
+                continue
+            if self._owner.get(service) == rid:
+                del self._owner[service]
+            self._services[rid].discard(service)
+        self._children.pop(rid, None)
+        for child in children:
+            self._parents[child].discard(rid)
+
+    def _invalidate(self, rid: str):
+        # Drop memoised member sets for every group that contains rid,
+        # directly, through its owning device or through a nested group.
+        stack, seen = [rid], set()
+        while stack:
+            if (node := stack.pop()) in seen:
+                continue
+            seen.add(node)
+            self._members.pop(node, None)
+            stack.extend(self._parents.get(node, ()))
+            if owner := self._owner.get(node):
+                stack.append(owner)
+
+    def _resolve(self, rids) -> list:
+        by_id = self.by_id
+        return [ent for rid in rids if (ent := by_id.get(rid)) is not None]
+
+    def ids(self, rtype: str) -> set[str]:
+        return self.by_type.get(rtype, set())
+
+    def of_type(self, rtype: str) -> list:
+        return self._resolve(self.ids(rtype))
+
+    def named(self, name: str, rtype: Optional[str] = None) -> list:
+        ids = self.by_name.get(name.replace(" ", "_").replace("-", "_").lower(), ())
+        ents = self._resolve(ids)
+        return [e for e in ents if e.type == rtype] if rtype else ents
+
+    def owner(self, rid):
+        return self.by_id.get(self._owner.get(str(rid)))
+
+    def device(self, rid):
+        # Walks up the owner chain, e.g. device_power -> device.
+        rid, seen = str(rid), set()
+        while rid is not None and rid not in seen:
+            seen.add(rid)
+            if (ent := self.by_id.get(rid)) is not None and ent.type == "device":
+                return ent
+            rid = self._owner.get(rid)
+        return None
+
+    def services(self, rid, rtype: Optional[str] = None) -> list:
+        ents = self._resolve(self._services.get(str(rid), ()))
+        return [e for e in ents if e.type == rtype] if rtype else ents
+
+    def sibling(self, rid, rtype: str):
+        # The first service of rtype on the same device, e.g. a motion
+        # sensor's device_power.
+        if (device := self.device(rid)) is None:
+            return None
+        return next(iter(self.services(device.id, rtype)), None)
+
+    def children(self, rid) -> list:
+        return self._resolve(self._children.get(str(rid), ()))
+
+    def parents(self, rid) -> list:
+        return self._resolve(self._parents.get(str(rid), ()))
+
+    def member_ids(self, group, rtype: str = "light") -> frozenset[str]:
+        # Ids of rtype inside group, following nested groups and the services
+        # of member devices.
+        rid = str(group)
+        if (members := self._members.get(rid, {}).get(rtype)) is not None:
+            return members
+        found, stack, seen = set(), [rid], set()
+        while stack:
+            if (node := stack.pop()) in seen:
+                continue
+            seen.add(node)
+            ent = self.by_id.get(node)
+            if ent is not None and ent.type == rtype and node != rid:
+                found.add(node)
+                continue
+            stack.extend(self._children.get(node, ()))
+            if ent is not None and ent.type == "device":
+                stack.extend(self._services.get(node, ()))
+        members = self._members.setdefault(rid, {})[rtype] = frozenset(found)
+        return members
+
+    def light_ids(self, group) -> frozenset[str]:
+        return self.member_ids(group, "light")
+
+    def lights_in(self, group) -> list:
+        return self._resolve(self.light_ids(group))
+
+    def group(self, ref):
+        # A room, zone or bridge home by id or name.
+        if (ent := self.get(ref)) is not None:
+            return ent if ent.type in GROUP_TYPES else None
+        return next((e for e in self.named(str(ref)) if e.type in GROUP_TYPES), None)
+
+    def groups_of(self, rid, rtype: Optional[str] = None) -> list:
+        # Every room, zone (and the bridge home) containing rid, directly or
+        # through its device.
+        found, stack, seen = [], [str(rid)], set()
+        while stack:
+            if (node := stack.pop()) in seen:
+                continue
+            seen.add(node)
+            ent = self.by_id.get(node)
+            if ent is not None and ent.type in GROUP_TYPES and node != str(rid):
+                if rtype is None or ent.type == rtype:
+                    found.append(ent)
+            stack.extend(self._parents.get(node, ()))
+            if owner := self._owner.get(node):
+                stack.append(owner)
+        return found
+
+    def room_of(self, rid):
+        return next(iter(self.groups_of(rid, "room")), None)
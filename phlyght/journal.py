@@ -0,0 +1,179 @@
+from asyncio import Lock, get_running_loop, sleep
+from os import O_RDONLY, close, fsync, open as os_open, replace
+from pathlib import Path
+from typing import Optional
+
+from . import snapshot
+
+try:
+    from ujson import dumps, loads
+except ImportError:
+    from json import dumps, loads
+
+__all__ = ("StateJournal",)
+
+
+def _fsync_dir(path: Path):
+    # Makes a rename durable, not just atomic.
+    try:
+        fd = os_open(path.parent or ".", O_RDONLY)
+    except OSError:
+        return
+    try:
+        fsync(fd)
+    except OSError:
+        ...
+    finally:
+        close(fd)
+
+
+def _write_file(path: Path, data: bytes):
+    # Written beside the target, fsynced and renamed over it.
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        fsync(f.fileno())
+    replace(tmp, path)
+    _fsync_dir(path)
+
+
+class StateJournal:
+    # The store persisted as a snapshot plus an append-only log of the events
+    # applied since, one `[seq, event_type, data]` JSON line each. Appends are
+    # buffered and written with one fsync per flush_interval; every
+    # compact_every entries the store is written as a fresh snapshot (tagged
+    # with the last seq it covers) and the log is cut down to what came after.
+    # A crash at any point leaves a snapshot and a log that replay to the
+    # latest flushed state: entries the snapshot already covers are skipped
+    # and a torn final line is dropped.
+    def __init__(
+        self,
+        router,
+        path: Path | str,
+        flush_interval: float = 1.0,
+        compact_every: int = 10000,
+    ):
+        self.router = router
+        self.path = Path(path)
+        self.log_path = self.path.with_name(self.path.name + ".journal")
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.seq = 0
+        self.entries = 0
+        self._buffer: list[bytes] = []
+        # While a compaction writes its snapshot, later entries are kept here
+        # too so they can start the next log.
+        self._tail: Optional[list[bytes]] = None
+        self._file = None
+        self._lock = Lock()
+        self.flushes = self.compactions = self.bytes = self.replayed = 0
+
+    def append(self, event_type: str, data: dict):
+        self.seq += 1
+        line = dumps([self.seq, event_type, data]).encode() + b"\n"
+        self._buffer.append(line)
+        if self._tail is not None:
+            self._tail.append(line)
+        self.entries += 1
+
+    def _write(self, chunk: bytes):
+        if self._file is None:
+            self._file = open(self.log_path, "ab")
+        self._file.write(chunk)
+        self._file.flush()
+        fsync(self._file.fileno())
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            chunk = b"".join(self._buffer)
+            self._buffer.clear()
+            await get_running_loop().run_in_executor(None, self._write, chunk)
+            self.flushes += 1
+            self.bytes += len(chunk)
+
+    def _swap_log(self, chunk: bytes):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        _write_file(self.log_path, chunk)
+
+    async def compact(self):
+        # Costs O(state), so it runs every compact_every entries rather than
+        # on each save.
+        router = self.router
+        async with self._lock:
+            payload = snapshot.build(router._bridge_host, router._snapshot_entities())
+            payload["journal_seq"] = covered = self.seq
+            pending, self._buffer, self._tail = self._buffer, [], []
+            loop = get_running_loop()
+            try:
+                await loop.run_in_executor(
+                    None, _write_file, self.path, snapshot.encode(payload)
+                )
+            except BaseException:
+                # The old snapshot and log are intact; keep logging to them.
+                self._buffer, self._tail = pending + self._tail, None
+                raise
+            # Everything after `covered` starts the new log.
+            tail, self._tail = self._tail, None
+            self._buffer.clear()
+            await loop.run_in_executor(None, self._swap_log, b"".join(tail))
+            self.entries = len(tail)
+            self.compactions += 1
+        return covered
+
+    def recover(self) -> bool:
+        # Loads the snapshot into the router and replays the log over it;
+        # False if there is no usable snapshot for this bridge.
+        router = self.router
+        data = snapshot.read(self.path)
+        if data is None or not router.load_snapshot(data=data):
+            return False
+        covered = data.get("journal_seq", 0)
+        self.seq = covered
+        good = 0
+        if self.log_path.exists():
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    try:
+                        seq, event_type, event = loads(line)
+                    except ValueError:
+                        # A torn write from a crash ends the log.
+                        break
+                    good += len(line)
+                    if seq <= covered:
+                        continue
+                    router._track(event_type, event)
+                    self.seq = seq
+                    self.replayed += 1
+            with open(self.log_path, "r+b") as f:
+                f.truncate(good)
+        self.entries = self.seq - covered
+        return True
+
+    async def run(self):
+        while True:
+            await sleep(self.flush_interval)
+            await self.flush()
+            if self.entries >= self.compact_every:
+                await self.compact()
+
+    async def close(self):
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "seq": self.seq,
+            "entries": self.entries,
+            "pending": len(self._buffer),
+            "flushes": self.flushes,
+            "compactions": self.compactions,
+            "bytes": self.bytes,
+            "replayed": self.replayed,
+        }
@@ -0,0 +1,174 @@
+from asyncio import CancelledError, Future, get_running_loop
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from .limits import budget_of
+from .metrics import Histogram, Metrics, monotonic_ns
+
+__all__ = ("LANES", "lane", "current_lane", "LaneScheduler")
+
+# Highest priority first.
+LANES = ("interactive", "default", "background")
+WEIGHTS = {"interactive": 8, "default": 3, "background": 1}
+
+# The lane requests made from the current task go out in. Tasks inherit it
+# from whoever created them, so handler tasks started by the event stream
+# reader are interactive and those started by a background sync are not.
+current_lane: ContextVar[str] = ContextVar("phlyght_lane", default="default")
+
+
+class lane:
+    # Sends the requests made inside it in the named lane:
+    #
+    #     with lane("background"):
+    #         await router.get_scenes()
+    #
+    # or, around a whole coroutine function, @lane("interactive").
+    __slots__ = ("name", "_token")
+
+    def __init__(self, name: str):
+        if name not in LANES:
+            raise ValueError(f"Unknown lane {name!r}, expected one of {LANES}")
+        self.name = name
+        self._token = None
+
+    def __enter__(self):
+        self._token = current_lane.set(self.name)
+        return self
+
+    def __exit__(self, *_):
+        current_lane.reset(self._token)
+
+    def __call__(self, fn):
+        @wraps(fn)
+        async def wrapped(*args, **kwargs):
+            token = current_lane.set(self.name)
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                current_lane.reset(token)
+
+        return wrapped
+
+
+class _Gate:
+    __slots__ = ("queues", "credit", "active")
+
+    def __init__(self):
+        self.queues: dict[str, deque[Future]] = {name: deque() for name in LANES}
+        self.credit = dict.fromkeys(LANES, 0)
+        self.active = 0
+
+
+class LaneScheduler:
+    # Orders requests by lane where they queue: at the rate limiter. Only
+    # `concurrency` requests wait on each limiter budget at once; the rest
+    # queue here, and whenever one gets its token the next is picked by lane.
+    # "strict" always picks the highest waiting lane, "weighted" shares turns
+    # between waiting lanes by weight (smooth weighted round robin) so
+    # background traffic still moves under constant interactive load.
+    # Without a limiter nothing queues and lanes only report latencies.
+    def __init__(
+        self,
+        mode: str = "strict",
+        weights: Optional[dict[str, int]] = None,
+        concurrency: int = 1,
+        metrics: Optional[Metrics] = None,
+    ):
+        if mode not in ("strict", "weighted"):
+            raise ValueError(f"Unknown scheduling mode {mode!r}")
+        self.mode = mode
+        self.weights = WEIGHTS | (weights or {})
+        self.concurrency = max(1, concurrency)
+        self.metrics = metrics
+        self._gates: dict[str, _Gate] = {}
+        self.waits = {name: Histogram() for name in LANES}
+        self.latencies = {name: Histogram() for name in LANES}
+
+    def queued(self, name: Optional[str] = None) -> int:
+        return sum(
+            len(q)
+            for gate in self._gates.values()
+            for lane_name, q in gate.queues.items()
+            if name is None or lane_name == name
+        )
+
+    def _next(self, gate: _Gate) -> Optional[str]:
+        ready = [name for name in LANES if gate.queues[name]]
+        if not ready or self.mode == "strict":
+            return ready[0] if ready else None
+        credit, total = gate.credit, 0
+        for name in ready:
+            credit[name] += self.weights[name]
+            total += self.weights[name]
+        chosen = max(ready, key=credit.__getitem__)
+        credit[chosen] -= total
+        return chosen
+
+    def _release(self, gate: _Gate):
+        gate.active -= 1
+        while gate.active < self.concurrency and (name := self._next(gate)):
+            gate.active += 1
+            gate.queues[name].popleft().set_result(None)
+
+    async def _acquire(self, gate: _Gate, name: str) -> int:
+        if gate.active < self.concurrency and not any(gate.queues.values()):
+            gate.active += 1
+            return 0
+        start = monotonic_ns()
+        future = get_running_loop().create_future()
+        gate.queues[name].append(future)
+        try:
+            await future
+        except CancelledError:
+            if future.cancelled():
+                gate.queues[name].remove(future)
+            else:
+                # Granted just as it was cancelled; pass the turn on.
+                self._release(gate)
+            raise
+        return monotonic_ns() - start
+
+    async def admit(self, name: str, limiter, method: str, endpoint: str) -> float:
+        # limiter.acquire(method, endpoint) once it is this request's turn;
+        # returns the seconds waited in all.
+        key = budget_of(method, endpoint) if hasattr(limiter, "budgets") else ""
+        if (gate := self._gates.get(key)) is None:
+            gate = self._gates[key] = _Gate()
+        waited = await self._acquire(gate, name)
+        try:
+            throttled = await limiter.acquire(method, endpoint)
+        finally:
+            self._release(gate)
+        self.waits[name].observe(waited)
+        if self.metrics is not None and self.metrics.enabled:
+            self.metrics.observe("lane_wait", name, waited)
+        return waited / 1e9 + throttled
+
+    def done(self, name: str, queued: int):
+        # queued is when the request reached route, so this is its latency
+        # through the lane, waits included.
+        elapsed = monotonic_ns() - queued
+        self.latencies[name].observe(elapsed)
+        if self.metrics is not None and self.metrics.enabled:
+            self.metrics.observe("lane", name, elapsed)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "concurrency": self.concurrency,
+            "lanes": {
+                name: {
+                    "queued": self.queued(name),
+                    "requests": self.latencies[name].count,
+                    "wait_p50": self.waits[name].quantile(0.5),
+                    "wait_p99": self.waits[name].quantile(0.99),
+                    "p50": self.latencies[name].quantile(0.5),
+                    "p90": self.latencies[name].quantile(0.9),
+                    "p99": self.latencies[name].quantile(0.99),
+                }
+                for name in LANES
+            },
+        }
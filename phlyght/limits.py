@@ -0,0 +1,249 @@
+from asyncio import Lock, sleep
+from collections import deque
+from time import monotonic
+from typing import Optional
+
+__all__ = ("RateLimiter", "AdaptiveLimiter", "budget_of")
+
+
+class RateLimiter:
+    # Token bucket shared by every request a router sends. Waiters queue on a
+    # lock so they are released in arrival order at the configured rate.
+    __slots__ = ("rate", "burst", "tokens", "stamp", "acquired", "waited", "_lock")
+
+    def __init__(self, rate: float = 10.0, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.stamp = monotonic()
+        self.acquired = 0
+        self.waited = 0.0
+        self._lock = Lock()
+
+    def _refill(self):
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.acquired += 1
+            return True
+        return False
+
+    async def acquire(self, method: str = "", endpoint: str = "") -> float:
+        # Returns the seconds spent waiting for a token.
+        if not self._lock.locked() and self.try_acquire():
+            return 0.0
+        start = monotonic()
+        async with self._lock:
+            while not self.try_acquire():
+                await sleep((1 - self.tokens) / self.rate)
+        waited = monotonic() - start
+        self.waited += waited
+        return waited
+
+    def feedback(
+        self, method: str, endpoint: str, status: Optional[int], latency: float
+    ):
+        # A static bucket doesn't learn from responses.
+        ...
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "acquired": self.acquired,
+            "waited": self.waited,
+        }
+
+
+def budget_of(method: str, endpoint: str) -> str:
+    # Commands to lights and to grouped lights have separate budgets on the
+    # bridge (grouped writes fan out over Zigbee and are far more costly);
+    # reads and everything else share a third.
+    if method != "GET":
+        if endpoint.startswith("/resource/light/"):
+            return "light"
+        if endpoint.startswith("/resource/grouped_light/"):
+            return "grouped_light"
+    return "other"
+
+
+class _AIMD:
+    # One adaptive budget: a token bucket whose rate grows additively while
+    # responses are healthy and is cut multiplicatively on overload.
+    __slots__ = (
+        "bucket",
+        "min_rate",
+        "max_rate",
+        "increase",
+        "decrease",
+        "cooldown",
+        "latency_target",
+        "samples",
+        "baseline",
+        "p95",
+        "cut",
+        "accepted",
+        "window",
+        "goodput",
+        "increases",
+        "decreases",
+        "errors",
+    )
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase: float,
+        decrease: float,
+        cooldown: float,
+        latency_target: Optional[float],
+        window: int,
+    ):
+        self.bucket = RateLimiter(rate, 1.0)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.latency_target = latency_target
+        self.samples: deque[float] = deque(maxlen=window)
+        self.baseline: Optional[float] = None
+        self.p95 = 0.0
+        self.cut = 0.0
+        self.accepted = 0
+        self.window = monotonic()
+        self.goodput: Optional[float] = None
+        self.increases = self.decreases = self.errors = 0
+
+    def _set(self, rate: float):
+        rate = min(self.max_rate, max(self.min_rate, rate))
+        self.bucket._refill()
+        self.bucket.rate = rate
+        # Bursts are what trip the bridge's limiter, so stay close to even
+        # spacing whatever the rate.
+        self.bucket.burst = max(1.0, rate / 4)
+        self.bucket.tokens = min(self.bucket.tokens, self.bucket.burst)
+
+    def _back_off(self, now: float):
+        # One cut per cooldown: a burst of 429s is one signal, not twenty.
+        if now - self.cut >= self.cooldown:
+            self.cut = now
+            self.decreases += 1
+            # Cut from what actually got through if that's lower: the rate
+            # may have run well past the bridge while its burst lasted.
+            rate = self.bucket.rate
+            if self.goodput is not None:
+                rate = min(rate, self.goodput)
+            self._set(rate * self.decrease)
+            self.samples.clear()
+
+    def observe(self, status: Optional[int], latency: float):
+        now = monotonic()
+        if status is None or status == 429 or status >= 500:
+            self.errors += 1
+            self._back_off(now)
+            return
+
+        self.accepted += 1
+        if (elapsed := now - self.window) >= 1.0:
+            self.goodput = self.accepted / elapsed
+            self.accepted, self.window = 0, now
+
+        samples = self.samples
+        samples.append(latency)
+        if len(samples) == samples.maxlen:
+            ordered = sorted(samples)
+            self.p95 = ordered[int(len(ordered) * 0.95)]
+            median = ordered[len(ordered) // 2]
+            self.baseline = min(self.baseline or median, median)
+            samples.clear()
+            # Sub-100ms jitter isn't congestion on any bridge.
+            target = self.latency_target or max(0.1, 3 * self.baseline)
+            if self.p95 > target:
+                self._back_off(now)
+                return
+        if now - self.cut >= self.cooldown:
+            self.increases += 1
+            if not self.decreases:
+                # Slow start: until the first overload the rate grows by half
+                # of itself per second, so a fast bridge is found quickly.
+                self._set(self.bucket.rate + 0.5)
+            else:
+                # Then +increase requests/s per second of healthy traffic.
+                self._set(self.bucket.rate + self.increase / self.bucket.rate)
+
+    def stats(self) -> dict:
+        return {
+            **self.bucket.stats(),
+            "goodput": self.goodput,
+            "p95": self.p95,
+            "baseline": self.baseline,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "errors": self.errors,
+        }
+
+
+class AdaptiveLimiter:
+    # Drop-in for RateLimiter (Router(limiter=AdaptiveLimiter())) that learns
+    # what the bridge can take. Each budget (see budget_of) runs AIMD on its
+    # own rate: it climbs while responses are fast and successful, and is
+    # cut by `decrease` on a 429, 5xx, connection error or a p95 latency well
+    # above the best seen so far (or above latency_target, if given).
+    def __init__(
+        self,
+        rates: Optional[dict[str, float]] = None,
+        max_rates: Optional[dict[str, float]] = None,
+        min_rate: float = 0.5,
+        increase: float = 2.0,
+        decrease: float = 0.7,
+        cooldown: float = 1.0,
+        latency_target: Optional[float] = None,
+        window: int = 20,
+    ):
+        rates = {"light": 10.0, "grouped_light": 1.0, "other": 10.0} | (rates or {})
+        max_rates = {"light": 50.0, "grouped_light": 10.0, "other": 50.0} | (
+            max_rates or {}
+        )
+        self.budgets = {
+            name: _AIMD(
+                rate,
+                min(min_rate, rate),
+                max_rates.get(name, rate),
+                increase,
+                decrease,
+                cooldown,
+                latency_target,
+                window,
+            )
+            for name, rate in rates.items()
+        }
+
+    @property
+    def acquired(self) -> int:
+        return sum(b.bucket.acquired for b in self.budgets.values())
+
+    @property
+    def waited(self) -> float:
+        return sum(b.bucket.waited for b in self.budgets.values())
+
+    def rate(self, budget: str) -> float:
+        return self.budgets[budget].bucket.rate
+
+    async def acquire(self, method: str = "", endpoint: str = "") -> float:
+        return await self.budgets[budget_of(method, endpoint)].bucket.acquire()
+
+    def feedback(
+        self, method: str, endpoint: str, status: Optional[int], latency: float
+    ):
+        self.budgets[budget_of(method, endpoint)].observe(status, latency)
+
+    def stats(self) -> dict:
+        return {name: budget.stats() for name, budget in self.budgets.items()}
@@ -0,0 +1,299 @@
+from asyncio import Queue, QueueEmpty, QueueFull, gather
+from functools import partial
+from time import monotonic, monotonic_ns
+from typing import Any, AsyncIterator, Optional
+
+from httpx import AsyncBaseTransport, AsyncClient, AsyncHTTPTransport, Limits
+
+from .http import Router
+from .limits import RateLimiter
+from .metrics import Metrics
+
+try:
+    from ujson import dumps
+except ImportError:
+    from json import dumps
+
+__all__ = ("BridgeManager", "BridgeEvent")
+
+
+class BridgeEvent:
+    __slots__ = ("bridge", "type", "rtype", "id", "data", "entity", "received")
+
+    def __init__(self, bridge: str, event_type: str, data: dict, entity: Any):
+        self.bridge = bridge
+        self.type = event_type
+        self.rtype = data["type"]
+        self.id = data["id"]
+        self.data = data
+        self.entity = entity
+        self.received = monotonic_ns()
+
+    def __repr__(self):
+        return f"<BridgeEvent {self.bridge} {self.type} {self.rtype} {self.id}>"
+
+
+class _BridgeStats:
+    __slots__ = (
+        "state",
+        "error",
+        "events",
+        "dropped",
+        "started",
+        "last_event",
+        "_rate_events",
+        "_rate_stamp",
+    )
+
+    def __init__(self):
+        self.state = "added"
+        self.error: Optional[str] = None
+        self.events = 0
+        self.dropped = 0
+        self.started = self._rate_stamp = monotonic()
+        self.last_event: Optional[float] = None
+        self._rate_events = 0
+
+    def rate(self, now: float) -> float:
+        # Events per second since the previous call.
+        elapsed = now - self._rate_stamp
+        rate = (self.events - self._rate_events) / elapsed if elapsed > 0 else 0.0
+        self._rate_events, self._rate_stamp = self.events, now
+        return rate
+
+
+class _HostTransport(AsyncBaseTransport):
+    # Routes requests to a per-bridge transport (e.g. a simulator) when one
+    # was given, otherwise to the shared pooled transport.
+    def __init__(self, default: AsyncBaseTransport):
+        self.default = default
+        self.transports: dict[str, AsyncBaseTransport] = {}
+
+    async def handle_async_request(self, request):
+        transport = self.transports.get(request.url.host, self.default)
+        return await transport.handle_async_request(request)
+
+    async def aclose(self):
+        for transport in {self.default, *self.transports.values()}:
+            await transport.aclose()
+
+
+class BridgeManager:
+    # Hosts one Router per bridge on the running loop. All routers share one
+    # AsyncClient, so max_connections is a budget for the whole site; each
+    # bridge gets its own rate limiter since the limits are per bridge.
+    # Updates a router drops as no-ops never reach the merged event stream;
+    # add(..., suppress_noops=False) for a bridge whose stream should carry
+    # every update the bridge sends.
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive: Optional[int] = None,
+        rate: float = 10.0,
+        burst: Optional[float] = None,
+        router_cls: type = Router,
+        metrics: bool = False,
+        queue_size: Optional[int] = 10000,
+    ):
+        self.max_connections = max_connections
+        self.rate = rate
+        self.burst = burst
+        self.router_cls = router_cls
+        self.metrics = Metrics(metrics)
+        self._transport = _HostTransport(
+            AsyncHTTPTransport(
+                verify=False,
+                limits=Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive or max_connections,
+                ),
+            )
+        )
+        self.client = AsyncClient(verify=False, transport=self._transport)
+        self.routers: dict[str, Router] = {}
+        self._stats: dict[str, _BridgeStats] = {}
+        # queue_size=None turns the merged stream off; health is still tracked.
+        self._queue: Optional[Queue[BridgeEvent]] = (
+            Queue(queue_size) if queue_size is not None else None
+        )
+
+    def __getitem__(self, bridge_id: str) -> Router:
+        return self.routers[bridge_id]
+
+    def __len__(self):
+        return len(self.routers)
+
+    def add(
+        self,
+        bridge_id: str,
+        bridge_host: str,
+        api_key: str,
+        router_cls: Optional[type] = None,
+        transport: Optional[AsyncBaseTransport] = None,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        **kwargs,
+    ) -> Router:
+        if bridge_id in self.routers:
+            raise ValueError(f"Bridge {bridge_id} is already managed")
+        if transport is not None:
+            self._transport.transports[bridge_host] = transport
+        config = {
+            "api_key": api_key,
+            "bridge_host": bridge_host,
+            "aliases": kwargs.pop("aliases", {}),
+        }
+        router = (router_cls or self.router_cls)(
+            config=config,
+            client=self.client,
+            limiter=RateLimiter(rate or self.rate, burst or self.burst),
+            on_event=partial(self._on_event, bridge_id),
+            metrics=self.metrics.enabled,
+            **kwargs,
+        )
+        self.routers[bridge_id] = router
+        self._stats[bridge_id] = _BridgeStats()
+        return router
+
+    async def start(self):
+        # Bridges start concurrently; one failing doesn't hold up the rest.
+        await gather(*(self._start(bid) for bid in self.routers))
+
+    async def _start(self, bridge_id: str):
+        stats = self._stats[bridge_id]
+        if stats.state in ("starting", "running"):
+            return
+        stats.state, stats.started = "starting", monotonic()
+        try:
+            await self.routers[bridge_id].start()
+        except Exception as e:
+            stats.state, stats.error = "failed", repr(e)
+            self.metrics.count("bridge_failures", bridge_id)
+        else:
+            stats.state = "running"
+
+    async def stop(self):
+        for router in self.routers.values():
+            await router.stop_recording()
+            for task in router._tasks:
+                task.cancel()
+        for stats in self._stats.values():
+            stats.state = "stopped"
+        await self.client.aclose()
+
+    def _on_event(self, bridge_id: str, event_type: str, data: dict, entity):
+        stats = self._stats[bridge_id]
+        stats.events += 1
+        stats.last_event = monotonic()
+        if self._queue is None:
+            return
+        event = BridgeEvent(bridge_id, event_type, data, entity)
+        try:
+            self._queue.put_nowait(event)
+        except QueueFull:
+            # A slow consumer loses the oldest events rather than stalling
+            # every bridge's stream reader.
+            try:
+                self._stats[self._queue.get_nowait().bridge].dropped += 1
+            except QueueEmpty:
+                ...
+            self._queue.put_nowait(event)
+
+    async def events(self) -> AsyncIterator[BridgeEvent]:
+        if self._queue is None:
+            raise ValueError("The merged event stream is disabled (queue_size=None)")
+        while True:
+            yield await self._queue.get()
+
+    def __aiter__(self):
+        return self.events()
+
+    def health(self) -> dict[str, dict]:
+        now = monotonic()
+        report = {}
+        for bridge_id, router in self.routers.items():
+            stats = self._stats[bridge_id]
+            limiter = router.limiter
+            report[bridge_id] = {
+                "host": router._bridge_host,
+                "state": stats.state,
+                "error": stats.error,
+                "connected": router.connected,
+                "polling": router.poller.running,
+                "disconnects": router.disconnects,
+                "entities": len(router.index),
+                "events": stats.events,
+                "events_per_sec": stats.rate(now),
+                "dropped": stats.dropped,
+                "last_event_age": (
+                    now - stats.last_event if stats.last_event is not None else None
+                ),
+                "breaker": router.policy.breaker.state if router.policy else None,
+                "breaker_open": router.policy is not None
+                and router.policy.breaker.state != "closed",
+                "noops_suppressed": sum(
+                    router.metrics.counters.get("noops_suppressed", {}).values()
+                ),
+                "requests": limiter.acquired,
+                "throttled_seconds": limiter.waited,
+                "uptime": now - stats.started,
+            }
+        return report
+
+    def snapshot(self) -> dict:
+        bridges = self.health()
+        return {
+            "bridges": bridges,
+            "total": {
+                "bridges": len(bridges),
+                "running": sum(b["state"] == "running" for b in bridges.values()),
+                "connected": sum(b["connected"] for b in bridges.values()),
+                "events": sum(b["events"] for b in bridges.values()),
+                "events_per_sec": sum(b["events_per_sec"] for b in bridges.values()),
+                "dropped": sum(b["dropped"] for b in bridges.values()),
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "max_connections": self.max_connections,
+            },
+        }
+
+    def prometheus(self, prefix: str = "phlyght") -> str:
+        lines, seen = [], set()
+        for bridge_id, router in self.routers.items():
+            label = f'bridge="{bridge_id}",'
+            for line in router.metrics.prometheus(prefix).splitlines():
+                if line.startswith("#"):
+                    if line not in seen:
+                        seen.add(line)
+                        lines.append(line)
+                else:
+                    lines.append(line.replace("{", "{" + label, 1))
+        health = self.health()
+        for name in (
+            "connected",
+            "events",
+            "dropped",
+            "requests",
+            "throttled_seconds",
+            "entities",
+            "breaker_open",
+        ):
+            lines.append(f"# TYPE {prefix}_bridge_{name} gauge")
+            for bridge_id, values in health.items():
+                lines.append(
+                    f'{prefix}_bridge_{name}{{bridge="{bridge_id}"}} '
+                    f"{float(values[name] or 0)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    async def serve_metrics(self, host: str = "127.0.0.1", port: int = 9464):
+        async def metrics_route(_query):
+            return "200 OK", "text/plain; version=0.0.4", self.prometheus()
+
+        async def health_route(_query):
+            return "200 OK", "application/json", dumps(self.snapshot())
+
+        for router in self.routers.values():
+            router.metrics.enable()
+        return await self.metrics.serve(
+            host, port, routes={"/metrics": metrics_route, "/health": health_route}
+        )
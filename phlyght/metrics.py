@@ -0,0 +1,174 @@
+from asyncio import start_server
+from bisect import bisect_left
+from time import monotonic_ns
+from typing import Callable, Optional
+
+__all__ = ("Metrics", "Histogram", "monotonic_ns")
+
+# Upper bounds in nanoseconds: 10us doubling up to ~10.5s.
+BUCKETS = tuple(10_000 * 2**i for i in range(21))
+
+STAGES = {
+    "request": "Time spent building a request in route",
+    "http": "HTTP round trip to the bridge",
+    "throttle": "Time a request waited on the bridge rate limiter",
+    "decode": "JSON decode of a response in ret_cls",
+    "validate": "Model construction and validation",
+    "store": "Applying an event to the local store and indexes",
+    "sse_parse": "Parse of one event stream payload",
+    "event_lag": "Delay between payload receipt and handler start",
+    "handler": "Handler run time",
+    "offload_wait": "Time an offloaded handler queued for an executor worker",
+    "offload_run": "Offloaded handler run time inside the executor",
+    "lane_wait": "Time a request queued for a slot in its priority lane",
+    "lane": "Request latency through its priority lane, queueing included",
+    "poll": "Time to fetch and diff one polling round",
+    "poll_detect": "Upper bound on how old a change was when a poll found it",
+    "confirm": "Delay between a write and its update event",
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, ns: int):
+        self.counts[bisect_left(BUCKETS, ns)] += 1
+        self.sum += ns
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation, in seconds.
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound / 1e9
+        return float("inf")
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum / 1e9,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                **{f"{b / 1e9:g}": n for b, n in zip(BUCKETS, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class Metrics:
+    # Call sites check `enabled` before taking any timestamps, so a disabled
+    # instance costs one attribute lookup per stage.
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: dict[str, dict[str, Histogram]] = {}
+        self.counters: dict[str, dict[str, int]] = {}
+        self.hooks: list[Callable[[str, str, int], None]] = []
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def add_hook(self, hook: Callable[[str, str, int], None]):
+        self.hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def observe(self, stage: str, key: str, ns: int):
+        stage_hists = self.histograms.setdefault(stage, {})
+        if (hist := stage_hists.get(key)) is None:
+            hist = stage_hists[key] = Histogram()
+        hist.observe(ns)
+        for hook in self.hooks:
+            hook(stage, key, ns)
+
+    def count(self, name: str, key: str = "", n: int = 1):
+        counters = self.counters.setdefault(name, {})
+        counters[key] = counters.get(key, 0) + n
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "histograms": {
+                stage: {k: h.as_dict() for k, h in hists.items()}
+                for stage, hists in self.histograms.items()
+            },
+            "counters": {name: dict(c) for name, c in self.counters.items()},
+        }
+
+    def prometheus(self, prefix: str = "phlyght") -> str:
+        lines = []
+        for stage, hists in sorted(self.histograms.items()):
+            name = f"{prefix}_{stage}_seconds"
+            if stage in STAGES:
+                lines.append(f"# HELP {name} {STAGES[stage]}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, hist in sorted(hists.items()):
+                label = _escape(key)
+                seen = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    seen += n
+                    lines.append(
+                        f'{name}_bucket{{key="{label}",le="{bound / 1e9:g}"}} {seen}'
+                    )
+                lines.append(f'{name}_bucket{{key="{label}",le="+Inf"}} {hist.count}')
+                lines.append(f'{name}_sum{{key="{label}"}} {hist.sum / 1e9}')
+                lines.append(f'{name}_count{{key="{label}"}} {hist.count}')
+        for counter, values in sorted(self.counters.items()):
+            name = f"{prefix}_{counter}_total"
+            lines.append(f"# TYPE {name} counter")
+            for key, n in sorted(values.items()):
+                lines.append(f'{name}{{key="{_escape(key)}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9464, routes=None):
+        # Minimal HTTP/1.0 responder; enough for a Prometheus scrape or curl.
+        routes = {"/metrics": self._metrics_route} | (routes or {})
+
+        async def handle(reader, writer):
+            try:
+                request = (await reader.readline()).decode("latin-1").split()
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    ...
+                path, _, query = (request[1] if len(request) > 1 else "/").partition(
+                    "?"
+                )
+                if fn := routes.get(path):
+                    status, ctype, body = await fn(query)
+                else:
+                    status, ctype, body = "404 Not Found", "text/plain", "not found\n"
+                data = body.encode()
+                writer.write(
+                    f"HTTP/1.0 {status}\r\nContent-Type: {ctype}\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+            finally:
+                writer.close()
+
+        return await start_server(handle, host, port)
+
+    async def _metrics_route(self, _query: Optional[str] = None):
+        return "200 OK", "text/plain; version=0.0.4", self.prometheus()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,8 +1,9 @@
 from typing import Any, Literal, Optional, Type, ClassVar, TypeVar
 from uuid import UUID as _UUID, uuid4
 from enum import Enum, auto
+from weakref import WeakValueDictionary
 
-from pydantic import BaseConfig, BaseModel, Field
+from pydantic import BaseConfig, BaseModel, Field, PrivateAttr
 from pydantic.dataclasses import dataclass
 import ujson
 
@@ -58,15 +59,90 @@ class HueConfig(BaseConfig):
     allow_mutation = True
 
 
+# Intern tables for ids seen at decode time. The set of distinct ids on a
+# bridge is small and stable, so every response and event resolves to the
+# same objects and id comparisons in handlers are identity checks.
+_UUIDS: WeakValueDictionary = WeakValueDictionary()
+_IDENTIFIERS: WeakValueDictionary = WeakValueDictionary()
+
+
 class UUID(_UUID):
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.intern
+
+    @classmethod
+    def intern(cls, value) -> "UUID":
+        key = value if isinstance(value, str) else str(value)
+        if (found := _UUIDS.get(key)) is not None:
+            return found
+        uid = value if type(value) is cls else cls(key)
+        uid = _UUIDS.setdefault(canonical := str(uid), uid)
+        if key != canonical:
+            _UUIDS[key] = uid
+        return uid
+
+    def __eq__(self, other):
+        return self is other or super().__eq__(other)
+
+    __hash__ = _UUID.__hash__
+
     def __json__(self):
-        return self.__str__()
+        return f'"{self}"'
 
 
 def validate(*args, **kwargs):
     return kwargs
 
 
+_FIELD_KEYS: dict[type, dict] = {}
+
+
+def _field_keys(cls) -> dict:
+    # Field lookup by name and alias; event payloads use the wire names.
+    if (keys := _FIELD_KEYS.get(cls)) is None:
+        keys = {**{f.alias: f for f in cls.__fields__.values()}, **cls.__fields__}
+        _FIELD_KEYS[cls] = keys
+    return keys
+
+
+def merge_delta(model: BaseModel, data: dict) -> bool:
+    # Merges a partial payload (as sent in update events) into model in place.
+    # Nested models are merged rather than replaced so fields the delta leaves
+    # out keep their values. Keys that don't validate are skipped but count as
+    # a change, since nothing was compared for them.
+    cls = type(model)
+    keys = _field_keys(cls)
+    values = model.__dict__
+    changed = False
+    for key, value in data.items():
+        if key in ("id", "type"):
+            continue
+        if (field := keys.get(key)) is None:
+            changed = True
+            continue
+        current = values.get(field.name)
+        if (
+            isinstance(value, dict)
+            and isinstance(current, BaseModel)
+            and not getattr(current, "__interned__", False)
+        ):
+            if merge_delta(current, value):
+                model.__fields_set__.add(field.name)
+                changed = True
+            continue
+        value, errors = field.validate(value, values, loc=key, cls=cls)
+        if errors:
+            changed = True
+            continue
+        if value == current:
+            continue
+        values[field.name] = value
+        model.__fields_set__.add(field.name)
+        changed = True
+    return changed
+
+
 class Entity(BaseModel):
     __module__ = "phlyght"
     __cache__: ClassVar[dict[str, Type]] = {}
@@ -76,10 +152,17 @@ class Entity(BaseModel):
     type: ClassVar[str] = "unknown"
     Config = HueConfig
     __config__ = HueConfig
-
-    @classmethod
-    def cache_client(cls, client):
-        Entity.client = client
+    # The router that decoded or stores this entity; get/update/delete go to
+    # its bridge. Set by the router, never serialised.
+    _router: Any = PrivateAttr(None)
+
+    @property
+    def client(self):
+        if (router := self._router) is None:
+            raise RuntimeError(
+                f"{type(self).__name__} {self.id} doesn't belong to a router"
+            )
+        return router
 
     @classmethod
     def get_entities(cls) -> dict[str, Type]:
@@ -108,11 +191,24 @@ class Entity(BaseModel):
 
         await getattr(self.client, f"create_{self.type}")(self)
 
-    async def update(self, **kwargs):
+    async def update(
+        self, wait_confirmed: bool = False, timeout: Optional[float] = 5.0, **kwargs
+    ):
         for k, v in kwargs.items():
             if hasattr(self, k) and getattr(self, k) != v:
                 setattr(self, k, v)
-        await getattr(self.client, f"set_{self.type}")(self.id, self)
+        confirm = []
+        ret = await getattr(self.client, f"set_{self.type}")(
+            self.id, self, confirm=confirm
+        )
+        if wait_confirmed and confirm and not confirm[0].future.cancelled():
+            # Resolves with the confirmation latency in seconds once the bridge
+            # reports the change on the event stream; raises TimeoutError.
+            return await self.client.confirmations.wait(confirm[0], timeout)
+        return ret
+
+    def apply_delta(self, data: dict) -> bool:
+        return merge_delta(self, data)
 
     async def delete(self):
         if _fn := getattr(self.client, f"delete_{self.type}", None):
@@ -259,7 +355,7 @@ class _XY:
 
     def __json__(self):
         return (
-            '{"y":' + f'{int(10000*self.x)/10000}, "x": {int(10000*self.y)/10000}' + "}"
+            '{"x":' + f'{round(self.x, 4)}, "y": {round(self.y, 4)}' + "}"
         )
 
 
@@ -396,10 +492,31 @@ class Attributes:
         points_capable: Optional[int] = Field(default=1, ge=0, le=255)
 
     class Identifier(BaseAttribute):
-
+        # Decoded identifiers are interned (see UUID.intern) and shared between
+        # every entity referencing them, so they are read-only.
+        __slots__ = ("__weakref__",)
+        __interned__ = True
         rid: UUID = Field(default_factory=default_uuid)
         rtype: str = "unknown"
 
+        @classmethod
+        def validate(cls, value):
+            if isinstance(value, dict) and isinstance(rid := value.get("rid"), str):
+                key = (rid, value.get("rtype", "unknown"))
+                if (found := _IDENTIFIERS.get(key)) is not None:
+                    return found
+            if type(value) is cls:
+                ident = value
+            else:
+                ident = super().validate(value)
+            return _IDENTIFIERS.setdefault((str(ident.rid), ident.rtype), ident)
+
+        def __setattr__(self, name, value):
+            raise TypeError(f'"{type(self).__name__}" is immutable')
+
+        def __hash__(self):
+            return hash((self.rid, self.rtype))
+
     class LightColor(BaseAttribute):
         xy: Optional[XY] = Field(default_factory=lambda: _XY(x=0.0, y=0.0))
 
@@ -514,7 +631,7 @@ class Attributes:
         position: "Attributes.XYZ" = Field(
             default_factory=lambda: Attributes.XYZ(x=0.0, y=0.0, z=0.0)
         )
-        positions: list[Type["Attributes.XYZ"]] = Field(max_items=2, min_items=1)
+        positions: list["Attributes.XYZ"] = Field(default_factory=list)
 
     class StreamProxy(BaseAttribute):
         mode: Literal["auto", "manual"] = "manual"
@@ -678,6 +795,26 @@ class HueEntsV2:
         )
         light_services: list[Attributes.Identifier] = Field(default_factory=list)
         cfg_prefix: ClassVar[str] = "ent_cfg_"
+        # source -> (the list it was built from, index). Updates replace the
+        # list rather than edit it, so identity says whether it is current.
+        _spatial: dict = PrivateAttr(default_factory=dict)
+
+        def spatial_index(self, source: Literal["channels", "locations"] = "channels"):
+            from .spatial import SpatialIndex
+
+            if source == "locations":
+                built_from = self.locations.service_location
+            else:
+                built_from = self.channels
+            cached = self._spatial.get(source)
+            if cached is not None and cached[0] is built_from:
+                return cached[1]
+            if source == "locations":
+                index = SpatialIndex.from_locations(self)
+            else:
+                index = SpatialIndex.from_channels(self)
+            self._spatial[source] = (built_from, index)
+            return index
 
     class GeofenceClient(Entity):
         type: ClassVar[str] = "geofence_client"
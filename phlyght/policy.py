@@ -0,0 +1,232 @@
+from random import random
+from time import monotonic
+from typing import Optional
+
+from .metrics import Metrics
+
+__all__ = (
+    "BridgeError",
+    "BridgeUnavailable",
+    "RateLimited",
+    "CircuitOpen",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "RequestPolicy",
+)
+
+# Methods that leave the bridge in the same state however often they run.
+IDEMPOTENT = frozenset(("GET", "HEAD", "PUT", "DELETE", "OPTIONS"))
+
+
+def idempotent(method: str, body: Optional[dict] = None) -> bool:
+    # A PUT is, unless it carries a relative change (dimming_delta,
+    # color_temperature_delta, ...): those step from whatever the bridge
+    # holds, so sending one twice applies it twice. A "stop" steps nowhere.
+    if method == "PUT" and body:
+        for key, value in body.items():
+            if key.endswith("_delta") and value:
+                if not isinstance(value, dict) or value.get("action") != "stop":
+                    return False
+    return method in IDEMPOTENT
+
+
+class BridgeError(Exception):
+    reason = "error"
+
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class BridgeUnavailable(BridgeError):
+    # Connection failures, timeouts and 5xx: the bridge is rebooting,
+    # overloaded or gone.
+    reason = "unavailable"
+
+
+class RateLimited(BridgeError):
+    reason = "rate_limited"
+
+
+class CircuitOpen(BridgeError):
+    # Raised without sending anything while the breaker is open.
+    reason = "circuit_open"
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def classify(response) -> Optional[BridgeError]:
+    # The error a response stands for, or None for anything the caller
+    # should see as is (including other 4xx, which retrying won't fix).
+    status = response.status_code
+    if status == 429:
+        cls = RateLimited
+    elif status >= 500:
+        cls = BridgeUnavailable
+    else:
+        return None
+    return cls(
+        f"{response.request.method} {response.request.url.path} -> {status}",
+        status,
+        _retry_after(response.headers.get("Retry-After")),
+    )
+
+
+class RetryPolicy:
+    __slots__ = ("attempts", "base", "cap", "idempotent_only")
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base: float = 0.25,
+        cap: float = 10.0,
+        idempotent_only: bool = True,
+    ):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.idempotent_only = idempotent_only
+
+    def delay(self, attempt: int, error: BridgeError) -> Optional[float]:
+        # Seconds to wait before retry number attempt + 1, or None to give up.
+        # Full jitter on an exponential backoff, but never sooner than the
+        # bridge's Retry-After.
+        if attempt + 1 >= self.attempts or isinstance(error, CircuitOpen):
+            return None
+        backoff = random() * min(self.cap, self.base * 2**attempt)
+        if error.retry_after is not None:
+            backoff = max(backoff, error.retry_after)
+        # A Retry-After beyond cap is waited out for cap, not given up on.
+        return min(backoff, self.cap)
+
+    def allows(
+        self, method: str, error: BridgeError, body: Optional[dict] = None
+    ) -> bool:
+        # A 429 was refused before it did anything, so it is safe to resend
+        # whatever the request; other failures may have been half-applied.
+        return (
+            not self.idempotent_only
+            or isinstance(error, RateLimited)
+            or idempotent(method, body)
+        )
+
+
+class CircuitBreaker:
+    # closed -> open after `threshold` consecutive unavailable errors; open
+    # sheds every request for `reset` seconds, then half-open lets one probe
+    # through, whose outcome closes or re-opens the breaker.
+    __slots__ = (
+        "threshold",
+        "reset",
+        "state",
+        "failures",
+        "opened",
+        "_probing",
+        "metrics",
+    )
+
+    def __init__(
+        self, threshold: int = 5, reset: float = 10.0, metrics: Optional[Metrics] = None
+    ):
+        self.threshold = threshold
+        self.reset = reset
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0.0
+        self._probing = False
+        self.metrics = metrics
+
+    def _move(self, state: str):
+        if state != self.state:
+            self.state = state
+            if self.metrics is not None:
+                self.metrics.count("breaker_transitions", state)
+
+    def check(self):
+        if self.state == "open":
+            if monotonic() - self.opened < self.reset:
+                raise CircuitOpen("circuit open, bridge unavailable")
+            self._move("half_open")
+        if self.state == "half_open":
+            if self._probing:
+                raise CircuitOpen("circuit half-open, probe in flight")
+            self._probing = True
+
+    def success(self):
+        self.failures = 0
+        self._probing = False
+        self._move("closed")
+
+    def failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.opened = monotonic()
+            self._move("open")
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
+
+
+class RequestPolicy:
+    # What route consults around every (non-stream) request.
+    __slots__ = ("retry", "breaker", "metrics")
+
+    def __init__(
+        self,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = self.breaker.metrics = metrics
+
+    def before(self):
+        try:
+            self.breaker.check()
+        except CircuitOpen:
+            if self.metrics is not None:
+                self.metrics.count("request_errors", CircuitOpen.reason)
+            raise
+
+    def outcome(
+        self, method: str, endpoint: str, attempt: int, error, body=None
+    ) -> Optional[float]:
+        # Records a request's outcome; for an error, returns the delay before
+        # retrying or None if it should be raised.
+        if error is None:
+            self.breaker.success()
+            return None
+        if isinstance(error, BridgeUnavailable):
+            self.breaker.failure()
+        elif self.breaker.state == "half_open":
+            # A 429 probe still shows the bridge is up.
+            self.breaker.success()
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.count("request_errors", error.reason)
+        if not self.retry.allows(method, error, body):
+            return None
+        delay = self.retry.delay(attempt, error)
+        if delay is not None and metrics is not None:
+            metrics.count("retries", f"{method} {endpoint} {error.reason}")
+        return delay
+
+    def abandon(self):
+        # The request was cancelled; a half-open probe didn't prove anything.
+        self.breaker._probing = False
+
+    def stats(self) -> dict:
+        return self.breaker.stats()
@@ -0,0 +1,138 @@
+from asyncio import Task, get_running_loop, sleep
+from typing import Iterable, Optional
+
+from .lanes import current_lane, lane
+from .metrics import monotonic_ns
+
+try:
+    from ujson import dumps, loads
+except ImportError:
+    from json import dumps, loads
+
+__all__ = ("Poller",)
+
+
+class Poller:
+    # Stands in for the event stream by polling the bridge. Each resource's
+    # raw JSON is hashed; only resources whose hash changed (or appeared, or
+    # vanished) are turned into add/update/delete events and dispatched like
+    # stream events, so nothing else is decoded into models.
+    def __init__(
+        self, router, interval: float = 2.0, types: Optional[Iterable[str]] = None
+    ):
+        self.router = router
+        self.interval = interval
+        self.types = tuple(types) if types else None
+        self.hashes: dict[str, tuple[str, int]] = {}
+        self.task: Optional[Task] = None
+        self.polls = 0
+        self.changes = 0
+        self.bytes = 0
+        self.busy = 0
+        self.last_poll = 0
+        self.last_duration = 0
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self):
+        if not self.running:
+            self.task = get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self.running:
+            self.task.cancel()
+        self.task = None
+
+    async def _run(self):
+        # Changes found stand in for stream events, so their handlers are
+        # interactive; the fetches themselves are not.
+        current_lane.set("interactive")
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                self.router.metrics.count("poll_errors", type(e).__name__)
+            await sleep(self.interval)
+
+    @lane("background")
+    async def _fetch(self) -> list[bytes]:
+        if self.types is None:
+            return [(await self.router.get_raw_resources()).content]
+        return [
+            (await self.router.get_raw_resource_type(rtype)).content
+            for rtype in self.types
+        ]
+
+    async def poll(self) -> int:
+        # One round; returns the number of changes dispatched.
+        router = self.router
+        metrics = router.metrics
+        start = monotonic_ns()
+        # A change found now happened at most this long ago.
+        stale = start - self.last_poll if self.last_poll else 0
+        bodies = await self._fetch()
+        fetched_at = monotonic_ns()
+
+        seen, found = set(), []
+        first = not self.hashes
+        for body in bodies:
+            self.bytes += len(body)
+            for raw in loads(body).get("data") or ():
+                rid, rtype = raw["id"], raw["type"]
+                seen.add(rid)
+                digest = hash(dumps(raw))
+                previous = self.hashes.get(rid)
+                self.hashes[rid] = (rtype, digest)
+                if previous is None:
+                    # The first round is the baseline; what the store already
+                    # holds is only dispatched if it changed while the stream
+                    # was down.
+                    if not first or (ent := router.index.get(rid)) is None:
+                        found.append(("add", raw))
+                    elif router._is_stale(ent, raw):
+                        found.append(("update", raw))
+                elif previous[1] != digest:
+                    found.append(("update", raw))
+
+        for rid in [rid for rid in self.hashes if rid not in seen]:
+            rtype, _ = self.hashes.pop(rid)
+            found.append(("delete", {"id": rid, "type": rtype}))
+        if first and self.types is None:
+            for ent in list(router.index.by_id.values()):
+                if str(ent.id) not in seen:
+                    found.append(("delete", {"id": str(ent.id), "type": ent.type}))
+
+        tasks = []
+        for event_type, data in found:
+            tasks.append(router._dispatch(event_type, data, "", fetched_at))
+            if metrics.enabled:
+                metrics.count("poll_changes", event_type)
+                metrics.observe("poll_detect", data["type"], stale)
+        router.cache.extend(*filter(None, tasks))
+
+        self.polls += 1
+        self.changes += len(found)
+        self.last_poll = start
+        self.last_duration = monotonic_ns() - start
+        self.busy += self.last_duration
+        if metrics.enabled:
+            key = "all" if self.types is None else ",".join(self.types)
+            metrics.observe("poll", key, self.last_duration)
+        return len(found)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "polls": self.polls,
+            "changes": self.changes,
+            "resources": len(self.hashes),
+            "bytes": self.bytes,
+            "last_duration": self.last_duration / 1e9,
+            "mean_duration": self.busy / self.polls / 1e9 if self.polls else 0.0,
+            # Worst-case detection latency: a change just after one poll is
+            # seen by the next.
+            "max_detection_latency": self.interval + self.last_duration / 1e9,
+        }
@@ -0,0 +1,179 @@
+from asyncio import get_running_loop
+from collections import Counter
+from os.path import basename
+from pathlib import Path
+from sys import _current_frames
+from threading import Event, Thread, current_thread, get_ident, main_thread
+from time import time
+from typing import Optional
+
+__all__ = ("Profiler", "stage_of")
+
+# Router stages by the qualified name of the function running them; a sample
+# is tagged with the innermost one on its stack.
+STAGE_FRAMES = {
+    "Router._parse_payload": "parse",
+    "Router._dispatch": "dispatch",
+    "Router._track": "store",
+    "Poller.poll": "poll",
+    "route.<locals>.wrapped.<locals>.sub_wrap": "http",
+    "ret_cls.<locals>.wrapped.<locals>.sub_wrap": "decode",
+}
+
+
+def stage_of(frames) -> tuple[str, str]:
+    # (handler, stage) tags for a stack given innermost first.
+    handler = stage = ""
+    for code in frames:
+        name = code.co_name
+        if not handler and name.startswith("on_"):
+            handler = name
+        if not stage:
+            stage = STAGE_FRAMES.get(code.co_qualname, "")
+        if handler and stage:
+            break
+    return handler, stage
+
+
+def _label(code) -> str:
+    return f"{code.co_qualname} ({basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler:
+    # Profiles the event loop thread on demand. mode="sample" records the
+    # loop's stack every `interval` seconds of CPU time and writes collapsed
+    # stacks (flamegraph.pl, speedscope), each rooted at the handler and
+    # router stage it was taken in; mode="cprofile" runs cProfile on the loop
+    # thread and writes pstats, where handlers and stages show up as the
+    # functions they are. Nothing is hooked in between runs.
+    #
+    # Samples come from a SIGPROF timer when the loop runs on the main
+    # thread. Otherwise a helper thread reads the loop's stack, which is
+    # biased towards idle: it only gets the GIL once the loop lets go of it.
+    def __init__(self, interval: float = 0.005, directory: Path | str = "."):
+        self.interval = interval
+        self.directory = Path(directory)
+        self.mode: Optional[str] = None
+        self.path: Optional[Path] = None
+        self.samples: Counter[str] = Counter()
+        self.runs = 0
+        self._profile = None
+        self._thread: Optional[Thread] = None
+        self._stopping = Event()
+        self._timer = None
+        self._previous = None
+        self.started = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self.mode is not None
+
+    def start(
+        self,
+        seconds: Optional[float] = None,
+        mode: str = "sample",
+        path: Optional[Path | str] = None,
+    ) -> Path:
+        # Called on the event loop thread; stops by itself after seconds.
+        if self.running:
+            raise RuntimeError(f"Already profiling into {self.path}")
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"Unknown profiling mode {mode!r}")
+        suffix = "collapsed" if mode == "sample" else "pstats"
+        self.path = Path(path or self.directory / f"phlyght-{int(time())}.{suffix}")
+        if mode == "cprofile":
+            from cProfile import Profile
+
+            self._profile = Profile()
+            self._profile.enable()
+        else:
+            self.samples.clear()
+            self._start_sampling()
+        self.mode = mode
+        self.started = time()
+        if seconds:
+            self._timer = get_running_loop().call_later(seconds, self.stop)
+        return self.path
+
+    def stop(self) -> Optional[Path]:
+        # Writes the profile and returns its path, or None if not running.
+        if not self.running:
+            return None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.mode == "cprofile":
+            self._profile.disable()
+            self._profile.dump_stats(self.path)
+            self._profile = None
+        else:
+            self._stop_sampling()
+            with open(self.path, "w") as f:
+                for stack, n in self.samples.items():
+                    f.write(f"{stack} {n}\n")
+        self.mode = None
+        self.runs += 1
+        return self.path
+
+    def _start_sampling(self):
+        if current_thread() is main_thread():
+            try:
+                from signal import ITIMER_PROF, SIGPROF, setitimer, signal
+            except ImportError:
+                ...
+            else:
+                self._previous = signal(SIGPROF, self._on_signal)
+                setitimer(ITIMER_PROF, self.interval, self.interval)
+                return
+        self._stopping.clear()
+        self._thread = Thread(
+            target=self._sample, args=(get_ident(),), name="phlyght-profiler"
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _stop_sampling(self):
+        if self._thread is None:
+            from signal import ITIMER_PROF, SIGPROF, setitimer, signal
+
+            setitimer(ITIMER_PROF, 0)
+            signal(SIGPROF, self._previous)
+            self._previous = None
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def _on_signal(self, _signum, frame):
+        self._record(frame)
+
+    def _sample(self, thread_id: int):
+        while not self._stopping.wait(self.interval):
+            if (frame := _current_frames().get(thread_id)) is None:
+                return
+            self._record(frame)
+
+    def _record(self, frame):
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        if not codes or codes[0].co_qualname.endswith("Selector.select"):
+            # The loop waiting for something to do.
+            self.samples["[idle]"] += 1
+            return
+        handler, stage = stage_of(codes)
+        stack = ";".join(map(_label, reversed(codes)))
+        self.samples[
+            f"[handler:{handler or '-'}];[stage:{stage or '-'}];{stack}"
+        ] += 1
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "mode": self.mode,
+            "path": str(self.path) if self.path else None,
+            "seconds": time() - self.started if self.running else 0.0,
+            "samples": sum(self.samples.values()),
+            "runs": self.runs,
+        }
@@ -0,0 +1,180 @@
+from enum import Enum
+from operator import attrgetter, eq, ge, gt, le, lt, ne
+from typing import Callable, Iterator, Optional
+
+from .index import EntityIndex
+
+__all__ = ("Query", "EntityView", "predicate")
+
+OPS: dict[str, Callable] = {
+    "eq": eq,
+    "ne": ne,
+    "gt": gt,
+    "gte": ge,
+    "lt": lt,
+    "lte": le,
+    "in": lambda value, expected: value in expected,
+    "contains": lambda value, expected: expected in value,
+    "isnull": lambda value, expected: (value is None) == expected,
+}
+
+
+def predicate(key: str, expected) -> Callable:
+    # "dimming__brightness__gt" -> entity.dimming.brightness > expected. A
+    # missing attribute or an incomparable value simply doesn't match.
+    parts = key.split("__")
+    op = OPS[parts.pop()] if len(parts) > 1 and parts[-1] in OPS else eq
+    get = attrgetter(".".join(parts))
+    unwrap = not isinstance(expected, Enum)
+
+    def test(ent) -> bool:
+        try:
+            value = get(ent)
+            if unwrap and isinstance(value, Enum):
+                value = value.value
+            return bool(op(value, expected))
+        except (AttributeError, TypeError):
+            return False
+
+    return test
+
+
+class EntityView:
+    # A read-only window onto a stored entity; nothing is copied, so a view
+    # always reflects the latest state from the event stream.
+    __slots__ = ("_entity",)
+
+    def __init__(self, entity):
+        object.__setattr__(self, "_entity", entity)
+
+    @property
+    def entity(self):
+        return self._entity
+
+    def __getattr__(self, name):
+        return getattr(self._entity, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __eq__(self, other):
+        if isinstance(other, EntityView):
+            return self._entity is other._entity
+        return self._entity == other
+
+    def __hash__(self):
+        return hash(self._entity.id)
+
+    def __repr__(self):
+        return f"<{self._entity.__class__.__name__}View {self._entity.id}>"
+
+
+class Query:
+    # Lazily evaluated and immutable: each refinement returns a new Query.
+    # Candidates come from the smallest index that applies (group membership,
+    # name, then type) before any field predicates run.
+    __slots__ = ("_index", "_rtype", "_group", "_name", "_tests", "_order")
+
+    def __init__(
+        self,
+        index: EntityIndex,
+        rtype: Optional[str] = None,
+        group=None,
+        name: Optional[str] = None,
+        tests: tuple = (),
+        order: Optional[tuple] = None,
+    ):
+        self._index = index
+        self._rtype = rtype
+        self._group = group
+        self._name = name
+        self._tests = tests
+        self._order = order
+
+    def _copy(self, **kwargs) -> "Query":
+        return Query(
+            **{
+                "index": self._index,
+                "rtype": self._rtype,
+                "group": self._group,
+                "name": self._name,
+                "tests": self._tests,
+                "order": self._order,
+                **kwargs,
+            }
+        )
+
+    def where(self, *tests: Callable, **predicates) -> "Query":
+        return self._copy(
+            tests=self._tests
+            + tests
+            + tuple(predicate(k, v) for k, v in predicates.items())
+        )
+
+    def exclude(self, **predicates) -> "Query":
+        tests = tuple(predicate(k, v) for k, v in predicates.items())
+        return self.where(lambda ent: not all(t(ent) for t in tests))
+
+    def within(self, group) -> "Query":
+        # group is a room, zone or bridge home entity, id or name.
+        return self._copy(group=getattr(group, "id", group))
+
+    def named(self, name: str) -> "Query":
+        return self._copy(name=name)
+
+    def order_by(self, key: str, reverse: bool = False) -> "Query":
+        return self._copy(order=(attrgetter(key.replace("__", ".")), reverse))
+
+    def _candidates(self):
+        index = self._index
+        ids = None
+        if self._group is not None:
+            if (group := index.group(self._group)) is None:
+                return ()
+            ids = index.member_ids(group.id, self._rtype or "light")
+        if self._name is not None:
+            named = {str(e.id) for e in index.named(self._name, self._rtype)}
+            ids = named if ids is None else ids & named
+        if ids is None:
+            ids = index.ids(self._rtype) if self._rtype else index.by_id.keys()
+        by_id = index.by_id
+        return (ent for rid in ids if (ent := by_id.get(rid)) is not None)
+
+    def entities(self) -> list:
+        rtype, tests = self._rtype, self._tests
+        found = [
+            ent
+            for ent in self._candidates()
+            if (rtype is None or ent.type == rtype) and all(t(ent) for t in tests)
+        ]
+        if self._order is not None:
+            key, reverse = self._order
+            found.sort(key=key, reverse=reverse)
+        return found
+
+    def __iter__(self) -> Iterator[EntityView]:
+        return map(EntityView, self.entities())
+
+    def all(self) -> list[EntityView]:
+        return list(self)
+
+    def first(self) -> Optional[EntityView]:
+        if self._order is not None:
+            return next(iter(self), None)
+        rtype, tests = self._rtype, self._tests
+        for ent in self._candidates():
+            if (rtype is None or ent.type == rtype) and all(t(ent) for t in tests):
+                return EntityView(ent)
+        return None
+
+    def ids(self) -> list[str]:
+        return [str(ent.id) for ent in self.entities()]
+
+    def count(self) -> int:
+        return len(self.entities())
+
+    def exists(self) -> bool:
+        return self.first() is not None
+
+    def __repr__(self):
+        return f"<Query {self._rtype or '*'} group={self._group} name={self._name}>"
@@ -0,0 +1,129 @@
+from asyncio import Event, Task, get_running_loop, sleep, wait_for
+from pathlib import Path
+from struct import Struct
+from time import monotonic_ns, perf_counter
+from typing import Iterator, Optional
+
+__all__ = ("EventRecorder", "EventReplayer", "MAGIC")
+
+MAGIC = b"PHLYREC\x01"
+# (nanoseconds since the session started, payload length). A zero length
+# frame marks the start of a new session appended to the same file.
+FRAME = Struct("<QI")
+
+
+class EventRecorder:
+    # write() only appends to an in-memory buffer; a single background task
+    # drains it to disk so the event stream reader never waits on file I/O.
+    def __init__(
+        self,
+        path: Path | str,
+        flush_bytes: int = 1 << 16,
+        flush_interval: float = 1.0,
+    ):
+        self.path = Path(path)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.frames = 0
+        self.bytes = 0
+        self._buffer: list[bytes] = []
+        self._buffered = 0
+        self._file = None
+        self._task: Optional[Task] = None
+        self._wake = Event()
+        self._closing = False
+        self._start = 0
+
+    async def open(self):
+        from aiofiles import open as aio_open
+
+        new = not self.path.exists() or not self.path.stat().st_size
+        self._file = await aio_open(self.path, "ab")
+        self._start = monotonic_ns()
+        self._closing = False
+        self._buffer.append(MAGIC if new else FRAME.pack(0, 0))
+        self._task = get_running_loop().create_task(self._flush_loop())
+        return self
+
+    def write(self, payload: bytes):
+        if self._file is None or not payload:
+            return
+        frame = FRAME.pack(monotonic_ns() - self._start, len(payload)) + payload
+        self._buffer.append(frame)
+        self._buffered += len(frame)
+        self.frames += 1
+        if self._buffered >= self.flush_bytes:
+            self._wake.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await wait_for(self._wake.wait(), self.flush_interval)
+            except TimeoutError:
+                ...
+            self._wake.clear()
+            if self._buffer:
+                chunk, self._buffer, self._buffered = b"".join(self._buffer), [], 0
+                await self._file.write(chunk)
+                await self._file.flush()
+                self.bytes += len(chunk)
+            if self._closing:
+                break
+
+    async def close(self):
+        if self._task is not None:
+            self._closing = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+
+class EventReplayer:
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+
+    def frames(self) -> Iterator[tuple[int, bytes]]:
+        # Yields (offset_ns, payload) with offsets continuous across sessions.
+        data = self.path.read_bytes()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{self.path} is not an event recording")
+        pos, base, last = len(MAGIC), 0, 0
+        while pos + FRAME.size <= len(data):
+            offset, length = FRAME.unpack_from(data, pos)
+            pos += FRAME.size
+            if not length:
+                base = last
+                continue
+            last = base + offset
+            yield last, data[pos : pos + length]
+            pos += length
+
+    async def replay(self, router, speed: Optional[float] = 1.0) -> dict:
+        # speed=1 reproduces the recorded timing, N plays N times faster and
+        # None (or 0) feeds frames back to back as fast as the router parses.
+        frames = 0
+        started = perf_counter()
+        for offset, payload in self.frames():
+            if speed:
+                delay = offset / 1e9 / speed - (perf_counter() - started)
+                await sleep(max(delay, 0))
+            else:
+                await sleep(0)
+            router._parse_payload(payload)
+            frames += 1
+        await sleep(0)
+        elapsed = perf_counter() - started
+        return {
+            "frames": frames,
+            "elapsed": elapsed,
+            "frames_per_sec": frames / elapsed if elapsed else 0.0,
+        }
@@ -0,0 +1,159 @@
+try:
+    from ujson import dumps
+except ImportError:
+    from json import dumps
+
+__all__ = ("ScenePlan", "SceneWrite", "plan_scene", "light_state_matches")
+
+# How far a cached value may be from the action and still count as applied;
+# the bridge rounds brightness and xy on the way back.
+TOLERANCE = {"brightness": 0.5, "x": 0.0005, "y": 0.0005}
+
+
+def _get(obj, key):
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+
+def _matches(want, have, key: str = "") -> bool:
+    if isinstance(want, dict):
+        if have is None:
+            return False
+        if key == "color_temperature" and _get(have, "mirek_valid") is False:
+            # The light is in xy mode, so its mirek is stale.
+            return False
+        return all(_matches(v, _get(have, k), k) for k, v in want.items())
+    if isinstance(want, float) and isinstance(have, (int, float)):
+        return abs(want - have) <= TOLERANCE.get(key, 0.0)
+    return want == have or (hasattr(have, "value") and want == have.value)
+
+
+def light_state_matches(state: dict, light) -> bool:
+    # Whether the cached light already shows every attribute in state.
+    if state.get("on") == {"on": False}:
+        return _matches(state["on"], _get(light, "on"))
+    return all(_matches(v, _get(light, k), k) for k, v in state.items())
+
+
+def _diff(state: dict, light) -> dict:
+    # The part of state the light doesn't show yet. Lights that are (and
+    # stay) off need nothing else; turning one off needs only that.
+    if state.get("on") == {"on": False}:
+        return {} if _matches(state["on"], _get(light, "on")) else {"on": state["on"]}
+    return {k: v for k, v in state.items() if not _matches(v, _get(light, k), k)}
+
+
+class SceneWrite:
+    __slots__ = ("rtype", "rid", "payload", "lights")
+
+    def __init__(self, rtype: str, rid: str, payload: dict, lights: frozenset):
+        self.rtype = rtype
+        self.rid = rid
+        self.payload = payload
+        self.lights = lights
+
+    def __repr__(self):
+        return f"<SceneWrite {self.rtype} {self.rid} {self.payload} ({len(self.lights)})>"
+
+
+class ScenePlan:
+    __slots__ = ("scene", "targets", "unchanged", "writes")
+
+    def __init__(self, scene: str, targets: int):
+        self.scene = scene
+        self.targets = targets
+        self.unchanged = 0
+        self.writes: list[SceneWrite] = []
+
+    def report(self) -> dict:
+        grouped = sum(w.rtype == "grouped_light" for w in self.writes)
+        return {
+            "scene": self.scene,
+            "targets": self.targets,
+            "unchanged": self.unchanged,
+            "writes": len(self.writes),
+            "light_writes": len(self.writes) - grouped,
+            "group_writes": grouped,
+            # Against a blind recall, which sends one write per action.
+            "saved": self.targets - len(self.writes),
+        }
+
+
+def _actions(scene) -> dict[str, dict]:
+    # Target light id -> the state its action sets.
+    actions = {}
+    for entry in scene.actions or ():
+        action = entry.action.dict(exclude_unset=True, exclude_none=True)
+        action.pop("dynamics", None)
+        if entry.target.rtype == "light" and action:
+            actions[str(entry.target.rid)] = action
+    return actions
+
+
+def _groups(index) -> list[tuple[str, frozenset]]:
+    # (grouped_light id, light ids) for every room, zone and bridge home that
+    # has a grouped_light service.
+    groups = []
+    for rtype in ("room", "zone", "bridge_home"):
+        for group in index.of_type(rtype):
+            for service in index.services(group.id, "grouped_light"):
+                if members := index.light_ids(group.id):
+                    groups.append((str(service.id), members))
+    return groups
+
+
+def plan_scene(index, scene, group: bool = True, min_group: int = 2) -> ScenePlan:
+    # The writes needed to bring the cached lights to the scene: only lights
+    # whose on/dimming/color/mirek differ, with lights needing the same change
+    # folded into a grouped_light write when a group's lights all either need
+    # it or already show it.
+    actions = _actions(scene)
+    plan = ScenePlan(str(scene.id), len(actions))
+    needs: dict[str, dict] = {}
+    for rid, state in actions.items():
+        if (light := index.get(rid)) is None:
+            needs[rid] = state
+        elif delta := _diff(state, light):
+            needs[rid] = delta
+        else:
+            plan.unchanged += 1
+
+    # Lights are grouped by the state they are headed for, not by their
+    # delta: a grouped write carries the union of its lights' deltas, which
+    # is a no-op for the attributes a light already shows.
+    buckets: dict[str, tuple[dict, set]] = {}
+    for rid in needs:
+        state = actions[rid]
+        buckets.setdefault(dumps(state, sort_keys=True), (state, set()))[1].add(rid)
+
+    groups = _groups(index) if group and len(needs) >= min_group else []
+    for state, lights in buckets.values():
+        uncovered = set(lights)
+        candidates = []
+        for gid, members in groups:
+            if len(members & uncovered) < min_group:
+                continue
+            if all(
+                rid in lights
+                or (
+                    rid not in needs
+                    and (light := index.get(rid)) is not None
+                    and light_state_matches(state, light)
+                )
+                for rid in members
+            ):
+                candidates.append((gid, members))
+        while candidates:
+            gid, members = max(candidates, key=lambda c: len(c[1] & uncovered))
+            if len(covered := members & uncovered) < min_group:
+                break
+            payload = {}
+            for rid in covered:
+                payload |= needs[rid]
+            plan.writes.append(
+                SceneWrite("grouped_light", gid, payload, frozenset(covered))
+            )
+            uncovered -= covered
+            candidates.remove((gid, members))
+        for rid in sorted(uncovered):
+            plan.writes.append(SceneWrite("light", rid, needs[rid], frozenset((rid,))))
+    return plan
@@ -0,0 +1,592 @@
+from asyncio import Event, Future, gather, get_running_loop, run, sleep, wait_for
+from collections import deque
+from functools import partial
+from inspect import isawaitable
+from itertools import count
+import multiprocessing
+from multiprocessing.reduction import ForkingPickler
+from os import getpid
+from pathlib import Path
+from tempfile import mkdtemp
+from threading import Condition, Thread
+from time import monotonic
+from typing import Any, AsyncIterator, Callable, Optional
+
+from pydantic import BaseModel
+
+from .http import Router
+from .manager import BridgeEvent, BridgeManager
+from .metrics import Metrics
+
+try:
+    from ujson import dumps, loads
+except ImportError:
+    from json import dumps, loads
+
+__all__ = ("ShardSupervisor", "BridgeSpec", "RemoteError")
+
+
+class RemoteError(RuntimeError):
+    ...
+
+
+class BridgeSpec:
+    # Everything a worker needs to build a bridge's router. It crosses the
+    # process boundary, so router_cls and transport (a factory called in the
+    # worker, e.g. to build a simulator) must be picklable.
+    __slots__ = ("bridge_id", "host", "api_key", "router_cls", "transport", "kwargs")
+
+    def __init__(
+        self,
+        bridge_id: str,
+        host: str,
+        api_key: str,
+        router_cls: type = Router,
+        transport: Optional[Callable[[], Any]] = None,
+        **kwargs,
+    ):
+        self.bridge_id = bridge_id
+        self.host = host
+        self.api_key = api_key
+        self.router_cls = router_cls
+        self.transport = transport
+        self.kwargs = kwargs
+
+    def __getstate__(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+
+def _portable(value):
+    # Command results go back over a pipe; reduce them to plain data.
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, bytes):
+        return value.decode(errors="replace")
+    if isinstance(value, BaseModel) or hasattr(value, "to_model"):
+        return loads(value.json())
+    if hasattr(value, "entity"):
+        return _portable(value.entity)
+    if hasattr(value, "status_code") and hasattr(value, "content"):
+        try:
+            body = loads(value.content)
+        except ValueError:
+            body = value.text
+        return {"status_code": value.status_code, "body": body}
+    if isinstance(value, dict):
+        return {str(k): _portable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)) or hasattr(value, "__iter__"):
+        return [_portable(v) for v in value]
+    return str(value)
+
+
+class _Sender:
+    # Writes to a pipe from its own thread, so a full pipe buffer (a big
+    # report, a long event batch, a slow reader) never stalls the event loop.
+    # Messages are pickled by send() on the caller's side, so a value that
+    # can't be sent fails there; drain() waits while more than `limit` are
+    # queued.
+    def __init__(self, conn, limit: int = 64):
+        self.conn = conn
+        self.limit = limit
+        self.error: Optional[OSError] = None
+        self._loop = get_running_loop()
+        self._queue: deque[Optional[bytes]] = deque()
+        self._wakeup = Condition()
+        self._room = Event()
+        self._room.set()
+        self._thread = Thread(target=self._run, name="phlyght-shard-sender")
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def backlog(self) -> int:
+        return len(self._queue)
+
+    def send(self, msg: tuple):
+        if self.error is not None:
+            raise self.error
+        self._put(bytes(ForkingPickler.dumps(msg)))
+
+    def _put(self, data: Optional[bytes]):
+        with self._wakeup:
+            self._queue.append(data)
+            if len(self._queue) > self.limit:
+                self._room.clear()
+            self._wakeup.notify()
+
+    async def drain(self):
+        await self._room.wait()
+        if self.error is not None:
+            raise self.error
+
+    def _set_room(self):
+        try:
+            self._loop.call_soon_threadsafe(self._room.set)
+        except RuntimeError:
+            # The loop is closed; nobody is waiting.
+            ...
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._queue:
+                    self._wakeup.wait()
+                data = self._queue.popleft()
+                room = len(self._queue) <= self.limit
+            if data is None:
+                return
+            try:
+                self.conn.send_bytes(data)
+            except OSError as e:
+                self.error = e
+                self._set_room()
+                return
+            if room and not self._room.is_set():
+                self._set_room()
+
+    def close(self):
+        # Stops after what is already queued; later sends fail.
+        if self.error is None:
+            self.error = OSError("connection closed")
+            self._put(None)
+
+    def join(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+
+    async def aclose(self, timeout: float = 5.0):
+        self.close()
+        await self._loop.run_in_executor(None, self.join, timeout)
+
+
+class _Receiver:
+    # Reads a pipe from its own thread and hands each message to `handle` on
+    # the event loop, so a big message arriving in pieces never stalls it.
+    # `closed` is called on the loop once the other end has gone away.
+    def __init__(
+        self,
+        conn,
+        handle: Callable[[tuple], Any],
+        closed: Optional[Callable[[], Any]] = None,
+    ):
+        self.conn = conn
+        self._loop = get_running_loop()
+        self._handle = handle
+        self._closed = closed
+        self._thread = Thread(target=self._run, name="phlyght-shard-receiver")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        loop = self._loop
+        try:
+            while True:
+                msg = ForkingPickler.loads(self.conn.recv_bytes())
+                loop.call_soon_threadsafe(self._handle, msg)
+        except (EOFError, OSError):
+            # The other end has closed.
+            ...
+        except RuntimeError:
+            # The loop is closed; nobody is listening.
+            return
+        if self._closed is not None:
+            try:
+                loop.call_soon_threadsafe(self._closed)
+            except RuntimeError:
+                ...
+
+    def join(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+
+
+def _release(conn, *threads):
+    # Closes conn once the threads using it are done with it.
+    for thread in threads:
+        thread.join(5.0)
+    conn.close()
+
+
+class _Shard:
+    __slots__ = (
+        "id",
+        "specs",
+        "process",
+        "conn",
+        "sender",
+        "receiver",
+        "pid",
+        "restarts",
+        "started",
+        "ready",
+        "report",
+        "reported",
+    )
+
+    def __init__(self, shard_id: int, specs: list[BridgeSpec]):
+        self.id = shard_id
+        self.specs = specs
+        self.process = None
+        self.conn = None
+        self.sender: Optional[_Sender] = None
+        self.receiver: Optional[_Receiver] = None
+        self.pid: Optional[int] = None
+        self.restarts = 0
+        self.started = 0.0
+        self.ready: Optional[Future] = None
+        self.report: dict = {}
+        self.reported: Optional[float] = None
+
+
+class ShardSupervisor:
+    # Shards bridges across worker processes. Each worker hosts its share on a
+    # BridgeManager (one loop, shared pool) and reports health back over a
+    # pipe; the parent restarts crashed workers, which warm-start from the
+    # per-bridge snapshots they keep in snapshot_dir.
+    def __init__(
+        self,
+        shards: Optional[int] = None,
+        snapshot_dir: Optional[Path | str] = None,
+        snapshot_interval: float = 60.0,
+        report_interval: float = 1.0,
+        forward_events: bool = False,
+        metrics: bool = False,
+        max_connections: int = 20,
+        rate: float = 10.0,
+        restart_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        start_method: str = "spawn",
+    ):
+        self.shards = shards or multiprocessing.cpu_count()
+        self.snapshot_dir = Path(snapshot_dir or mkdtemp(prefix="phlyght-shards-"))
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.forward_events = forward_events
+        self.metrics = Metrics(metrics)
+        self._options = {
+            "snapshot_dir": str(self.snapshot_dir),
+            "snapshot_interval": snapshot_interval,
+            "report_interval": report_interval,
+            "forward_events": forward_events,
+            "metrics": metrics,
+            "max_connections": max_connections,
+            "rate": rate,
+        }
+        self._ctx = multiprocessing.get_context(start_method)
+        self._specs: dict[str, BridgeSpec] = {}
+        self._shards: list[_Shard] = []
+        self._bridge_shard: dict[str, _Shard] = {}
+        self._calls: dict[int, tuple[Future, int]] = {}
+        self._call_ids = count()
+        self._events: list = []
+        self._event_ready = Event()
+        self._stopping = False
+
+    def add(self, bridge_id: str, host: str, api_key: str, **kwargs) -> BridgeSpec:
+        if self._shards:
+            raise RuntimeError("Bridges must be added before start()")
+        if bridge_id in self._specs:
+            raise ValueError(f"Bridge {bridge_id} is already managed")
+        spec = self._specs[bridge_id] = BridgeSpec(bridge_id, host, api_key, **kwargs)
+        return spec
+
+    async def start(self, timeout: Optional[float] = 60.0):
+        specs = list(self._specs.values())
+        n = max(1, min(self.shards, len(specs)))
+        self._shards = [_Shard(i, specs[i::n]) for i in range(n)]
+        for shard in self._shards:
+            for spec in shard.specs:
+                self._bridge_shard[spec.bridge_id] = shard
+            self._spawn(shard)
+        await wait_for(gather(*(s.ready for s in self._shards)), timeout)
+
+    def _spawn(self, shard: _Shard):
+        if self._stopping:
+            return
+        loop = get_running_loop()
+        conn, child = self._ctx.Pipe()
+        shard.process = self._ctx.Process(
+            target=_worker_main,
+            args=(shard.id, shard.specs, child, self._options),
+            name=f"phlyght-shard-{shard.id}",
+            daemon=True,
+        )
+        shard.process.start()
+        child.close()
+        shard.conn, shard.pid, shard.started = conn, shard.process.pid, monotonic()
+        shard.sender = _Sender(conn)
+        if shard.ready is None or shard.ready.done():
+            shard.ready = loop.create_future()
+        shard.receiver = _Receiver(conn, partial(self._handle, shard))
+        loop.add_reader(shard.process.sentinel, self._on_exit, shard)
+
+    def _handle(self, shard: _Shard, msg: tuple):
+        kind = msg[0]
+        if kind == "report":
+            shard.report, shard.reported = msg[1], monotonic()
+        elif kind == "result":
+            _, call_id, ok, value = msg
+            if (call := self._calls.pop(call_id, None)) and not call[0].done():
+                if ok:
+                    call[0].set_result(value)
+                else:
+                    call[0].set_exception(RemoteError(value))
+        elif kind == "events":
+            self._events.extend(msg[1])
+            self._event_ready.set()
+        elif kind == "ready":
+            shard.pid = msg[1]
+            if not shard.ready.done():
+                shard.ready.set_result(shard.id)
+
+    def _on_exit(self, shard: _Shard):
+        loop = get_running_loop()
+        loop.remove_reader(shard.process.sentinel)
+        shard.sender.close()
+        # The worker is gone, so the receiver is about to see EOF.
+        loop.run_in_executor(None, _release, shard.conn, shard.sender, shard.receiver)
+        shard.process.join(0)
+        for call_id, (fut, shard_id) in list(self._calls.items()):
+            if shard_id == shard.id:
+                del self._calls[call_id]
+                if not fut.done():
+                    fut.set_exception(RemoteError(f"shard {shard.id} exited"))
+        if self._stopping:
+            return
+        shard.restarts += 1
+        self.metrics.count("shard_restarts", str(shard.id))
+        # Quick first retry, then back off so a crash loop doesn't spin.
+        delay = min(self.max_backoff, self.restart_backoff * 2 ** (shard.restarts - 1))
+        loop.call_later(delay, self._spawn, shard)
+
+    async def call(
+        self, bridge_id: str, method: str, *args, timeout: float = 30.0, **kwargs
+    ):
+        # Runs router.<method>(*args, **kwargs) in the bridge's worker, e.g.
+        # await supervisor.call("attic", "set_light", rid, on={"on": True}).
+        shard = self._bridge_shard[bridge_id]
+        if method.startswith("_"):
+            raise ValueError(f"{method} is private")
+        fut = get_running_loop().create_future()
+        call_id = next(self._call_ids)
+        self._calls[call_id] = (fut, shard.id)
+        try:
+            shard.sender.send(("call", call_id, bridge_id, method, args, kwargs))
+            return await wait_for(fut, timeout)
+        except OSError as e:
+            raise RemoteError(f"shard {shard.id} is not running") from e
+        finally:
+            self._calls.pop(call_id, None)
+
+    async def broadcast(self, method: str, *args, **kwargs) -> dict[str, Any]:
+        bridges = list(self._bridge_shard)
+        results = await gather(
+            *(self.call(b, method, *args, **kwargs) for b in bridges),
+            return_exceptions=True,
+        )
+        return dict(zip(bridges, results))
+
+    async def query(self, bridge_id: str, rtype: str, room=None, **predicates):
+        return await self.call(bridge_id, "query", rtype, room=room, **predicates)
+
+    async def events(self) -> AsyncIterator[BridgeEvent]:
+        if not self.forward_events:
+            raise ValueError("Start the supervisor with forward_events=True")
+        while True:
+            await self._event_ready.wait()
+            events, self._events = self._events, []
+            self._event_ready.clear()
+            for bridge, event_type, data in events:
+                yield BridgeEvent(bridge, event_type, data, None)
+
+    def health(self) -> dict[str, dict]:
+        now = monotonic()
+        report = {}
+        for shard in self._shards:
+            alive = shard.process is not None and shard.process.is_alive()
+            for spec in shard.specs:
+                report[spec.bridge_id] = {
+                    **shard.report.get("bridges", {}).get(spec.bridge_id, {}),
+                    "shard": shard.id,
+                    "pid": shard.pid,
+                    "alive": alive,
+                    "restarts": shard.restarts,
+                    "report_age": now - shard.reported if shard.reported else None,
+                }
+        return report
+
+    def snapshot(self) -> dict:
+        bridges = self.health()
+        return {
+            "shards": [
+                {
+                    "id": s.id,
+                    "pid": s.pid,
+                    "alive": s.process is not None and s.process.is_alive(),
+                    "restarts": s.restarts,
+                    "bridges": [spec.bridge_id for spec in s.specs],
+                    "uptime": monotonic() - s.started,
+                }
+                for s in self._shards
+            ],
+            "bridges": bridges,
+            "total": {
+                "bridges": len(bridges),
+                "connected": sum(bool(b.get("connected")) for b in bridges.values()),
+                "events": sum(b.get("events", 0) for b in bridges.values()),
+                "events_per_sec": sum(
+                    b.get("events_per_sec", 0.0) for b in bridges.values()
+                ),
+                "restarts": sum(s.restarts for s in self._shards),
+            },
+        }
+
+    def prometheus(self, prefix: str = "phlyght") -> str:
+        lines, seen = [], set()
+        for shard in self._shards:
+            for line in shard.report.get("prometheus", "").splitlines():
+                if not line.startswith("#"):
+                    lines.append(line)
+                elif line not in seen:
+                    seen.add(line)
+                    lines.append(line)
+        for name in ("restarts", "alive"):
+            lines.append(f"# TYPE {prefix}_shard_{name} gauge")
+            for shard in self._shards:
+                value = (
+                    shard.restarts
+                    if name == "restarts"
+                    else int(shard.process is not None and shard.process.is_alive())
+                )
+                lines.append(f'{prefix}_shard_{name}{{shard="{shard.id}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    async def serve_metrics(self, host: str = "127.0.0.1", port: int = 9464):
+        async def metrics_route(_query):
+            return "200 OK", "text/plain; version=0.0.4", self.prometheus()
+
+        async def health_route(_query):
+            return "200 OK", "application/json", dumps(self.snapshot())
+
+        return await self.metrics.serve(
+            host, port, routes={"/metrics": metrics_route, "/health": health_route}
+        )
+
+    async def stop(self, timeout: float = 5.0):
+        self._stopping = True
+        for shard in self._shards:
+            try:
+                shard.sender.send(("stop",))
+            except OSError:
+                ...
+        deadline = monotonic() + timeout
+        while any(s.process.is_alive() for s in self._shards):
+            if monotonic() > deadline:
+                for shard in self._shards:
+                    if shard.process.is_alive():
+                        shard.process.terminate()
+                break
+            await sleep(0.05)
+        await sleep(0)
+
+
+def _worker_main(shard_id: int, specs: list[BridgeSpec], conn, options: dict):
+    try:
+        run(_worker(shard_id, specs, conn, options))
+    except KeyboardInterrupt:
+        ...
+
+
+async def _worker(shard_id: int, specs: list[BridgeSpec], conn, options: dict):
+    loop = get_running_loop()
+    manager = BridgeManager(
+        max_connections=options["max_connections"],
+        rate=options["rate"],
+        metrics=options["metrics"],
+        queue_size=100000 if options["forward_events"] else None,
+    )
+    snapshot_dir = Path(options["snapshot_dir"])
+    for spec in specs:
+        kwargs = {"snapshot": snapshot_dir / f"{spec.bridge_id}.snap", **spec.kwargs}
+        manager.add(
+            spec.bridge_id,
+            spec.host,
+            spec.api_key,
+            router_cls=spec.router_cls,
+            transport=spec.transport() if spec.transport is not None else None,
+            **kwargs,
+        )
+
+    stop = Event()
+    sender = _Sender(conn)
+
+    async def run_call(call_id, bridge_id, method, args, kwargs):
+        try:
+            result = getattr(manager[bridge_id], method)(*args, **kwargs)
+            if isawaitable(result):
+                result = await result
+            sender.send(("result", call_id, True, _portable(result)))
+        except Exception as e:
+            sender.send(("result", call_id, False, f"{type(e).__name__}: {e}"))
+
+    def on_message(msg: tuple):
+        if msg[0] == "call":
+            manager.routers[msg[2]].new_task(run_call(*msg[1:]))
+        elif msg[0] == "stop":
+            stop.set()
+
+    def report():
+        if sender.backlog:
+            # The parent hasn't caught up; the next report supersedes this.
+            return
+        sender.send(
+            (
+                "report",
+                {
+                    "bridges": manager.health(),
+                    "prometheus": manager.prometheus() if options["metrics"] else "",
+                },
+            )
+        )
+
+    async def report_loop():
+        while True:
+            report()
+            await sleep(options["report_interval"])
+
+    async def snapshot_loop():
+        while True:
+            await sleep(options["snapshot_interval"])
+            for router in manager.routers.values():
+                await router.save_snapshot()
+
+    async def forward_loop():
+        stream = manager.events()
+        while True:
+            batch = [await anext(stream)]
+            while manager._queue.qsize() and len(batch) < 512:
+                batch.append(manager._queue.get_nowait())
+            await sender.drain()
+            sender.send(("events", [(e.bridge, e.type, e.data) for e in batch]))
+
+    # If the parent goes away, nobody is left to report to.
+    _Receiver(conn, on_message, stop.set)
+    await manager.start()
+    sender.send(("ready", getpid()))
+    tasks = [loop.create_task(report_loop()), loop.create_task(snapshot_loop())]
+    if options["forward_events"]:
+        tasks.append(loop.create_task(forward_loop()))
+    await stop.wait()
+
+    for task in tasks:
+        task.cancel()
+    for router in manager.routers.values():
+        try:
+            await router.save_snapshot()
+        except Exception:
+            ...
+    await manager.stop()
+    await sender.aclose()
+    conn.close()
@@ -0,0 +1,541 @@
+from asyncio import Queue, sleep
+from random import Random
+from time import monotonic, time
+from typing import Any, Callable, Iterable, Optional
+from uuid import UUID
+
+from httpx import (
+    AsyncBaseTransport,
+    AsyncByteStream,
+    ConnectError,
+    Request,
+    Response,
+)
+
+try:
+    from ujson import dumps, loads
+except ImportError:
+    from json import dumps, loads
+
+from .models import Archetype, RoomType
+
+__all__ = ("SyntheticHome", "BridgeSimulator", "TokenBucket")
+
+# Route names in HueAPIv2 that differ from the resource type they serve.
+PATH_TYPES = {"bridges": "bridge", "zgb_connectivity": "zgp_connectivity"}
+
+SENSOR_TYPES = ("motion", "temperature", "light_level", "device_power")
+LIGHT_ARCHETYPES = (
+    Archetype.CLASSIC_BULB,
+    Archetype.SULTAN_BULB,
+    Archetype.HUE_LIGHTSTRIP,
+    Archetype.CANDLE_BULB,
+    Archetype.SPOT_BULB,
+)
+ROOM_TYPES = (
+    RoomType.LIVING_ROOM,
+    RoomType.KITCHEN,
+    RoomType.BEDROOM,
+    RoomType.OFFICE,
+    RoomType.BATHROOM,
+    RoomType.HALLWAY,
+)
+
+
+def ident(rid: str, rtype: str) -> dict[str, str]:
+    return {"rid": rid, "rtype": rtype}
+
+
+def merge(target: dict, changes: dict) -> dict:
+    for k, v in changes.items():
+        if isinstance(v, dict) and isinstance(target.get(k), dict):
+            merge(target[k], v)
+        else:
+            target[k] = v
+    return target
+
+
+class SyntheticHome:
+    # A deterministic (per seed) home in the shape the CLIP v2 API returns:
+    # every third device is a motion sensor, every seventh a dimmer switch and
+    # the rest are lights, split round-robin across rooms.
+    def __init__(
+        self,
+        devices: int = 10,
+        rooms: int = 3,
+        scenes: int = 5,
+        zones: int = 1,
+        seed: Optional[int] = 0,
+    ):
+        self.random = Random(seed)
+        self.resources: dict[str, dict[str, dict]] = {}
+        self._serial = 0
+
+        bridge_device = self._device("Hue Bridge", Archetype.BRIDGE_V2)
+        bridge = self.add("bridge", bridge_id="001788fffe000000", time_zone={})
+        bridge["owner"] = ident(bridge_device["id"], "device")
+        bridge_device["services"].append(ident(bridge["id"], "bridge"))
+
+        room_ids = [
+            self._group("room", f"Room {n}", ROOM_TYPES[n % len(ROOM_TYPES)])["id"]
+            for n in range(rooms)
+        ]
+        lights = []
+        for n in range(devices):
+            if n % 3 == 2:
+                device = self._sensor(n)
+            elif n % 7 == 6:
+                device = self._switch(n)
+            else:
+                device = self._light(n)
+                lights.append(device["services"][0]["rid"])
+            if room_ids:
+                room = self.resources["room"][room_ids[n % len(room_ids)]]
+                room["children"].append(ident(device["id"], "device"))
+
+        for n in range(zones):
+            zone = self._group("zone", f"Zone {n}", RoomType.HOME)
+            zone["children"] = [ident(rid, "light") for rid in lights[n :: zones + 1]]
+
+        for n in range(scenes):
+            if not room_ids:
+                break
+            room_id = room_ids[n % len(room_ids)]
+            self.add(
+                "scene",
+                metadata={"name": f"Scene {n}"},
+                group=ident(room_id, "room"),
+                actions=[
+                    {
+                        "target": ident(rid, "light"),
+                        "action": self._light_state(),
+                    }
+                    for rid in self.lights_in(room_id)
+                ],
+                speed=0.5,
+                auto_dynamic=False,
+            )
+
+        self.add(
+            "bridge_home",
+            children=[ident(rid, "room") for rid in room_ids],
+            services=[],
+        )
+
+    def _uuid(self) -> str:
+        return str(UUID(int=self.random.getrandbits(128), version=4))
+
+    def add(self, rtype: str, **data) -> dict:
+        data = {"id": self._uuid(), "id_v1": "", "type": rtype, **data}
+        self.resources.setdefault(rtype, {})[data["id"]] = data
+        return data
+
+    def _device(self, name: str, archetype: Archetype) -> dict:
+        return self.add(
+            "device",
+            services=[],
+            metadata={"name": name, "archetype": archetype.value},
+            product_data={
+                "model_id": "SIM001",
+                "manufacturer_name": "phlyght",
+                "product_name": name,
+                "product_archetype": archetype.value,
+                "certified": True,
+                "software_version": "1.0.0",
+            },
+        )
+
+    def _service(self, device: dict, rtype: str, **data) -> dict:
+        service = self.add(rtype, owner=ident(device["id"], "device"), **data)
+        device["services"].append(ident(service["id"], rtype))
+        return service
+
+    def _zigbee(self, device: dict):
+        self._serial += 1
+        mac = ":".join(f"{b:02x}" for b in self._serial.to_bytes(6, "big"))
+        self._service(device, "zigbee_connectivity", status="connected", mac_address=mac)
+
+    def _light_state(self) -> dict:
+        return {
+            "on": {"on": self.random.random() > 0.5},
+            "dimming": {"brightness": round(self.random.uniform(1, 100), 1)},
+            "color": {
+                "xy": {
+                    "x": round(self.random.uniform(0.1, 0.7), 4),
+                    "y": round(self.random.uniform(0.1, 0.7), 4),
+                }
+            },
+            "color_temperature": {"mirek": self.random.randint(153, 500)},
+        }
+
+    def _light(self, n: int) -> dict:
+        archetype = LIGHT_ARCHETYPES[n % len(LIGHT_ARCHETYPES)]
+        device = self._device(f"Light {n}", archetype)
+        state = self._light_state()
+        self._service(
+            device,
+            "light",
+            metadata={"name": f"Light {n}", "archetype": archetype.value},
+            on=state["on"],
+            dimming={**state["dimming"], "min_dim_level": 0.2},
+            color_temperature={
+                **state["color_temperature"],
+                "mirek_valid": True,
+                "mirek_schema": {"mirek_minimum": 153, "mirek_maximum": 500},
+            },
+            color=state["color"],
+            dynamics={"status": "none", "status_values": ["none"], "speed": 0.0},
+            alert={"action": "unknown"},
+            mode="normal",
+            effects={"effect": "no_effect"},
+        )
+        self._zigbee(device)
+        return device
+
+    def _sensor(self, n: int) -> dict:
+        device = self._device(f"Motion sensor {n}", Archetype.UNKNOWN_ARCHETYPE)
+        self._service(device, "motion", enabled=True, motion=self._sensor_value("motion"))
+        self._service(
+            device,
+            "temperature",
+            enabled=True,
+            temperature=self._sensor_value("temperature"),
+        )
+        self._service(
+            device, "light_level", enabled=True, light=self._sensor_value("light_level")
+        )
+        self._service(
+            device, "device_power", power_state=self._sensor_value("device_power")
+        )
+        self._zigbee(device)
+        return device
+
+    def _switch(self, n: int) -> dict:
+        device = self._device(f"Dimmer switch {n}", Archetype.UNKNOWN_ARCHETYPE)
+        for control_id in range(1, 5):
+            self._service(
+                device,
+                "button",
+                metadata={"control_id": control_id},
+                button={"last_event": "short_release"},
+            )
+        self._service(
+            device, "device_power", power_state=self._sensor_value("device_power")
+        )
+        self._zigbee(device)
+        return device
+
+    def _group(self, rtype: str, name: str, archetype: RoomType) -> dict:
+        group = self.add(
+            rtype,
+            metadata={"name": name, "archetype": archetype.value},
+            children=[],
+            services=[],
+        )
+        grouped = self.add(
+            "grouped_light",
+            owner=ident(group["id"], rtype),
+            on={"on": False},
+            alert={"action": "unknown"},
+        )
+        group["services"].append(ident(grouped["id"], "grouped_light"))
+        return group
+
+    def _sensor_value(self, rtype: str) -> dict:
+        rnd = self.random
+        match rtype:
+            case "motion":
+                return {"motion": rnd.random() > 0.8, "motion_valid": True}
+            case "temperature":
+                return {
+                    "temperature": round(rnd.uniform(15, 28), 2),
+                    "temperature_valid": True,
+                }
+            case "light_level":
+                return {
+                    "light_level": rnd.randint(0, 40000),
+                    "light_level_valid": True,
+                }
+            case "device_power":
+                return {
+                    "battery_state": "normal",
+                    "battery_level": float(rnd.randint(20, 100)),
+                }
+        return {}
+
+    def lights_in(self, group_id: str) -> list[str]:
+        group = self.find(group_id)
+        if not group:
+            return []
+        lights = []
+        for child in group.get("children", []):
+            if child["rtype"] == "light":
+                lights.append(child["rid"])
+            elif device := self.find(child["rid"]):
+                lights.extend(
+                    s["rid"] for s in device["services"] if s["rtype"] == "light"
+                )
+        return lights
+
+    def find(self, rid: str) -> Optional[dict]:
+        for resources in self.resources.values():
+            if rid in resources:
+                return resources[rid]
+        return None
+
+    def all(self) -> list[dict]:
+        return [r for resources in self.resources.values() for r in resources.values()]
+
+    def random_update(self, types: Iterable[str] = ("light",) + SENSOR_TYPES):
+        # Mutate one random resource of the given types the way the bridge
+        # would and return the delta to publish.
+        choices = [t for t in types if self.resources.get(t)]
+        if not choices:
+            return None
+        rtype = self.random.choice(choices)
+        resource = self.resources[rtype][
+            self.random.choice(list(self.resources[rtype]))
+        ]
+        match rtype:
+            case "light":
+                state = self._light_state()
+                key = self.random.choice(list(state))
+                delta = {key: state[key]}
+            case "motion":
+                delta = {"motion": self._sensor_value("motion")}
+            case "temperature":
+                delta = {"temperature": self._sensor_value("temperature")}
+            case "light_level":
+                delta = {"light": self._sensor_value("light_level")}
+            case "device_power":
+                delta = {"power_state": self._sensor_value("device_power")}
+            case _:
+                return None
+        merge(resource, delta)
+        return {"id": resource["id"], "id_v1": "", "type": rtype, **delta}
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.stamp = monotonic()
+
+    def take(self) -> float:
+        # Returns 0 if a token was taken, else seconds until one is available.
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _EventStream(AsyncByteStream):
+    def __init__(self, simulator: "BridgeSimulator"):
+        self.simulator = simulator
+        self.queue: Queue = Queue()
+
+    async def __aiter__(self):
+        self.simulator._streams.add(self)
+        try:
+            yield b": hi\n\n"
+            while (chunk := await self.queue.get()) is not None:
+                yield chunk
+        finally:
+            self.simulator._streams.discard(self)
+
+    async def aclose(self):
+        self.simulator._streams.discard(self)
+
+
+class BridgeSimulator(AsyncBaseTransport):
+    # An httpx transport that answers the /clip/v2 routes HueAPIv2 maps and
+    # the event stream from an in-memory SyntheticHome. Pass it to
+    # Router(transport=...) to run without a physical bridge.
+    def __init__(
+        self,
+        home: Optional[SyntheticHome] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit: Optional[float] = None,
+        burst: Optional[float] = None,
+        capacity: Optional[Callable[[float], float]] = None,
+        api_key: Optional[str] = None,
+        stream: bool = True,
+    ):
+        self.home = home or SyntheticHome()
+        self.latency = latency
+        self.jitter = jitter
+        self.api_key = api_key
+        # stream=False answers the event stream with a 502, like a proxy
+        # that won't pass long-lived responses.
+        self.stream = stream
+        self.bucket = TokenBucket(rate_limit, burst) if rate_limit else None
+        # capacity(t) -> requests/s lets benchmarks vary the rate limit over
+        # time (t is seconds since the simulator was created).
+        self.capacity = capacity
+        self.started = monotonic()
+        self.requests = 0
+        self.rejected = 0
+        self.events_sent = 0
+        self._streams: set[_EventStream] = set()
+        self._event_seq = 0
+        self.unavailable_until = 0.0
+        self.refuse = False
+
+    def outage(self, seconds: float, refuse: bool = False):
+        # For the next `seconds` requests get a 503 as from a rebooting
+        # bridge or, with refuse=True, a connection error.
+        self.unavailable_until = monotonic() + seconds
+        self.refuse = refuse
+
+    async def handle_async_request(self, request: Request) -> Response:
+        self.requests += 1
+        if self.latency or self.jitter:
+            await sleep(self.latency + self.home.random.uniform(0, self.jitter))
+
+        if monotonic() < self.unavailable_until:
+            if self.refuse:
+                raise ConnectError("connection refused", request=request)
+            return self._error(503, "service unavailable")
+
+        if self.api_key and request.headers.get("hue-application-key") != self.api_key:
+            return self._error(403, "unauthorized user")
+
+        if retry_after := self._throttle():
+            self.rejected += 1
+            return self._error(
+                429,
+                "too many requests",
+                headers={"Retry-After": f"{max(1, round(retry_after))}"},
+            )
+
+        parts = [p for p in request.url.path.split("/") if p]
+        if parts[:3] == ["eventstream", "clip", "v2"]:
+            if not self.stream:
+                return self._error(502, "bad gateway")
+            return Response(
+                200,
+                headers={"Content-Type": "text/event-stream"},
+                stream=_EventStream(self),
+            )
+        if parts[:3] != ["clip", "v2", "resource"]:
+            return self._error(404, "resource not found")
+
+        rtype = PATH_TYPES.get(parts[3], parts[3]) if len(parts) > 3 else None
+        rid = parts[4] if len(parts) > 4 else None
+        body = loads(request.content) if request.content else {}
+
+        match request.method, rtype, rid:
+            case "GET", None, _:
+                return self._data(self.home.all())
+            case "GET", _, None:
+                return self._data(list(self.home.resources.get(rtype, {}).values()))
+            case "GET", _, _:
+                if res := self.home.resources.get(rtype, {}).get(rid):
+                    return self._data([res])
+                return self._error(404, "resource not found")
+            case "PUT", _, _:
+                res = self.home.resources.get(rtype, {}).get(rid)
+                if res is None:
+                    return self._error(404, "resource not found")
+                changes = {
+                    k: v for k, v in body.items() if k not in ("id", "id_v1", "type")
+                }
+                merge(res, changes)
+                if changes:
+                    updates = [{"id": rid, "type": rtype, **changes}]
+                    if rtype == "grouped_light":
+                        # Like the bridge, a group write lands on every light.
+                        for light_id in self.home.lights_in(res["owner"]["rid"]):
+                            merge(self.home.resources["light"][light_id], changes)
+                            updates.append({"id": light_id, "type": "light", **changes})
+                    self.publish("update", updates)
+                return self._data([ident(rid, rtype)])
+            case "POST", _, None:
+                res = self.home.add(rtype, **body)
+                self.publish("add", [res])
+                return self._data([ident(res["id"], rtype)])
+            case "DELETE", _, _:
+                if self.home.resources.get(rtype, {}).pop(rid, None) is None:
+                    return self._error(404, "resource not found")
+                self.publish("delete", [{"id": rid, "type": rtype}])
+                return self._data([ident(rid, rtype)])
+        return self._error(405, "method not allowed")
+
+    def _throttle(self) -> float:
+        if self.capacity is not None:
+            rate = max(self.capacity(monotonic() - self.started), 0.001)
+            if self.bucket is None:
+                self.bucket = TokenBucket(rate)
+            self.bucket.rate = rate
+            self.bucket.burst = max(rate, 1.0)
+        return self.bucket.take() if self.bucket else 0.0
+
+    @staticmethod
+    def _data(data: list[Any]) -> Response:
+        return Response(200, content=dumps({"errors": [], "data": data}))
+
+    @staticmethod
+    def _error(status: int, description: str, headers=None) -> Response:
+        return Response(
+            status,
+            headers=headers,
+            content=dumps({"errors": [{"description": description}], "data": []}),
+        )
+
+    def publish(self, event_type: str, data: list[dict]):
+        if not self._streams:
+            return
+        self._event_seq += 1
+        now = time()
+        chunk = (
+            f"id: {int(now)}:{self._event_seq}\ndata: ".encode()
+            + dumps(
+                [
+                    {
+                        "creationtime": f"{now:.3f}",
+                        "data": data,
+                        "id": str(UUID(int=self._event_seq)),
+                        "type": event_type,
+                    }
+                ]
+            ).encode()
+            + b"\n\n"
+        )
+        for stream in self._streams:
+            stream.queue.put_nowait(chunk)
+        self.events_sent += len(data)
+
+    async def firehose(
+        self,
+        rate: float = 100.0,
+        duration: Optional[float] = None,
+        batch: int = 1,
+        types: Iterable[str] = ("light",) + SENSOR_TYPES,
+    ):
+        # Publish `rate` random updates per second, `batch` per event message.
+        types = tuple(types)
+        interval = batch / rate
+        deadline = None if duration is None else monotonic() + duration
+        while deadline is None or monotonic() < deadline:
+            data = [d for _ in range(batch) if (d := self.home.random_update(types))]
+            if data:
+                self.publish("update", data)
+            await sleep(interval)
+
+    async def play(self, script: Iterable[tuple[float, str, list[dict]]]):
+        # script: (delay_seconds, event_type, data) entries, played in order.
+        for delay, event_type, data in script:
+            if delay:
+                await sleep(delay)
+            self.publish(event_type, data)
+
+    def close_streams(self):
+        for stream in list(self._streams):
+            stream.queue.put_nowait(None)
@@ -0,0 +1,90 @@
+from os import replace
+from pathlib import Path
+from time import time
+from typing import Any, Optional
+
+try:
+    from ujson import dumps, loads
+except ImportError:
+    from json import dumps, loads
+
+__all__ = ("SNAPSHOT_VERSION", "encode", "decode", "write", "read")
+
+MAGIC = b"PHLYSNP"
+SNAPSHOT_VERSION = 1
+CODEC_MSGPACK = b"m"
+CODEC_JSON = b"j"
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return msgpack
+
+
+def encode(payload: dict[str, Any], codec: Optional[bytes] = None) -> bytes:
+    msgpack = _msgpack()
+    if codec is None:
+        codec = CODEC_MSGPACK if msgpack is not None else CODEC_JSON
+    if codec == CODEC_MSGPACK:
+        body = msgpack.packb(payload, use_bin_type=True)
+    else:
+        body = dumps(payload).encode()
+    return MAGIC + bytes((SNAPSHOT_VERSION,)) + codec + body
+
+
+def decode(data: bytes) -> Optional[dict[str, Any]]:
+    # Returns None for anything that isn't an intact current-version snapshot
+    # (truncated or corrupt ones included) so the caller can fall back to a
+    # cold start.
+    header = len(MAGIC) + 2
+    if len(data) < header or not data.startswith(MAGIC):
+        return None
+    if data[len(MAGIC)] != SNAPSHOT_VERSION:
+        return None
+    codec, body = data[len(MAGIC) + 1 : header], data[header:]
+    if codec == CODEC_MSGPACK:
+        if (msgpack := _msgpack()) is None:
+            return None
+        try:
+            payload = msgpack.unpackb(body, raw=False)
+        except (ValueError, msgpack.UnpackException):
+            return None
+    elif codec == CODEC_JSON:
+        try:
+            payload = loads(body)
+        except ValueError:
+            return None
+    else:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def build(bridge: str, entities: dict[str, dict[str, dict]]) -> dict[str, Any]:
+    return {
+        "version": SNAPSHOT_VERSION,
+        "bridge": bridge,
+        "created": time(),
+        "entities": entities,
+    }
+
+
+async def write(path: Path | str, payload: dict[str, Any]):
+    # Written beside the target and renamed over it, so a crash mid-write
+    # leaves the previous snapshot intact.
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    from aiofiles import open as aio_open
+
+    async with aio_open(tmp, "wb") as f:
+        await f.write(encode(payload))
+    replace(tmp, path)
+
+
+def read(path: Path | str) -> Optional[dict[str, Any]]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    return decode(path.read_bytes())
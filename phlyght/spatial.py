@@ -0,0 +1,114 @@
+from typing import Any, Iterable, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ("SpatialIndex",)
+
+AXES = {"x": (1.0, 0.0, 0.0), "y": (0.0, 1.0, 0.0), "z": (0.0, 0.0, 1.0)}
+
+
+def _xyz(pos) -> tuple[float, float, float]:
+    if isinstance(pos, dict):
+        return (pos.get("x", 0.0), pos.get("y", 0.0), pos.get("z", 0.0))
+    if hasattr(pos, "x"):
+        return (pos.x, pos.y, pos.z)
+    return tuple(pos)
+
+
+class SpatialIndex:
+    # Positions are stored as one (N, 3) float array, so every query is a
+    # single vectorized expression instead of a Python loop per channel.
+    __slots__ = ("keys", "positions", "_lookup")
+
+    def __init__(self, keys: Iterable[Any], positions: Iterable[Any]):
+        if np is None:
+            raise ImportError("SpatialIndex requires numpy to be installed")
+
+        self.keys = tuple(keys)
+        self.positions = np.asarray(
+            [_xyz(p) for p in positions], dtype=np.float64
+        ).reshape(-1, 3)
+        if len(self.keys) != len(self.positions):
+            raise ValueError("keys and positions must have the same length")
+
+        self.positions.setflags(write=False)
+        self._lookup = {k: i for i, k in enumerate(self.keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._lookup
+
+    def position(self, key):
+        return self.positions[self._lookup[key]]
+
+    @classmethod
+    def from_channels(cls, configuration) -> "SpatialIndex":
+        channels = configuration.channels or []
+        return cls(
+            (c.channel_id for c in channels),
+            (c.position for c in channels),
+        )
+
+    @classmethod
+    def from_locations(cls, configuration) -> "SpatialIndex":
+        # A service may report up to two positions (e.g. both ends of a
+        # gradient strip); each one gets its own row keyed by (rid, n).
+        keys, positions = [], []
+        for loc in configuration.locations.service_location:
+            for n, pos in enumerate(loc.positions or [loc.position]):
+                keys.append((loc.service.rid, n))
+                positions.append(pos)
+        return cls(keys, positions)
+
+    @staticmethod
+    def _point(point) -> "np.ndarray":
+        return np.asarray(_xyz(point), dtype=np.float64)
+
+    @staticmethod
+    def _axis(axis) -> "np.ndarray":
+        vec = np.asarray(AXES[axis] if isinstance(axis, str) else axis, np.float64)
+        norm = np.linalg.norm(vec)
+        if not norm:
+            raise ValueError("axis must be a non-zero vector")
+        return vec / norm
+
+    def distances(self, point) -> "np.ndarray":
+        return np.linalg.norm(self.positions - self._point(point), axis=1)
+
+    def nearest(self, point, k: int = 1) -> list[Any]:
+        if not len(self):
+            return []
+        k = min(k, len(self))
+        dist = self.distances(point)
+        idx = np.argpartition(dist, k - 1)[:k]
+        return [self.keys[i] for i in idx[np.argsort(dist[idx])]]
+
+    def within(self, point, radius: float) -> list[Any]:
+        return [self.keys[i] for i in np.flatnonzero(self.distances(point) <= radius)]
+
+    def project(self, axis="x", origin: Optional[Any] = None) -> "np.ndarray":
+        pos = self.positions
+        if origin is not None:
+            pos = pos - self._point(origin)
+        return pos @ self._axis(axis)
+
+    def falloff(self, point, radius: float) -> "np.ndarray":
+        # Linear 1 -> 0 intensity with distance from point, clipped at radius.
+        if radius <= 0:
+            raise ValueError(f"radius must be positive, got {radius}")
+        return np.clip(1.0 - self.distances(point) / radius, 0.0, 1.0)
+
+    def sweep(self, offset: float, width: float, axis="x") -> "np.ndarray":
+        # Intensity of a band of the given width centered at `offset` along
+        # the axis; advance `offset` each frame for a wave effect.
+        if width <= 0:
+            raise ValueError(f"width must be positive, got {width}")
+        return np.clip(1.0 - np.abs(self.project(axis) - offset) / width, 0.0, 1.0)
+
+    def as_dict(self, values: Iterable[float]) -> dict[Any, float]:
+        return dict(zip(self.keys, (float(v) for v in values)))
@@ -1,7 +1,7 @@
 from collections import deque
 from inspect import Parameter, signature
 from typing import Any
-from time import time
+from time import time, monotonic_ns
 
 from re import compile as re_compile
 
@@ -17,11 +17,6 @@ except ImportError:
     except ImportError:
         from json import dumps, loads, JSONDecodeError
 
-try:
-    from yarl import URL as UR
-except ImportError:
-    ...
-
 __all__ = (
     "ENDPOINT_METHOD",
     "STR_FMT_RE",
@@ -35,6 +30,7 @@ __all__ = (
     "get_url_args",
     "get_data_fields",
     "ret_cls",
+    "rprint",
 )
 
 ENDPOINT_METHOD = re_compile(r"^(?=((?:get|set|create|delete)\w+))\1")
@@ -67,7 +63,8 @@ def get_url_args(url):
 
 def get_data_fields(fn, data, args, kwargs) -> dict[str, Any]:
     for param_name, param in signature(fn).parameters.items():
-        if param_name == "self":
+        if param_name == "self" or param.kind == Parameter.VAR_KEYWORD:
+            # Fields sent through **kwargs are already in data as given.
             continue
 
         if param.kind == Parameter.POSITIONAL_ONLY:
@@ -105,15 +102,19 @@ def get_data_fields(fn, data, args, kwargs) -> dict[str, Any]:
 
 
 def ret_cls(cls):
+    # Entities are tied to the router that fetched them.
+    bind = "_router" in getattr(cls, "__private_attributes__", ())
+
     def wrapped(fn):
         async def sub_wrap(self, *args, **kwargs):
             try:
-                ret = loads(
-                    (await fn(self, *args, **kwargs))
-                    .content.decode()
-                    .rstrip("\\r\\n")
-                    .lstrip(" ")
-                )
+                resp = await fn(self, *args, **kwargs)
+                metrics = self.metrics
+                if metrics.enabled:
+                    start = monotonic_ns()
+                ret = loads(resp.content.decode().rstrip("\\r\\n").lstrip(" "))
+                if metrics.enabled:
+                    metrics.observe("decode", cls.__name__, monotonic_ns() - start)
 
                 kwargs.pop("base_uri", None)
                 ret = ret.get("data", None)
@@ -122,11 +123,19 @@ def ret_cls(cls):
                 if not ret:
                     return []
 
+                if metrics.enabled:
+                    start = monotonic_ns()
                 if isinstance(ret, list):
                     for r in ret:
-                        _rets.append(cls(**r))
+                        _rets.append(obj := cls(**r))
+                        if bind:
+                            obj._router = self
                 else:
-                    return cls(**ret)
+                    _rets = cls(**ret)
+                    if bind:
+                        _rets._router = self
+                if metrics.enabled:
+                    metrics.observe("validate", cls.__name__, monotonic_ns() - start)
 
                 return _rets
             except JSONDecodeError:
@@ -189,16 +198,22 @@ class LRU(set):
         self |= set([LRUItem(value=item) for item in items])
 
 
+def rprint(*args, **kwargs):
+    # rich is only needed for the odd console message, so load it on demand.
+    try:
+        from rich import print as _print
+    except ImportError:
+        from builtins import print as _print
+    _print(*args, **kwargs)
+
+
 class URL(_URL):
     def __truediv__(self, other):
         # Why am i doing this? good question.
         try:
-            return URL(str(UR(f"{self}") / other.lstrip("/")))
-        except NameError:
+            from yarl import URL as UR
+        except ImportError:
             return URL(f"{self}{other.lstrip('/')}")
+        return URL(str(UR(f"{self}") / other.lstrip("/")))
 
-    def __floordiv__(self, other):
-        try:
-            return URL(str(UR(f"{self}") / other.lstrip("/")))
-        except NameError:
-            return URL(f"{self}{other.lstrip('/')}")
+    __floordiv__ = __truediv__
@@ -0,0 +1,31 @@
+import pytest
+
+from phlyght import Router
+from phlyght.simulator import BridgeSimulator, SyntheticHome
+
+CONFIG = {"api_key": "test", "bridge_host": "127.0.0.1", "aliases": {}}
+
+
+@pytest.fixture
+def home():
+    return SyntheticHome(devices=12)
+
+
+@pytest.fixture
+def start_router(home):
+    # start_router(**kwargs) -> a started Router on a simulator of `home`.
+    # It neither streams nor polls, so tests drive events themselves;
+    # asyncio.run cancels its tasks at the end.
+    async def start(aliases=None, sim=None, router_cls=Router, **kwargs):
+        sim = sim or BridgeSimulator(home, stream=False)
+        router = router_cls(
+            config=CONFIG | {"aliases": aliases or {}},
+            transport=sim,
+            stream=False,
+            **kwargs,
+        )
+        await router.start()
+        router.poller.stop()
+        return router
+
+    return start
@@ -0,0 +1,63 @@
+from asyncio import CancelledError, run, sleep, wait_for
+
+from phlyght.simulator import BridgeSimulator
+
+
+def test_apply_many_by_entity_id_and_name(home, start_router):
+    ids = list(home.resources["light"])[:3]
+    name = home.resources["light"][ids[2]]["metadata"]["name"]
+
+    async def main():
+        router = await start_router()
+        items = [
+            (router.index.get(ids[0]), {"on": {"on": False}}),
+            (ids[1], {"on": {"on": False}}),
+            # Shared with the light's device; the light is meant.
+            (name, {"on": {"on": False}}),
+            ("No such light", {"on": {"on": False}}),
+        ]
+        return [r async for r in router.apply_many(items, concurrency=2)]
+
+    results = run(main())
+    assert [r.index for r in results] == [0, 1, 2, 3]
+    assert [r.ok for r in results] == [True, True, True, False]
+    assert isinstance(results[3].error, ValueError)
+    for rid in ids:
+        assert home.resources["light"][rid]["on"] == {"on": False}
+
+
+def test_cancel_resolves_every_result(home, start_router):
+    async def main():
+        sim = BridgeSimulator(home, stream=False)
+        router = await start_router(sim=sim)
+        sim.latency = 0.05
+        items = [(rid, {"on": {"on": True}}) for rid in home.resources["light"]]
+        batch = router.apply_many(items, concurrency=1).start()
+        await sleep(0.08)
+        batch.cancel()
+        return batch, await wait_for(batch, 1)
+
+    batch, results = run(main())
+    assert len(results) == len(batch)
+    cancelled = [r for r in results if isinstance(r.error, CancelledError)]
+    assert cancelled and len(batch.errors) == len(cancelled)
+    assert batch.done == len(batch)
+
+
+def test_a_cancelled_write_does_not_stall_the_batch(home, start_router):
+    async def main():
+        router = await start_router()
+        first = next(iter(home.resources["light"]))
+
+        async def set_light(rid, **changes):
+            if str(rid) == first:
+                raise CancelledError()
+            return [rid]
+
+        router.set_light = set_light
+        items = [(rid, {"on": {"on": True}}) for rid in home.resources["light"]]
+        return await wait_for(router.apply_many(items), 1)
+
+    results = run(main())
+    assert isinstance(results[0].error, CancelledError)
+    assert all(r.ok for r in results[1:])
@@ -0,0 +1,16 @@
+from asyncio import run
+
+from phlyght.compact import EntityRecord
+
+
+def test_expanded_records_can_still_write(home, start_router):
+    async def main():
+        router = await start_router(compact=True)
+        record = router.index.of_type("light")[0]
+        assert isinstance(record, EntityRecord)
+        on = {"on": not record.on.on}
+        await record.to_model().update(on=on)
+        return str(record.id), on
+
+    rid, on = run(main())
+    assert home.resources["light"][rid]["on"] == on
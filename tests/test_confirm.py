@@ -0,0 +1,72 @@
+from asyncio import run, sleep
+from uuid import uuid4
+
+import pytest
+
+from phlyght.confirm import ConfirmationTracker
+from phlyght.policy import BridgeError
+
+
+def test_an_update_confirms_the_write_it_matches():
+    async def main():
+        tracker = ConfirmationTracker()
+        pending = tracker.expect("light", "a", {"on", "dimming"})
+        tracker.observe("light", "a", {"id", "type", "color"})
+        assert not pending.future.done()
+        tracker.observe("light", "a", {"id", "type", "dimming"})
+        return tracker, await tracker.wait(pending, 1)
+
+    tracker, latency = run(main())
+    assert latency >= 0 and not tracker._pending
+    assert tracker.stats()["light"]["count"] == 1
+
+
+def test_a_timed_out_wait_is_forgotten():
+    async def main():
+        tracker = ConfirmationTracker()
+        pending = tracker.expect("light", "a", {"on"})
+        with pytest.raises(TimeoutError):
+            await tracker.wait(pending, 0.01)
+        # A late event must not be taken for the confirmation.
+        tracker.observe("light", "a", {"on"})
+        return tracker
+
+    tracker = run(main())
+    assert not tracker._pending
+    assert "light" not in tracker.latencies
+    assert tracker.timeouts == {"light": 1}
+
+
+def test_failed_writes_are_not_expected(start_router):
+    async def main():
+        router = await start_router(policy=None)
+        # The bridge answers an unknown id with a 404.
+        await router.set_light(str(uuid4()), on={"on": True})
+        return router
+
+    assert not run(main()).confirmations._pending
+
+
+def test_writes_that_raise_are_not_expected(home, start_router):
+    async def main():
+        router = await start_router()
+        router._client._transport.outage(10)
+        light = router.index.of_type("light")[0]
+        with pytest.raises(BridgeError):
+            await light.update(wait_confirmed=True, on={"on": True})
+        return router
+
+    assert not run(main()).confirmations._pending
+
+
+def test_update_waits_for_its_event(home, start_router):
+    async def main():
+        router = await start_router()
+        light = router.index.of_type("light")[0]
+        on = {"on": not light.on.on}
+        task = router.new_task(light.update(wait_confirmed=True, on=on))
+        await sleep(0.05)
+        router._dispatch("update", {"id": str(light.id), "type": "light", "on": on})
+        return await task
+
+    assert run(main()) >= 0
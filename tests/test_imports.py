@@ -0,0 +1,15 @@
+import pytest
+
+from benchmarks.imports import BUDGETS, import_time
+
+
+@pytest.mark.parametrize("statement", list(BUDGETS))
+def test_import_budget(statement):
+    budget, forbidden = BUDGETS[statement]
+    # The quickest of a few fresh interpreters, so one slow start doesn't fail
+    # the suite.
+    runs = [import_time(statement) for _ in range(3)]
+    total = min(t for t, _ in runs)
+    loaded = sorted({m for _, modules in runs for m in forbidden if m in modules})
+    assert not loaded, f"{statement!r} loaded {loaded}"
+    assert total <= budget, f"{statement!r} took {total}us, budget {budget}us"
@@ -0,0 +1,76 @@
+from asyncio import run
+
+import pytest
+
+from phlyght.query import EntityView
+
+
+def test_discovery_indexes_the_home(home, start_router):
+    router = run(start_router())
+    index = router.index
+    for rtype in ("light", "room", "zone", "scene", "motion", "grouped_light"):
+        assert index.ids(rtype) == set(home.resources[rtype]), rtype
+
+    for room in home.resources["room"]:
+        assert {str(e.id) for e in index.lights_in(room)} == set(home.lights_in(room))
+
+    light = next(iter(home.resources["light"].values()))
+    assert str(index.device(light["id"]).id) == light["owner"]["rid"]
+    assert [str(e.id) for e in index.named(light["metadata"]["name"], "light")] == [
+        light["id"]
+    ]
+
+
+def test_discovery_with_some_objects_aliased(home, start_router):
+    # Aliased lights and the rest of their type are both stored as entities.
+    first, *rest = home.resources["light"]
+
+    async def main():
+        router = await start_router(aliases={"lights": {first: "lamp"}})
+        await router.lamp.update(on={"on": False})
+        return router
+
+    router = run(main())
+    assert router.index.ids("light") >= set(rest)
+    assert home.resources["light"][first]["on"] == {"on": False}
+
+
+def test_track_keeps_the_index_current(home, start_router):
+    async def main():
+        router = await start_router()
+        light = next(iter(home.resources["light"]))
+        router._track("delete", {"id": light, "type": "light"})
+        assert light not in router.index
+        router._track("add", home.resources["light"][light])
+        assert light in router.index
+        room = next(r for r in home.resources["room"] if light in home.lights_in(r))
+        assert light in router.index.light_ids(room)
+
+    run(main())
+
+
+def test_query(home, start_router):
+    router = run(start_router())
+    lights = home.resources["light"].values()
+    bright = {l["id"] for l in lights if l["dimming"]["brightness"] > 50}
+    assert set(router.query("light", dimming__brightness__gt=50).ids()) == bright
+
+    room = next(iter(home.resources["room"].values()))
+    in_room = router.query("light", room=room["metadata"]["name"])
+    assert set(in_room.ids()) == set(home.lights_in(room["id"]))
+
+    ordered = router.query("light").order_by("dimming__brightness", reverse=True)
+    values = [v.dimming.brightness for v in ordered]
+    assert values == sorted(values, reverse=True)
+
+    off = router.query("light").exclude(on__on=True)
+    assert all(not v.on.on for v in off)
+    assert off.count() + router.query("light", on__on=True).count() == len(lights)
+
+
+def test_views_are_read_only(start_router):
+    router = run(start_router())
+    view = router.query("light").first()
+    assert isinstance(view, EntityView)
+    with pytest.raises(AttributeError):
+        view.on = None
@@ -0,0 +1,83 @@
+from asyncio import run
+
+from phlyght import Router
+from phlyght.simulator import BridgeSimulator
+
+CONFIG = {"api_key": "test", "bridge_host": "127.0.0.1", "aliases": {}}
+
+
+def _updates(home, n: int) -> list[dict]:
+    lights = list(home.resources["light"])
+    return [
+        {
+            "id": lights[i % len(lights)],
+            "type": "light",
+            "dimming": {"brightness": float(i % 100)},
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def _recovered(home, path):
+    router = Router(
+        config=dict(CONFIG), transport=BridgeSimulator(home, stream=False), journal=path
+    )
+    assert router.journal.recover()
+    return router
+
+
+def test_replay_after_a_crash(home, start_router, tmp_path):
+    path = tmp_path / "state.snap"
+
+    async def main():
+        router = await start_router(journal=path, journal_flush=3600)
+        for event in _updates(home, 20):
+            router._dispatch("update", event)
+        await router.journal.flush()
+        return router
+
+    router = run(main())
+    assert router.journal.seq == 20
+    # A torn write from the crash is dropped.
+    with open(path.with_name(path.name + ".journal"), "ab") as f:
+        f.write(b'[21,"update",{"id":')
+
+    recovered = _recovered(home, path)
+    assert recovered.journal.replayed == 20
+    assert recovered._snapshot_entities() == router._snapshot_entities()
+    assert path.with_name(path.name + ".journal").read_bytes().endswith(b"\n")
+
+
+def test_compaction_covers_the_log(home, start_router, tmp_path):
+    path = tmp_path / "state.snap"
+    log = path.with_name(path.name + ".journal")
+
+    async def main():
+        router = await start_router(journal=path, journal_flush=3600)
+        events = _updates(home, 30)
+        for event in events[:20]:
+            router._dispatch("update", event)
+        await router.journal.flush()
+        assert await router.journal.compact() == 20
+        assert log.read_bytes() == b""
+        for event in events[20:]:
+            router._dispatch("update", event)
+        await router.journal.close()
+        return router
+
+    router = run(main())
+    recovered = _recovered(home, path)
+    # Only what came after the compacted snapshot is replayed.
+    assert recovered.journal.replayed == 10
+    assert recovered._snapshot_entities() == router._snapshot_entities()
+
+
+def test_noops_are_not_journaled(home, start_router, tmp_path):
+    async def main():
+        router = await start_router(journal=tmp_path / "state.snap", journal_flush=3600)
+        event = _updates(home, 1)[0]
+        router._dispatch("update", event)
+        router._dispatch("update", dict(event))
+        return router
+
+    assert run(main()).journal.seq == 1
@@ -0,0 +1,46 @@
+from asyncio import run
+from time import monotonic
+
+from phlyght.limits import AdaptiveLimiter, RateLimiter, budget_of
+
+
+def test_bucket_allows_a_burst_then_paces():
+    limiter = RateLimiter(rate=50.0, burst=2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+    async def main():
+        start = monotonic()
+        for _ in range(5):
+            await limiter.acquire()
+        return monotonic() - start
+
+    # Five more tokens at 50/s take about a tenth of a second.
+    assert 0.06 <= run(main()) < 0.5
+    assert limiter.acquired == 7 and limiter.waited > 0
+
+
+def test_budgets():
+    assert budget_of("PUT", "/resource/light/{light_id}") == "light"
+    assert budget_of("PUT", "/resource/grouped_light/{grouped_light_id}") == (
+        "grouped_light"
+    )
+    assert budget_of("GET", "/resource/light/{light_id}") == "other"
+    assert budget_of("PUT", "/resource/scene/{scene_id}") == "other"
+
+
+def test_adaptive_limiter_backs_off_and_recovers():
+    limiter = AdaptiveLimiter(rates={"light": 10.0}, cooldown=0.0, window=5)
+    endpoint = "/resource/light/{light_id}"
+    limiter.feedback("PUT", endpoint, 429, 0.01)
+    assert limiter.rate("light") == 7.0
+    # Other budgets are untouched.
+    assert limiter.rate("other") == 10.0
+
+    for _ in range(3):
+        limiter.feedback("PUT", endpoint, 200, 0.01)
+    assert limiter.rate("light") > 7.0
+
+    for _ in range(50):
+        limiter.feedback("PUT", endpoint, 503, 0.01)
+    assert limiter.rate("light") == limiter.budgets["light"].min_rate
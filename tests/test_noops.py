@@ -0,0 +1,97 @@
+from asyncio import gather, run
+
+import pytest
+
+from phlyght import Router
+from phlyght.handlers import keep_noops
+
+
+class Handlers(Router):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = {"light": 0, "zigbee_connectivity": 0, "button": 0}
+
+    async def on_light_update(self, light):
+        self.calls["light"] += 1
+
+    @keep_noops
+    async def on_zigbee_connectivity_update(self, connectivity):
+        self.calls["zigbee_connectivity"] += 1
+
+    async def on_button_update(self, button):
+        self.calls["button"] += 1
+
+
+def _repeat(router, rtype: str, times: int, **fields):
+    ent = router.index.of_type(rtype)[0]
+    event = {"id": str(ent.id), "type": rtype, **fields}
+    return [router._dispatch("update", dict(event)) for _ in range(times)]
+
+
+async def _dispatched(router, tasks):
+    await gather(*filter(None, tasks))
+    return router
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_repeated_updates_are_suppressed(start_router, compact):
+    async def main():
+        router = await start_router(router_cls=Handlers, compact=compact)
+        light = router.index.of_type("light")[0]
+        on = {"on": not light.on.on}
+        return await _dispatched(router, _repeat(router, "light", 5, on=on))
+
+    router = run(main())
+    assert router.calls["light"] == 1
+    assert router.metrics.counters["noops_suppressed"] == {"light": 4}
+
+
+def test_kept_and_never_suppressed_types(start_router):
+    async def main():
+        router = await start_router(router_cls=Handlers)
+        connectivity = router.index.of_type("zigbee_connectivity")[0]
+        status = getattr(connectivity.status, "value", connectivity.status)
+        tasks = _repeat(router, "zigbee_connectivity", 3, status=status)
+        # A repeated button event is another press.
+        tasks += _repeat(router, "button", 3, button={"last_event": "short_release"})
+        return await _dispatched(router, tasks)
+
+    router = run(main())
+    assert router.calls["zigbee_connectivity"] == 3
+    assert router.calls["button"] == 3
+
+
+def test_suppression_can_be_turned_off(start_router):
+    async def main():
+        router = await start_router(router_cls=Handlers, suppress_noops=False)
+        light = router.index.of_type("light")[0]
+        tasks = _repeat(router, "light", 3, on={"on": light.on.on})
+        return await _dispatched(router, tasks)
+
+    assert run(main()).calls["light"] == 3
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_unknown_fields_are_not_noops(start_router, compact):
+    # Nothing was compared for them, so they can't be known to change nothing.
+    async def main():
+        router = await start_router(router_cls=Handlers, compact=compact)
+        return await _dispatched(router, _repeat(router, "light", 2, new_feature={}))
+
+    assert run(main()).calls["light"] == 2
+
+
+def test_history_keeps_repeated_readings(start_router):
+    pytest.importorskip("numpy")
+
+    async def main():
+        router = await start_router(history=True)
+        sensor = router.index.of_type("temperature")[0]
+        reading = {"temperature": sensor.temperature.temperature}
+        _repeat(router, "temperature", 4, temperature=reading)
+        return router, str(sensor.id)
+
+    router, rid = run(main())
+    counts = router.history.as_dict("temperature", router.history.count("temperature"))
+    # The value seeded at startup plus four steady readings.
+    assert counts[rid] == 5
@@ -0,0 +1,107 @@
+from asyncio import run
+from time import monotonic
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from phlyght import Router
+from phlyght.policy import (
+    BridgeUnavailable,
+    CircuitBreaker,
+    CircuitOpen,
+    RateLimited,
+    RetryPolicy,
+    classify,
+)
+
+CONFIG = {"api_key": "test", "bridge_host": "127.0.0.1", "aliases": {}}
+LIGHT = str(uuid4())
+
+
+def _router(statuses: list[int]):
+    # A router whose bridge answers with each of statuses in turn, then 200.
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        status = statuses.pop(0) if statuses else 200
+        return httpx.Response(status, json={"errors": [], "data": []})
+
+    router = Router(
+        config=dict(CONFIG),
+        transport=httpx.MockTransport(handler),
+        retry=RetryPolicy(base=0.01),
+    )
+    return router, sent
+
+
+def _response(status: int, **headers):
+    request = httpx.Request("PUT", "https://bridge/clip/v2/resource/light/x")
+    return httpx.Response(status, headers=headers, request=request)
+
+
+def test_classify():
+    assert classify(_response(200)) is None
+    assert classify(_response(404)) is None
+    assert isinstance(classify(_response(503)), BridgeUnavailable)
+    limited = classify(_response(429, **{"Retry-After": "2"}))
+    assert isinstance(limited, RateLimited) and limited.retry_after == 2.0
+
+
+def test_relative_puts_are_not_retried():
+    policy, error = RetryPolicy(), BridgeUnavailable("down", 503)
+    assert policy.allows("GET", error)
+    assert policy.allows("PUT", error, {"on": {"on": True}})
+    assert not policy.allows("PUT", error, {"dimming_delta": {"action": "up"}})
+    assert not policy.allows(
+        "PUT", error, {"color_temperature_delta": {"action": "down"}}
+    )
+    assert policy.allows("PUT", error, {"dimming_delta": {"action": "stop"}})
+    assert not policy.allows("POST", error)
+    # A 429 was never applied, so anything may be resent.
+    assert policy.allows("POST", RateLimited("slow down", 429))
+
+
+def test_retry_after_beyond_cap_is_clamped():
+    policy = RetryPolicy(cap=1.0)
+    error = RateLimited("slow down", 429, retry_after=30.0)
+    assert policy.delay(0, error) == 1.0
+    assert policy.delay(policy.attempts - 1, error) is None
+
+
+def test_breaker():
+    breaker = CircuitBreaker(threshold=2, reset=0.05)
+    breaker.failure()
+    breaker.check()
+    breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    breaker.opened = monotonic() - 1
+    breaker.check()
+    assert breaker.state == "half_open"
+    # Only one probe at a time while half-open.
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    breaker.success()
+    assert breaker.state == "closed"
+
+
+def test_requests_are_retried_through_an_outage():
+    router, sent = _router([503, 503])
+    resp = run(router.get_raw_resource_type("light"))
+    assert resp.status_code == 200 and len(sent) == 3
+
+
+def test_relative_put_is_sent_once():
+    router, sent = _router([503])
+    delta = {"action": "up", "brightness_delta": 10}
+    with pytest.raises(BridgeUnavailable):
+        run(router.set_light(LIGHT, dimming_delta=delta))
+    assert len(sent) == 1
+
+    router, sent = _router([503])
+    run(router.set_light(LIGHT, on={"on": True}))
+    assert len(sent) == 2
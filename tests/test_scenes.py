@@ -0,0 +1,75 @@
+from asyncio import run
+
+
+def _state(brightness: float) -> dict:
+    return {"on": {"on": True}, "dimming": {"brightness": brightness}}
+
+
+def _show(router, rid: str, state: dict):
+    router._track("update", {"id": rid, "type": "light", **state})
+
+
+def _room_scene(home, router, state: dict):
+    # A scene setting every light in the first room with lights to state.
+    room = next(r for r in home.resources["room"] if len(home.lights_in(r)) > 1)
+    scene = home.add(
+        "scene",
+        metadata={"name": "Even"},
+        group={"rid": room, "rtype": "room"},
+        actions=[
+            {"target": {"rid": rid, "rtype": "light"}, "action": state}
+            for rid in home.lights_in(room)
+        ],
+    )
+    router._track("add", scene)
+    return room, scene["id"]
+
+
+def test_nothing_is_written_for_lights_already_in_the_scene(home, start_router):
+    router = run(start_router())
+    scene = next(iter(home.resources["scene"].values()))
+    for action in scene["actions"]:
+        _show(router, action["target"]["rid"], action["action"])
+
+    report = router.plan_scene(scene["id"]).report()
+    assert report["writes"] == 0
+    assert report["unchanged"] == report["targets"] == len(scene["actions"])
+
+
+def test_only_the_difference_is_written(home, start_router):
+    router = run(start_router())
+    # Lights a scene turns off are only compared on on/off.
+    scene, target = next(
+        (scene, action)
+        for scene in home.resources["scene"].values()
+        for action in scene["actions"]
+        if action["action"]["on"]["on"]
+    )
+    for action in scene["actions"]:
+        _show(router, action["target"]["rid"], action["action"])
+    brightness = target["action"]["dimming"]["brightness"]
+    _show(router, target["target"]["rid"], {"dimming": {"brightness": brightness / 2}})
+
+    plan = router.plan_scene(scene["id"])
+    assert [(w.rtype, w.rid) for w in plan.writes] == [
+        ("light", target["target"]["rid"])
+    ]
+    assert plan.writes[0].payload == {"dimming": target["action"]["dimming"]}
+
+
+def test_a_room_headed_for_one_state_gets_one_group_write(home, start_router):
+    async def main():
+        router = await start_router()
+        room, scene = _room_scene(home, router, _state(42.0))
+        for rid in home.lights_in(room):
+            _show(router, rid, _state(10.0))
+        plan = router.plan_scene(scene)
+        report = await router.apply_scene(scene)
+        return room, plan, report
+
+    room, plan, report = run(main())
+    grouped = home.resources["room"][room]["services"][0]["rid"]
+    assert [(w.rtype, w.rid) for w in plan.writes] == [("grouped_light", grouped)]
+    assert report["saved"] == len(home.lights_in(room)) - 1
+    for rid in home.lights_in(room):
+        assert home.resources["light"][rid]["dimming"]["brightness"] == 42.0
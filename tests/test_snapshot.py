@@ -0,0 +1,53 @@
+from asyncio import run
+
+import pytest
+
+from phlyght import Router, snapshot
+from phlyght.simulator import BridgeSimulator, SyntheticHome
+
+CONFIG = {"api_key": "test", "bridge_host": "127.0.0.1", "aliases": {}}
+
+
+def _router(path, sim):
+    return Router(config=dict(CONFIG), transport=sim, snapshot=path)
+
+
+def _stop(router):
+    for task in router._tasks:
+        task.cancel()
+
+
+@pytest.mark.parametrize("codec", [snapshot.CODEC_MSGPACK, snapshot.CODEC_JSON])
+def test_truncated_snapshot_reads_as_none(tmp_path, codec):
+    if codec == snapshot.CODEC_MSGPACK:
+        pytest.importorskip("msgpack")
+    payload = snapshot.build("127.0.0.1", {"lights": {"lamp": {"id": "x"}}})
+    data = snapshot.encode(payload, codec)
+    assert snapshot.decode(data) == payload
+
+    path = tmp_path / "state.snap"
+    path.write_bytes(data[: len(data) // 2])
+    assert snapshot.read(path) is None
+
+
+def test_router_starts_cold_from_truncated_snapshot(tmp_path):
+    path = tmp_path / "state.snap"
+    sim = BridgeSimulator(SyntheticHome(devices=4), stream=False)
+
+    async def main():
+        router = _router(path, sim)
+        await router.start()
+        _stop(router)
+        assert path.exists()
+        path.write_bytes(path.read_bytes()[:-10])
+
+        router = _router(path, sim)
+        assert not router.load_snapshot()
+        await router.start()
+        _stop(router)
+        return router
+
+    router = run(main())
+    assert router.index
+    # Discovery replaced the broken snapshot with a good one.
+    assert snapshot.read(path) is not None
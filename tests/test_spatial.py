@@ -0,0 +1,43 @@
+from uuid import uuid4
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from phlyght.models import HueEntsV2, merge_delta  # noqa: E402
+
+
+def _channel(n: int, x: float) -> dict:
+    return {"channel_id": n, "position": {"x": x, "y": 0.0, "z": 0.0}, "members": []}
+
+
+@pytest.fixture
+def configuration():
+    return HueEntsV2.EntertainmentConfiguration(
+        id=str(uuid4()), channels=[_channel(n, n / 2) for n in range(3)]
+    )
+
+
+def test_queries(configuration):
+    index = configuration.spatial_index()
+    assert index.nearest((0.9, 0, 0)) == [2]
+    assert sorted(index.within((0, 0, 0), 0.5)) == [0, 1]
+    assert np.allclose(index.falloff((0, 0, 0), 1.0), [1.0, 0.5, 0.0])
+    assert np.allclose(index.sweep(1.0, 0.5), [0.0, 0.0, 1.0])
+
+
+@pytest.mark.parametrize("size", [0, -1])
+def test_sizes_must_be_positive(configuration, size):
+    index = configuration.spatial_index()
+    with pytest.raises(ValueError):
+        index.falloff((0, 0, 0), size)
+    with pytest.raises(ValueError):
+        index.sweep(0.0, size)
+
+
+def test_index_is_cached_until_channels_change(configuration):
+    index = configuration.spatial_index()
+    assert configuration.spatial_index() is index
+    merge_delta(configuration, {"channels": [_channel(0, 1.0)]})
+    assert len(rebuilt := configuration.spatial_index()) == 1
+    assert rebuilt is not index